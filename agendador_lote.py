@@ -0,0 +1,241 @@
+"""
+agendador_lote.py
+
+Agendador de tarefas em grafo de dependências (DAG) para processar várias
+músicas ao mesmo tempo, com um pool de workers por tipo de recurso:
+
+- rede:       download (limitado pela banda)
+- acelerador: Demucs, Whisper e WhisperX (GPU ou CPU pesada)
+- cpu:        mixagem e encode com ffmpeg
+
+Cada pool tem sua própria concorrência e uma fila de prioridade, de modo que
+a música mais antiga na fila sempre avança primeiro: enquanto a música N é
+separada, a N+1 pode estar baixando e a N-1 sendo codificada.
+
+Uma falha afeta apenas a música em que ocorreu: as tarefas que dependem dela
+são puladas e as demais músicas continuam.
+
+Além do modo em lote (executar(): roda o grafo e retorna), há o modo
+residente usado pelo servico_karaoke.py: iniciar() sobe os workers e as
+tarefas adicionadas depois entram direto nas filas, até parar(); remover()
+descarta as tarefas já terminadas para o grafo não crescer sem limite.
+"""
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+
+POOLS_PADRAO = {"rede": 2, "acelerador": 1, "cpu": 2}
+
+
+class Tarefa:
+    """Uma etapa de uma música dentro do grafo."""
+
+    def __init__(self, nome, grupo, pool, funcao, depende=(), prioridade=(0,)):
+        self.nome = nome
+        self.grupo = grupo
+        self.pool = pool
+        self.funcao = funcao
+        self.depende = list(depende)
+        self.prioridade = prioridade
+        self.status = "pendente"  # pendente | executando | ok | erro | pulada
+        self.erro = None
+        self.duracao = 0.0
+        self.iniciada_em = None  # time.time() do início, para tempos de fila
+
+
+class AgendadorDAG:
+    """Executa tarefas respeitando dependências e limites de concorrência por pool."""
+
+    def __init__(self, concorrencia=None, ao_concluir=None):
+        """
+        Args:
+            ao_concluir: chamada com cada tarefa que termina (ok, erro ou pulada),
+                fora do lock do agendador.
+        """
+        self.concorrencia = dict(POOLS_PADRAO)
+        if concorrencia:
+            self.concorrencia.update(concorrencia)
+        self.tarefas = {}
+        self._dependentes = {}
+        self._faltando = {}
+        self._filas = {}
+        self._contador = itertools.count()
+        self._lock = threading.Lock()
+        self._restantes = 0
+        self._fim = threading.Event()
+        self._ao_concluir = ao_concluir
+        self._workers = []
+        self._residente = False
+
+    def adicionar(self, tarefa):
+        with self._lock:
+            if tarefa.nome in self.tarefas:
+                raise ValueError(f"Tarefa duplicada: {tarefa.nome}")
+            if tarefa.pool not in self.concorrencia:
+                raise ValueError(f"Pool desconhecido '{tarefa.pool}' na tarefa {tarefa.nome}")
+            if self._residente:
+                for dep in tarefa.depende:
+                    if dep not in self.tarefas:
+                        raise ValueError(f"Dependência desconhecida '{dep}' na tarefa {tarefa.nome}")
+            self.tarefas[tarefa.nome] = tarefa
+            if not self._residente:
+                return tarefa
+
+            # Modo residente: as dependências já podem ter terminado
+            self._restantes += 1
+            self._faltando[tarefa.nome] = 0
+            pular = False
+            for dep in tarefa.depende:
+                status = self.tarefas[dep].status
+                if status in ("erro", "pulada"):
+                    pular = True
+                elif status != "ok":
+                    self._dependentes.setdefault(dep, []).append(tarefa.nome)
+                    self._faltando[tarefa.nome] += 1
+            puladas = []
+            if pular:
+                self._pular(tarefa, puladas)
+            elif self._faltando[tarefa.nome] == 0:
+                self._enfileirar(tarefa)
+        self._notificar(puladas)
+        return tarefa
+
+    def executar(self):
+        """Roda todas as tarefas e retorna o dicionário nome -> Tarefa."""
+        for tarefa in self.tarefas.values():
+            for dep in tarefa.depende:
+                if dep not in self.tarefas:
+                    raise ValueError(f"Dependência desconhecida '{dep}' na tarefa {tarefa.nome}")
+                self._dependentes.setdefault(dep, []).append(tarefa.nome)
+            self._faltando[tarefa.nome] = len(tarefa.depende)
+
+        self._restantes = len(self.tarefas)
+        if not self._restantes:
+            return self.tarefas
+
+        self._iniciar_workers()
+        with self._lock:
+            for tarefa in self.tarefas.values():
+                if self._faltando[tarefa.nome] == 0:
+                    self._enfileirar(tarefa)
+
+        self._fim.wait()
+        self.parar()
+        return self.tarefas
+
+    def iniciar(self):
+        """Modo residente: sobe os workers; tarefas adicionadas depois são executadas assim que liberadas."""
+        with self._lock:
+            if self.tarefas:
+                raise ValueError("O modo residente deve ser iniciado antes de adicionar tarefas")
+            self._residente = True
+        self._iniciar_workers()
+
+    def parar(self):
+        """Encerra os workers depois das tarefas já enfileiradas (as que ainda esperam dependências são descartadas)."""
+        for pool, n in self.concorrencia.items():
+            for _ in range(max(1, n)):
+                self._filas[pool].put(((float("inf"),), next(self._contador), None))
+        for t in self._workers:
+            t.join()
+        self._workers = []
+
+    def remover(self, nomes):
+        """
+        Modo residente: tira do grafo as tarefas terminadas (ok, erro ou
+        pulada). As pendentes ou em execução ficam. Retorna quantas saíram.
+        """
+        removidas = 0
+        with self._lock:
+            for nome in nomes:
+                tarefa = self.tarefas.get(nome)
+                if tarefa is None or tarefa.status in ("pendente", "executando"):
+                    continue
+                del self.tarefas[nome]
+                self._dependentes.pop(nome, None)
+                self._faltando.pop(nome, None)
+                removidas += 1
+        return removidas
+
+    def _iniciar_workers(self):
+        self._filas = {pool: queue.PriorityQueue() for pool in self.concorrencia}
+        for pool, n in self.concorrencia.items():
+            for i in range(max(1, n)):
+                t = threading.Thread(target=self._worker, args=(pool,),
+                                     name=f"{pool}-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def _enfileirar(self, tarefa):
+        self._filas[tarefa.pool].put((tarefa.prioridade, next(self._contador), tarefa))
+
+    def _worker(self, pool):
+        fila = self._filas[pool]
+        while True:
+            _, _, tarefa = fila.get()
+            if tarefa is None:
+                return
+            tarefa.status = "executando"
+            tarefa.iniciada_em = time.time()
+            inicio = time.perf_counter()
+            try:
+                tarefa.funcao()
+                tarefa.status = "ok"
+            except Exception as e:
+                tarefa.status = "erro"
+                tarefa.erro = e
+                print(f"   ❌ [{tarefa.grupo}] Erro em {tarefa.nome}: {e}")
+                traceback.print_exc()
+            tarefa.duracao = time.perf_counter() - inicio
+            self._concluir(tarefa)
+
+    def _concluir(self, tarefa):
+        puladas = []
+        with self._lock:
+            self._restantes -= 1
+            for nome in self._dependentes.get(tarefa.nome, []):
+                dependente = self.tarefas[nome]
+                if tarefa.status != "ok":
+                    self._pular(dependente, puladas)
+                else:
+                    self._faltando[nome] -= 1
+                    if self._faltando[nome] == 0 and dependente.status == "pendente":
+                        self._enfileirar(dependente)
+            if self._restantes == 0 and not self._residente:
+                self._fim.set()
+        self._notificar([tarefa, *puladas])
+
+    def _pular(self, tarefa, puladas):
+        """Marca a tarefa e tudo o que depende dela como pulado (chamado com o lock)."""
+        if tarefa.status != "pendente":
+            return
+        tarefa.status = "pulada"
+        puladas.append(tarefa)
+        self._restantes -= 1
+        for nome in self._dependentes.get(tarefa.nome, []):
+            self._pular(self.tarefas[nome], puladas)
+
+    def _notificar(self, tarefas):
+        if self._ao_concluir is None:
+            return
+        for tarefa in tarefas:
+            try:
+                self._ao_concluir(tarefa)
+            except Exception:
+                traceback.print_exc()
+
+
+def resumo_por_grupo(tarefas):
+    """Agrupa o resultado por música: {grupo: {'ok': bool, 'tempos': {...}, 'erro': ...}}."""
+    resumo = {}
+    for tarefa in tarefas.values():
+        item = resumo.setdefault(tarefa.grupo, {"ok": True, "tempos": {}, "erro": None})
+        item["tempos"][tarefa.nome.split(":")[-1]] = round(tarefa.duracao, 2)
+        if tarefa.status != "ok":
+            item["ok"] = False
+            if tarefa.status == "erro":
+                item["erro"] = tarefa.erro
+    return resumo
@@ -0,0 +1,136 @@
+"""
+arquivo_downloads.py
+
+Índice persistente dos downloads já feitos, chaveado por extrator + ID do
+vídeo (ex.: "youtube dQw4w9WgXcQ", o mesmo formato do --download-archive do
+yt-dlp). Cada chave guarda uma entrada por variante (formato + corte), de
+modo que o download completo, os cortes e o MP3/nativo do mesmo vídeo
+convivem no índice. Antes de baixar, download_youtube_mp3.py consulta o
+índice: se o vídeo já foi baixado no mesmo formato e com o mesmo corte e o
+arquivo ainda existe, o download é pulado, qualquer que seja a URL usada
+(youtu.be, watch?v=, item de playlist...).
+
+O índice fica em audio/.downloads.json (ou em KARAOKE_ARQUIVO_DOWNLOADS) e
+é regravado de forma atômica a cada registro, relendo o disco antes. A
+leitura-modificação-gravação é protegida por um lock por caminho do índice,
+compartilhado por todas as instâncias do processo, e por um lock de arquivo
+(fcntl, onde existir) em <índice>.lock, que cobre processos separados (o
+serviço e a CLI, por exemplo): os downloads concorrentes do modo em lote não
+perdem entradas entre si, e um arquivo corrompido ou de outra versão só faz
+o índice recomeçar vazio.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+ARQUIVO_PADRAO = Path(os.environ.get("KARAOKE_ARQUIVO_DOWNLOADS", "audio/.downloads.json"))
+VERSAO = 2
+
+# Um lock por índice (caminho resolvido), comum a todas as instâncias
+_LOCKS = {}
+_LOCKS_GUARDA = threading.Lock()
+
+
+def _lock_do_indice(caminho):
+    chave = str(caminho.resolve())
+    with _LOCKS_GUARDA:
+        return _LOCKS.setdefault(chave, threading.Lock())
+
+
+def variante(formato=None, trim=None):
+    """Chave da entrada dentro de um vídeo: '<formato>:<trim>' ('completo' sem corte)."""
+    return f"{formato}:{'completo' if trim is None else trim}"
+
+
+def chave_download(info):
+    """Chave do índice a partir do info dict do yt-dlp: '<extrator> <id>'."""
+    extrator = info.get("extractor_key") or info.get("ie_key") or info.get("extractor") or "generic"
+    return f"{extrator.lower()} {info['id']}"
+
+
+class ArquivoDownloads:
+    """Índice {chave: {variante: {arquivo, formato, trim, titulo, url, bytes, baixado_em}}} em JSON."""
+
+    def __init__(self, caminho=None):
+        self.caminho = Path(caminho or ARQUIVO_PADRAO)
+        self._lock = _lock_do_indice(self.caminho)
+
+    @contextmanager
+    def _travado(self):
+        """Exclusão mútua entre threads do processo e, com fcntl, entre processos."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.caminho.with_name(f"{self.caminho.name}.lock"), "a") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _ler(self):
+        if not self.caminho.exists():
+            return {}
+        try:
+            dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if dados.get("versao") != VERSAO:
+            return {}
+        return dados.get("itens", {})
+
+    def _gravar(self, itens):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_name(f"{self.caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporario.write_text(json.dumps({"versao": VERSAO, "itens": itens}, indent=2, ensure_ascii=False),
+                              encoding="utf-8")
+        os.replace(temporario, self.caminho)
+
+    def itens(self):
+        with self._travado():
+            return self._ler()
+
+    def buscar(self, chave, formato=None, trim=None):
+        """
+        Caminho do arquivo já baixado para a chave, ou None se não houver
+        registro, se o formato/corte forem outros ou se o arquivo sumiu.
+        """
+        with self._travado():
+            item = self._ler().get(chave, {}).get(variante(formato, trim))
+        if not item:
+            return None
+        arquivo = Path(item["arquivo"])
+        return arquivo if arquivo.exists() else None
+
+    def registrar(self, chave, arquivo, formato=None, trim=None, titulo=None, url=None):
+        arquivo = Path(arquivo)
+        with self._travado():
+            itens = self._ler()
+            itens.setdefault(chave, {})[variante(formato, trim)] = {
+                "arquivo": str(arquivo),
+                "formato": formato,
+                "trim": trim,
+                "titulo": titulo,
+                "url": url,
+                "bytes": arquivo.stat().st_size if arquivo.exists() else None,
+                "baixado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self._gravar(itens)
+
+    def remover(self, chave):
+        """Remove todas as variantes (formatos e cortes) da chave."""
+        with self._travado():
+            itens = self._ler()
+            if itens.pop(chave, None) is not None:
+                self._gravar(itens)
@@ -0,0 +1,121 @@
+"""
+audio_16k.py
+
+Buffer de vocais a 16 kHz mono compartilhado entre as etapas 3 (Whisper) e
+4 (WhisperX).
+
+A separação já tem o tensor dos vocais na memória; em vez de cada etapa
+decodificar e reamostrar o vocals.wav de novo com um subprocesso ffmpeg, a
+separação reamostra o tensor no torch e salva vocals_16k.npy ao lado das
+faixas. As etapas seguintes abrem esse arquivo com mmap (sem cópia e sem
+ffmpeg).
+"""
+
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+ARQUIVO_16K = "vocals_16k.npy"
+
+
+def salvar_vocals_16k(vocals, samplerate, pasta):
+    """
+    Converte o tensor dos vocais (canais, amostras) para mono 16 kHz float32
+    e salva como .npy na pasta das faixas.
+
+    Returns:
+        Path: Caminho do arquivo salvo.
+    """
+    import torchaudio
+
+    mono = vocals.mean(0)
+    if samplerate != SAMPLE_RATE:
+        mono = torchaudio.functional.resample(mono, samplerate, SAMPLE_RATE)
+    destino = Path(pasta) / ARQUIVO_16K
+    np.save(destino, mono.cpu().numpy().astype(np.float32, copy=False))
+    return destino
+
+
+def salvar_vocals_16k_arquivo(vocals_wav, pasta, bloco_bytes=1 << 22):
+    """
+    Gera o vocals_16k.npy a partir do vocals.wav já salvo, sem ter a faixa
+    inteira na memória: o ffmpeg converte para mono 16 kHz float32 num
+    arquivo temporário, que é copiado em blocos para o .npy.
+
+    Usado pela separação em streaming, que nunca tem o tensor completo.
+
+    Returns:
+        Path: Caminho do arquivo salvo.
+    """
+    destino = Path(pasta) / ARQUIVO_16K
+    bruto = destino.with_suffix(".f32")
+    comando = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-i", str(vocals_wav),
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        str(bruto),
+    ]
+    try:
+        subprocess.run(comando, capture_output=True, check=True)
+        amostras = bruto.stat().st_size // 4
+        with open(bruto, "rb") as origem, open(destino, "wb") as f:
+            np.lib.format.write_array_header_1_0(
+                f, {"descr": "<f4", "fortran_order": False, "shape": (amostras,)})
+            while True:
+                bloco = origem.read(bloco_bytes)
+                if not bloco:
+                    break
+                f.write(bloco)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Falha ao gerar {ARQUIVO_16K}: {e.stderr.decode(errors='ignore')}") from e
+    finally:
+        bruto.unlink(missing_ok=True)
+    return destino
+
+
+def buffer_16k(audio_path):
+    """
+    Retorna o .npy de 16 kHz correspondente a `audio_path`, se existir e não
+    for mais antigo que o próprio áudio; senão None.
+    """
+    audio_path = Path(audio_path)
+    if audio_path.suffix == ".npy":
+        return audio_path if audio_path.exists() else None
+    candidato = audio_path.with_name(ARQUIVO_16K)
+    # vocals.wav ou vocals.flac, conforme o formato escolhido na separação
+    if audio_path.stem != "vocals" or not candidato.exists():
+        return None
+    if audio_path.exists() and candidato.stat().st_mtime < audio_path.stat().st_mtime:
+        return None
+    return candidato
+
+
+def decodificar_ffmpeg(audio_path):
+    """Decodifica para mono 16 kHz float32 com ffmpeg (mesmo método do whisper.load_audio)."""
+    comando = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", str(audio_path),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-",
+    ]
+    try:
+        saida = subprocess.run(comando, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Falha ao decodificar áudio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(saida, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def carregar_audio_16k(audio_path):
+    """
+    Áudio mono 16 kHz float32 pronto para Whisper/WhisperX.
+
+    Usa o vocals_16k.npy (mmap copy-on-write: nada é copiado na leitura e o
+    arquivo nunca é alterado) quando disponível e só recorre ao ffmpeg se ele
+    não existir.
+    """
+    npy = buffer_16k(audio_path)
+    if npy is not None:
+        return np.load(npy, mmap_mode="c")
+    return decodificar_ffmpeg(audio_path)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+benchmark_alinhamento.py
+
+Compara os dois caminhos da etapa 4 (ver gerar_legenda_dinamica.py):
+- whisperx: alinhamento wav2vec das palavras do SRT
+- whisper:  tempos por palavra salvos pela etapa 3 (.tempos), sem
+            carregar modelo de alinhamento
+
+Mede a latência de cada caminho (incluindo a geração do .ass) e o erro de
+tempo do caminho rápido: diferença absoluta média de início/fim das palavras
+em comum, usando o WhisperX como referência. As palavras são pareadas pelo
+texto (difflib sobre a música inteira, não segmento a segmento, já que o
+WhisperX pode dividir ou juntar frases) e só contam se os tempos se
+sobrepõem.
+
+Uso:
+    python benchmarks/benchmark_alinhamento.py --nomes musica1 musica2
+    python benchmarks/benchmark_alinhamento.py --nomes musica1 --saida alinhamento.json
+"""
+
+import argparse
+import difflib
+import json
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from formatos_audio import VOCALS, caminho_faixa  # noqa: E402
+from gerar_legenda_base import IDIOMA_PADRAO  # noqa: E402
+from gerar_legenda_dinamica import (  # noqa: E402
+    alinhar_whisperx, gerar_arquivo_ass, tempos_do_srt, srt_para_segmentos,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Folga (s) na checagem de sobreposição: palavras curtas vizinhas com o mesmo
+# texto ainda são pareadas se os intervalos quase se tocam
+FOLGA_SOBREPOSICAO = 0.25
+
+
+def normalizar(palavra):
+    return "".join(re.findall(r"\w+", palavra.lower()))
+
+
+def _palavras(segmentos):
+    return [w for seg in segmentos for w in seg.get('words', []) if 'start' in w and 'end' in w]
+
+
+def _sobrepoe(a, b):
+    return a['start'] - FOLGA_SOBREPOSICAO <= b['end'] and b['start'] - FOLGA_SOBREPOSICAO <= a['end']
+
+
+def erro_tempo(referencia, hipotese):
+    """
+    Pareia as palavras das duas transcrições pelo texto normalizado
+    (difflib.SequenceMatcher sobre a música inteira), descarta os pares cujos
+    tempos não se sobrepõem e retorna (erro_medio_inicio, erro_medio_fim,
+    pareadas).
+    """
+    palavras_ref = _palavras(referencia['segments'])
+    palavras_hip = _palavras(hipotese.segmentos())
+    comparador = difflib.SequenceMatcher(None, [normalizar(w['word']) for w in palavras_ref],
+                                         [normalizar(w['word']) for w in palavras_hip], autojunk=False)
+    erros_inicio, erros_fim = [], []
+    for bloco in comparador.get_matching_blocks():
+        for k in range(bloco.size):
+            w_ref, w_hip = palavras_ref[bloco.a + k], palavras_hip[bloco.b + k]
+            if not _sobrepoe(w_ref, w_hip):
+                continue
+            erros_inicio.append(abs(w_ref['start'] - w_hip['start']))
+            erros_fim.append(abs(w_ref['end'] - w_hip['end']))
+    if not erros_inicio:
+        return None, None, 0
+    return (sum(erros_inicio) / len(erros_inicio), sum(erros_fim) / len(erros_fim), len(erros_inicio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do alinhamento da etapa 4 (whisperx x whisper).")
+    parser.add_argument("--nomes", nargs="+", required=True,
+                        help="Nomes base das músicas (usa os vocais de audio_separado/<nome>/ e subtitle_srt/<nome>.srt)")
+    parser.add_argument("--idioma", default=IDIOMA_PADRAO)
+    parser.add_argument("--saida", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome in args.nomes:
+            vocals = caminho_faixa(ROOT / "audio_separado" / nome, VOCALS)
+            srt_path = ROOT / "subtitle_srt" / f"{nome}.srt"
+            if vocals is None:
+                print(f"⚠️  {nome}: vocais não encontrados em audio_separado/{nome}/; pulando")
+                continue
+
+            inicio = time.perf_counter()
+            rapido = tempos_do_srt(srt_path)
+            if rapido is None:
+                print(f"⚠️  {nome}: sem .tempos válido (rode a etapa 3 de novo); pulando")
+                continue
+            gerar_arquivo_ass(rapido, Path(tmp) / f"{nome}_whisper.ass", salvar_tempos=False)
+            tempo_whisper = time.perf_counter() - inicio
+
+            # Na primeira música o tempo inclui a carga do modelo (depois ele fica no cache)
+            inicio = time.perf_counter()
+            referencia = alinhar_whisperx(str(vocals), srt_para_segmentos(srt_path), args.idioma)
+            gerar_arquivo_ass(referencia, Path(tmp) / f"{nome}_whisperx.ass", salvar_tempos=False)
+            tempo_whisperx = time.perf_counter() - inicio
+
+            erro_inicio, erro_fim, pareadas = erro_tempo(referencia, rapido)
+            resultados.append({
+                "nome": nome,
+                "tempo_whisperx": round(tempo_whisperx, 3),
+                "tempo_whisper": round(tempo_whisper, 3),
+                "erro_inicio_ms": None if erro_inicio is None else round(erro_inicio * 1000, 1),
+                "erro_fim_ms": None if erro_fim is None else round(erro_fim * 1000, 1),
+                "palavras_pareadas": pareadas,
+            })
+
+    print(f"\n{'='*72}")
+    print("🔗 ALINHAMENTO DA ETAPA 4 - whisperx x whisper")
+    print(f"{'='*72}")
+    for r in resultados:
+        erro = ("-" if r["erro_inicio_ms"] is None
+                else f"início {r['erro_inicio_ms']:.0f} ms / fim {r['erro_fim_ms']:.0f} ms")
+        print(f"  {r['nome']:<30} whisperx {r['tempo_whisperx']:7.2f}s | whisper {r['tempo_whisper']:6.3f}s "
+              f"| erro {erro} ({r['palavras_pareadas']} palavras)")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultados salvos em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
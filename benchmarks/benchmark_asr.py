@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+benchmark_asr.py
+
+Compara os motores de transcrição (ver motores_asr.py) num conjunto fixo de
+músicas: fator de tempo real (RTF = tempo de transcrição / duração do áudio)
+e deriva de palavras (WER do texto de cada motor contra o motor de
+referência, o openai-whisper).
+
+Uso:
+    python benchmarks/benchmark_asr.py --audios audio_separado/*/vocals.wav
+    python benchmarks/benchmark_asr.py --audios a.wav b.wav --threads 8 --batch 8
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerar_legenda_base import MODELO_PADRAO, IDIOMA_PADRAO, transcrever_audio  # noqa: E402
+from motores_asr import MOTORES  # noqa: E402
+from render_paralelo import duracao_audio  # noqa: E402
+
+REFERENCIA = "whisper"
+
+
+def normalizar(texto):
+    return re.findall(r"\w+", texto.lower())
+
+
+def wer(referencia, hipotese):
+    """Word error rate por distância de edição entre listas de palavras."""
+    if not referencia:
+        return 0.0 if not hipotese else 1.0
+    anterior = list(range(len(hipotese) + 1))
+    for i, palavra_ref in enumerate(referencia, 1):
+        atual = [i] + [0] * len(hipotese)
+        for j, palavra_hip in enumerate(hipotese, 1):
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1,
+                           anterior[j - 1] + (palavra_ref != palavra_hip))
+        anterior = atual
+    return anterior[-1] / len(referencia)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de transcrição (RTF e WER).")
+    parser.add_argument("--audios", nargs="+", required=True, help="Arquivos de áudio (ex.: vocals.wav)")
+    parser.add_argument("--motores", nargs="+", default=list(MOTORES), choices=list(MOTORES))
+    parser.add_argument("--modelo", default=MODELO_PADRAO, help=f"Tamanho do modelo (padrão: {MODELO_PADRAO})")
+    parser.add_argument("--idioma", default=IDIOMA_PADRAO)
+    parser.add_argument("--threads", type=int, default=None, help="faster-whisper: threads da CPU")
+    parser.add_argument("--batch", type=int, default=None, help="faster-whisper: tamanho do lote")
+    parser.add_argument("--saida", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    motores = list(args.motores)
+    if REFERENCIA not in motores:
+        motores.insert(0, REFERENCIA)
+
+    resultados = []
+    for audio in args.audios:
+        duracao = duracao_audio(audio)
+        textos = {}
+        for motor in motores:
+            # Na primeira música o tempo inclui a carga do modelo (depois ele fica no cache)
+            inicio = time.perf_counter()
+            segmentos = transcrever_audio(audio, model_size=args.modelo, idioma=args.idioma,
+                                          motor=motor, threads=args.threads, batch_size=args.batch)
+            decorrido = time.perf_counter() - inicio
+            textos[motor] = normalizar(" ".join(s["text"] for s in segmentos))
+            resultados.append({
+                "audio": str(audio),
+                "motor": motor,
+                "duracao": round(duracao, 2),
+                "tempo": round(decorrido, 2),
+                "rtf": round(decorrido / duracao, 3),
+                "palavras": len(textos[motor]),
+            })
+        for item in resultados[-len(motores):]:
+            item["wer_vs_referencia"] = round(wer(textos[REFERENCIA], textos[item["motor"]]), 3)
+
+    print(f"\n{'='*72}")
+    print(f"🎙️  MOTORES DE TRANSCRIÇÃO - modelo {args.modelo}")
+    print(f"{'='*72}")
+    for motor in motores:
+        itens = [r for r in resultados if r["motor"] == motor]
+        tempo = sum(r["tempo"] for r in itens)
+        duracao = sum(r["duracao"] for r in itens)
+        wer_medio = sum(r["wer_vs_referencia"] for r in itens) / len(itens)
+        print(f"  {motor:<15} RTF {tempo / duracao:6.3f} | WER vs {REFERENCIA}: {wer_medio:6.1%} "
+              f"| {tempo:.1f}s para {duracao:.0f}s de áudio")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultados salvos em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+benchmark_download.py
+
+Exercita o download em lote e o índice de downloads sem acessar o YouTube:
+gera WAVs sintéticos numa pasta temporária, serve-os por HTTP local (o
+extrator genérico do yt-dlp trata cada URL como um vídeo, com ID = nome do
+arquivo) e baixa tudo várias vezes com baixar_varios:
+
+- 1ª passada (--trim N): todos os itens baixados e cortados, com vazão por item
+- 2ª passada (sem corte): todos pulados, o download completo segue no índice
+- 3ª passada (outro corte): todos pulados, cortados do arquivo já baixado
+- 4ª passada (sem corte de novo): todos pulados pelo índice (extrator + ID)
+
+Uso:
+    python benchmarks/benchmark_download.py --itens 8 --paralelo 4
+    python benchmarks/benchmark_download.py --itens 4 --segundos 120 --saida download.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from arquivo_downloads import ArquivoDownloads  # noqa: E402
+from download_youtube_mp3 import baixar_varios  # noqa: E402
+
+SAMPLE_RATE = 44100
+
+
+def gerar_wav(caminho, segundos, frequencia):
+    t = np.arange(int(segundos * SAMPLE_RATE)) / SAMPLE_RATE
+    sinal = (0.3 * np.sin(2 * np.pi * frequencia * t) * 32767).astype("<i2")
+    with wave.open(str(caminho), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.repeat(sinal[:, None], 2, axis=1).tobytes())
+
+
+class _SemLog(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servir(pasta):
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_SemLog, directory=str(pasta)))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def passada(urls, paralelo, arquivo, trim=None):
+    inicio = time.perf_counter()
+    resultados = baixar_varios(urls, paralelo, trim, formato="nativo", arquivo=arquivo)
+    return resultados, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do download em lote com fonte local (sem rede).")
+    parser.add_argument("--itens", type=int, default=6, help="Quantidade de arquivos sintéticos (padrão: 6)")
+    parser.add_argument("--segundos", type=float, default=60, help="Duração de cada arquivo (padrão: 60)")
+    parser.add_argument("--trim", type=int, default=10, help="Corte da 1ª passada em segundos (padrão: 10)")
+    parser.add_argument("--paralelo", type=int, default=3, help="Downloads simultâneos (padrão: 3)")
+    parser.add_argument("--saida", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fonte = Path(tmp) / "fonte"
+        trabalho = Path(tmp) / "trabalho"
+        fonte.mkdir()
+        trabalho.mkdir()
+        for i in range(args.itens):
+            gerar_wav(fonte / f"musica_{i:02d}.wav", args.segundos, 220 + 20 * i)
+
+        servidor = servir(fonte)
+        porta = servidor.server_address[1]
+        urls = [f"http://127.0.0.1:{porta}/musica_{i:02d}.wav" for i in range(args.itens)]
+
+        # download_youtube_audio grava em ./audio: roda dentro da pasta temporária
+        cwd = os.getcwd()
+        os.chdir(trabalho)
+        try:
+            arquivo = ArquivoDownloads(trabalho / "audio" / ".downloads.json")
+            passadas = [
+                ("1ª passada", f"--trim {args.trim}", passada(urls, args.paralelo, arquivo, args.trim)),
+                ("2ª passada", "sem corte", passada(urls, args.paralelo, arquivo)),
+                ("3ª passada", f"--trim {args.trim * 2}", passada(urls, args.paralelo, arquivo, args.trim * 2)),
+                ("4ª passada", "sem corte", passada(urls, args.paralelo, arquivo)),
+            ]
+        finally:
+            os.chdir(cwd)
+            servidor.shutdown()
+
+    print(f"\n{'='*60}")
+    print("📥 DOWNLOAD EM LOTE - fonte HTTP local")
+    print(f"{'='*60}")
+    (rotulo, modo, (primeira, tempo_primeira)), *seguintes = passadas
+    baixados = sum(1 for r in primeira if not r["erro"] and not r["pulado"])
+    print(f"  {rotulo} ({modo}): {baixados}/{args.itens} baixados em {tempo_primeira:.2f}s")
+    ok = baixados == args.itens
+    for rotulo, modo, (resultados, tempo) in seguintes:
+        pulados = sum(1 for r in resultados if r["pulado"])
+        print(f"  {rotulo} ({modo}): {pulados}/{args.itens} pulados pelo índice em {tempo:.2f}s")
+        ok = ok and pulados == args.itens
+    if not ok:
+        print("  ⚠️  O índice não pulou todos os itens já baixados")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps({f"{rotulo} ({modo})": resultados
+                                                for rotulo, modo, (resultados, _) in passadas},
+                                               indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultados salvos em: {args.saida}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
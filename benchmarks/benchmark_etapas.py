@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+benchmark_etapas.py
+
+Benchmark offline de todas as etapas sobre as músicas sintéticas de
+fixtures_sinteticas.py (30 s a 20 min), na CPU e com os menores modelos:
+
+    separar          separar_faixas (Demucs)
+    transcrever      transcrever_audio + gerar_srt (Whisper)
+    legenda_karaoke  gerar_legenda_karaoke, caminho "whisper" (sem modelo de alinhamento)
+    combinar         combinar_faixas_instrumentais (pydub -> MP3)
+    video            criar_video_com_legenda (ffmpeg, x264)
+
+Cada fixture roda num processo novo, com a GPU escondida
+(CUDA_VISIBLE_DEVICES vazio), o Hugging Face em modo offline e conexões de
+rede para fora da máquina bloqueadas: os modelos precisam já estar no cache
+local (rode uma vez o pipeline com os mesmos modelos).
+
+A etapa legenda_karaoke recebe um SRT determinístico montado a partir das
+regiões com voz conhecidas da fixture (não do texto que o Whisper inventou
+sobre a voz sintética), para que o seu tamanho de entrada não varie entre
+execuções.
+
+Tempo de parede, CPU, pico de RSS e fator de tempo real vêm do
+perfil_etapas.py. Com --baseline, cada etapa/duração é comparada com um
+resultado salvo antes: fica marcada como regressão se o tempo ou o pico de
+memória passarem da tolerância (e o processo termina com código 1).
+
+Uso:
+    python benchmarks/benchmark_etapas.py --duracoes 30 120 --salvar-baseline benchmarks/baseline_etapas.json
+    python benchmarks/benchmark_etapas.py --duracoes 30 120 --baseline benchmarks/baseline_etapas.json
+"""
+
+import argparse
+import ipaddress
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures_sinteticas import DURACOES_PADRAO, gerar_fixture  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+ETAPAS = ("separar", "transcrever", "legenda_karaoke", "combinar", "video")
+TOLERANCIA_PADRAO = 0.25
+# Diferenças absolutas abaixo disso são ruído, mesmo acima da tolerância relativa
+MINIMO_SEGUNDOS = 0.5
+MINIMO_RSS_BYTES = 64 * 1024 * 1024
+AMBIENTE_OFFLINE = {
+    "CUDA_VISIBLE_DEVICES": "",
+    "HF_HUB_OFFLINE": "1",
+    "TRANSFORMERS_OFFLINE": "1",
+}
+
+
+def _bloquear_rede():
+    """Só permite conexões locais (loopback e sockets Unix): qualquer download falha na hora."""
+    conectar = socket.socket.connect
+    resolver = socket.getaddrinfo
+
+    def _local(host):
+        if host in (None, "localhost", ""):
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    def connect(self, endereco):
+        if self.family in (socket.AF_INET, socket.AF_INET6) and not _local(endereco[0]):
+            raise OSError(f"Rede bloqueada no benchmark offline: {endereco[0]}")
+        return conectar(self, endereco)
+
+    def getaddrinfo(host, *args, **kwargs):
+        if not _local(host):
+            raise OSError(f"Rede bloqueada no benchmark offline: {host}")
+        return resolver(host, *args, **kwargs)
+
+    socket.socket.connect = connect
+    socket.getaddrinfo = getaddrinfo
+
+
+def segmentos_das_regioes(regioes):
+    """Segmentos no formato do Whisper, um por região com voz, com palavras de duração igual."""
+    segmentos = []
+    for i, (inicio, fim) in enumerate(regioes):
+        palavras = ["la", "la", "lai", "a", "la", "le"][: max(1, int((fim - inicio) / 0.5))]
+        passo = (fim - inicio) / len(palavras)
+        segmentos.append({
+            "start": inicio,
+            "end": fim,
+            "text": " ".join(palavras),
+            "words": [{"word": f" {p}", "start": round(inicio + j * passo, 3),
+                       "end": round(inicio + (j + 1) * passo, 3), "probability": 1.0}
+                      for j, p in enumerate(palavras)],
+        })
+    return segmentos
+
+
+def _rodar_fixture(pasta, opcoes, fila):
+    """Roda num processo próprio: todas as etapas sobre uma fixture, medidas pelo perfil_etapas."""
+    if opcoes["bloquear_rede"]:
+        _bloquear_rede()
+
+    from formatos_audio import VOCALS, caminho_faixa
+    from gerar_legenda_base import gerar_srt, transcrever_audio
+    from gerar_legenda_dinamica import gerar_legenda_karaoke
+    from perfil_etapas import Perfilador
+    from separar_instrumental import separar_faixas
+    from video_karaoke_join_all import combinar_faixas_instrumentais, criar_video_com_legenda
+
+    pasta = Path(pasta)
+    mixagem = pasta / "mixture.wav"
+    regioes = json.loads((pasta / "regioes.json").read_text(encoding="utf-8"))["regioes"]
+    registros = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        separado = tmp / "separado"
+        srt_path = tmp / "letra.srt"
+        srt_regioes = tmp / "regioes.srt"
+        ass_path = tmp / "letra.ass"
+        instrumental = tmp / "instrumental.mp3"
+        perfil = Perfilador(tmp / "perfil", ao_registrar=registros.append)
+
+        def separar():
+            separar_faixas(str(mixagem), str(separado), model_name=opcoes["modelo_demucs"], device="cpu",
+                           num_threads=opcoes["threads"], salvar_16k=True, formato="pcm16")
+
+        def transcrever():
+            segmentos = transcrever_audio(str(caminho_faixa(separado, VOCALS)), model_size=opcoes["modelo_whisper"],
+                                          idioma=opcoes["idioma"], motor=opcoes["motor"], threads=opcoes["threads"])
+            gerar_srt(segmentos, str(srt_path))
+
+        def legenda_karaoke():
+            gerar_legenda_karaoke(str(caminho_faixa(separado, VOCALS)), str(srt_regioes), str(ass_path),
+                                  idioma=opcoes["idioma"], alinhamento="whisper")
+
+        def combinar():
+            combinar_faixas_instrumentais(separado, instrumental)
+
+        def video():
+            criar_video_com_legenda(instrumental, ass_path, tmp / "karaoke.mp4", opcoes["imagem"], encoder="x264")
+
+        funcoes = {"separar": separar, "transcrever": transcrever, "legenda_karaoke": legenda_karaoke,
+                   "combinar": combinar, "video": video}
+        for etapa in ETAPAS:
+            if etapa == "legenda_karaoke":
+                gerar_srt(segmentos_das_regioes(regioes), str(srt_regioes))
+            try:
+                with perfil.medir(pasta.name, etapa, mixagem):
+                    funcoes[etapa]()
+            except Exception:
+                break  # o erro já está no registro; as etapas seguintes dependem desta
+    fila.put(registros)
+
+
+def medir_fixture(pasta, opcoes):
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_rodar_fixture, args=(str(pasta), opcoes, fila))
+    processo.start()
+    # Lê antes do join (a fila precisa ser esvaziada para o processo terminar),
+    # sem travar se o processo morrer antes de responder
+    while True:
+        try:
+            registros = fila.get(timeout=1)
+            break
+        except queue.Empty:
+            if not processo.is_alive():
+                registros = [{"etapa": ETAPAS[0], "segundos": 0.0, "cpu_segundos": 0.0, "rss_pico_bytes": None,
+                              "rtf": None, "erro": f"processo terminou com código {processo.exitcode}"}]
+                break
+    processo.join()
+    return registros
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista de regressões: (duracao, etapa, metrica, atual, referencia)."""
+    referencia = {(r["duracao"], r["etapa"]): r for r in baseline["resultados"]}
+    regressoes = []
+    for r in resultados:
+        base = referencia.get((r["duracao"], r["etapa"]))
+        if base is None:
+            continue
+        if r["erro"] and not base["erro"]:
+            regressoes.append((r["duracao"], r["etapa"], "erro", r["erro"], None))
+            continue
+        for metrica, minimo in (("segundos", MINIMO_SEGUNDOS), ("rss_pico_bytes", MINIMO_RSS_BYTES)):
+            atual, anterior = r.get(metrica), base.get(metrica)
+            if atual is None or not anterior:
+                continue
+            if atual > anterior * (1 + tolerancia) and atual - anterior > minimo:
+                regressoes.append((r["duracao"], r["etapa"], metrica, atual, anterior))
+    return regressoes
+
+
+def main():
+    from gerar_legenda_base import IDIOMA_PADRAO
+    from motores_asr import MOTOR_PADRAO, MOTORES
+    from separar_instrumental import MODELO_DUAS_FAIXAS
+
+    parser = argparse.ArgumentParser(description="Benchmark offline das etapas sobre músicas sintéticas (CPU).")
+    parser.add_argument("--duracoes", nargs="+", type=int, default=list(DURACOES_PADRAO),
+                        help=f"Durações das fixtures em segundos (padrão: {' '.join(map(str, DURACOES_PADRAO))})")
+    parser.add_argument("--fixtures", default=str(ROOT / "benchmarks" / "fixtures"),
+                        help="Pasta das fixtures (geradas se faltarem)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--modelo-demucs", default=MODELO_DUAS_FAIXAS,
+                        help=f"Modelo Demucs (padrão: {MODELO_DUAS_FAIXAS}, 4 fontes)")
+    parser.add_argument("--modelo-whisper", default="tiny", help="Tamanho do Whisper (padrão: tiny)")
+    parser.add_argument("--motor", choices=list(MOTORES), default=MOTOR_PADRAO)
+    parser.add_argument("--idioma", default=IDIOMA_PADRAO)
+    parser.add_argument("--threads", type=int, default=None, help="Threads da CPU (padrão: todos os núcleos)")
+    parser.add_argument("--imagem", default=str(ROOT / "karaoke-hugo.jpg"), help="Imagem de fundo do vídeo")
+    parser.add_argument("--com-rede", action="store_true", help="Não bloqueia a rede (ex.: para baixar os modelos)")
+    parser.add_argument("--saida", default="resultados_etapas.json", help="Arquivo de resultados (JSON)")
+    parser.add_argument("--baseline", default=None, help="Resultado anterior para detectar regressões")
+    parser.add_argument("--salvar-baseline", default=None, help="Também grava este resultado como baseline")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help=f"Aumento relativo aceito de tempo/memória (padrão: {TOLERANCIA_PADRAO})")
+    args = parser.parse_args()
+
+    if not args.com_rede:
+        os.environ.update(AMBIENTE_OFFLINE)
+    else:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    opcoes = {
+        "modelo_demucs": args.modelo_demucs,
+        "modelo_whisper": args.modelo_whisper,
+        "motor": args.motor,
+        "idioma": args.idioma,
+        "threads": args.threads,
+        "imagem": args.imagem,
+        "bloquear_rede": not args.com_rede,
+    }
+
+    resultados = []
+    for duracao in args.duracoes:
+        pasta = Path(args.fixtures) / f"sintetica_{duracao}s"
+        print(f"🎼 Fixture de {duracao}s: {pasta}")
+        gerar_fixture(pasta, duracao, args.semente)
+        for registro in medir_fixture(pasta, opcoes):
+            resultados.append({
+                "duracao": duracao,
+                "etapa": registro["etapa"],
+                "segundos": registro["segundos"],
+                "cpu_segundos": registro["cpu_segundos"],
+                "rss_pico_bytes": registro["rss_pico_bytes"],
+                "rtf": registro["rtf"],
+                "erro": registro["erro"],
+            })
+
+    relatorio = {
+        "maquina": {"plataforma": platform.platform(), "processador": platform.processor(),
+                    "nucleos": os.cpu_count(), "python": platform.python_version()},
+        "opcoes": {k: v for k, v in opcoes.items() if k != "imagem"},
+        "semente": args.semente,
+        "resultados": resultados,
+    }
+
+    regressoes = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if baseline.get("maquina") != relatorio["maquina"]:
+            print("⚠️  A baseline foi gravada em outra máquina: compare com cuidado")
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+    marcadas = {(d, e) for d, e, *_ in regressoes}
+
+    print(f"\n{'='*84}")
+    print("🧪 ETAPAS - fixtures sintéticas, CPU, sem rede")
+    print(f"{'='*84}")
+    print(f"  {'duração':>8} {'etapa':<16} {'parede':>9} {'CPU':>9} {'RSS MB':>8} {'RTF':>8}")
+    for r in resultados:
+        marca = " ⚠️" if (r["duracao"], r["etapa"]) in marcadas else ""
+        if r["erro"]:
+            print(f"  {r['duracao']:>7}s {r['etapa']:<16} ❌ {r['erro']}{marca}")
+            continue
+        rss = "-" if r["rss_pico_bytes"] is None else f"{r['rss_pico_bytes'] / (1024 * 1024):.0f}"
+        rtf = "-" if r["rtf"] is None else f"{r['rtf']:.4f}"
+        print(f"  {r['duracao']:>7}s {r['etapa']:<16} {r['segundos']:8.2f}s {r['cpu_segundos']:8.2f}s "
+              f"{rss:>8} {rtf:>8}{marca}")
+
+    if regressoes:
+        print(f"\n⚠️  {len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}:")
+        for duracao, etapa, metrica, atual, anterior in regressoes:
+            print(f"   {duracao}s {etapa}: {metrica} {anterior} -> {atual}")
+
+    Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n💾 Resultados salvos em: {args.saida}")
+    if args.salvar_baseline:
+        Path(args.salvar_baseline).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"📌 Baseline salva em: {args.salvar_baseline}")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
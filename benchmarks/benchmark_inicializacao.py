@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+benchmark_inicializacao.py
+
+Custo de inicialização do pipeline_main.py, cada medição num processo novo:
+
+- --help:              tempo de parede do processo inteiro
+- etapa 5:             import do pipeline_main + o que a etapa 5 importa
+                       (não deve carregar nenhum framework de ML)
+- todas as etapas:     o que um processo que roda as 5 etapas importa
+                       (equivale ao import antigo, com tudo no topo)
+- etapa 5 real:        com --nome, roda `pipeline_main.py --etapa 5 --nome NOME`
+                       de verdade e confere os frameworks carregados no fim
+
+Termina com código 1 se algum cenário da etapa 5 carregar um framework.
+
+Uso:
+    python benchmarks/benchmark_inicializacao.py --repeticoes 5
+    python benchmarks/benchmark_inicializacao.py --nome minha_musica
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from relatorio_imports import FRAMEWORKS, IMPORTS_ETAPAS, medir_imports  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+_MARCA = "@@FRAMEWORKS@@"
+
+# Roda o pipeline_main como script e, ao sair (inclusive por sys.exit), informa os frameworks carregados
+_EXECUTAR_PIPELINE = """
+import json, runpy, sys
+sys.argv = {argv!r}
+sys.path.insert(0, {raiz!r})
+try:
+    runpy.run_path({script!r}, run_name="__main__")
+except SystemExit:
+    pass
+finally:
+    pacotes = {{nome.split(".")[0] for nome in sys.modules}}
+    print({marca!r} + json.dumps(sorted(pacotes & set({frameworks!r}))))
+"""
+
+
+def tempo_help(repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, str(ROOT / "pipeline_main.py"), "--help"],
+                       capture_output=True, check=True, cwd=str(ROOT))
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def etapa5_real(nome):
+    script = ROOT / "pipeline_main.py"
+    codigo = _EXECUTAR_PIPELINE.format(argv=[str(script), "--etapa", "5", "--nome", nome], raiz=str(ROOT),
+                                       script=str(script), marca=_MARCA, frameworks=list(FRAMEWORKS))
+    inicio = time.perf_counter()
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=str(ROOT))
+    decorrido = time.perf_counter() - inicio
+    for linha in reversed(saida.stdout.splitlines()):
+        if linha.startswith(_MARCA):
+            return decorrido, json.loads(linha[len(_MARCA):])
+    raise RuntimeError(f"Falha ao rodar a etapa 5: {saida.stderr.strip()[-500:]}")
+
+
+def _mediana(medicoes, campo):
+    return statistics.median(m[campo] for m in medicoes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da inicialização do pipeline_main.py.")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Processos por cenário (padrão: 3)")
+    parser.add_argument("--nome", default=None, help="Também roda a etapa 5 de verdade para esta música")
+    args = parser.parse_args()
+
+    todas = [m for modulos in IMPORTS_ETAPAS.values() for m in modulos]
+    etapa5 = [medir_imports(IMPORTS_ETAPAS["video"]) for _ in range(args.repeticoes)]
+    completo = [medir_imports(todas) for _ in range(args.repeticoes)]
+    falhou = False
+
+    print(f"\n{'='*78}")
+    print(f"🚀 INICIALIZAÇÃO DO PIPELINE (mediana de {args.repeticoes} processos)")
+    print(f"{'='*78}")
+    print(f"  --help (processo inteiro):  {tempo_help(args.repeticoes):6.2f}s")
+
+    frameworks = etapa5[0]["base_frameworks"] + etapa5[0]["frameworks"]
+    falhou |= bool(frameworks)
+    print(f"  etapa 5 (imports):          {_mediana(etapa5, 'base_segundos') + _mediana(etapa5, 'segundos'):6.2f}s "
+          f"| RSS {_mediana(etapa5, 'rss_mb'):5.0f} MB | frameworks: {', '.join(frameworks) or 'nenhum'}")
+
+    if completo[0]["erro"]:
+        print(f"  todas as etapas (imports):  ❌ {completo[0]['erro']}")
+    else:
+        print(f"  todas as etapas (imports):  "
+              f"{_mediana(completo, 'base_segundos') + _mediana(completo, 'segundos'):6.2f}s "
+              f"| RSS {_mediana(completo, 'rss_mb'):5.0f} MB | frameworks: {', '.join(completo[0]['frameworks'])}")
+
+    if args.nome:
+        decorrido, carregados = etapa5_real(args.nome)
+        falhou |= bool(carregados)
+        print(f"  etapa 5 real ({args.nome}): {decorrido:6.2f}s | frameworks: {', '.join(carregados) or 'nenhum'}")
+
+    if falhou:
+        print("\n❌ A etapa 5 carregou frameworks de ML")
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
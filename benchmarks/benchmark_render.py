@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+benchmark_render.py
+
+Compara o tempo de parede da etapa 5 em dois caminhos:
+- duas etapas: mixagem pydub -> MP3 temporário -> ffprobe -> ffmpeg
+- direto: um único ffmpeg recebendo as faixas WAV (amix + encode)
+
+Uso:
+    python benchmarks/benchmark_render.py --musica NOME [--repeticoes 3]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from video_karaoke_join_all import (  # noqa: E402
+    combinar_faixas_instrumentais,
+    criar_video_com_legenda,
+    criar_video_direto,
+    faixas_para_render,
+)
+
+
+def render_duas_etapas(pasta, legenda, imagem, saida_dir):
+    audio_temp = saida_dir / "instrumental.mp3"
+    combinar_faixas_instrumentais(pasta, audio_temp)
+    saida = saida_dir / "duas_etapas.mp4"
+    criar_video_com_legenda(audio_temp, legenda, saida, imagem)
+    audio_temp.unlink()
+    return saida
+
+
+def render_direto(pasta, legenda, imagem, saida_dir):
+    saida = saida_dir / "direto.mp4"
+    criar_video_direto(faixas_para_render(pasta), legenda, saida, imagem)
+    return saida
+
+
+def medir(funcao, repeticoes, *args):
+    tempos = []
+    saida = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, saida
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da etapa 5: duas etapas vs. ffmpeg único.")
+    parser.add_argument("--musica", required=True, help="Nome da música (audio_separado/NOME e subtitle_ass/NOME.ass)")
+    parser.add_argument("--imagem", default="karaoke-hugo.jpg", help="Imagem de fundo")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições de cada caminho (padrão: 3)")
+    args = parser.parse_args()
+
+    pasta = Path("audio_separado") / args.musica
+    legenda = Path("subtitle_ass") / f"{args.musica}.ass"
+    imagem = Path(args.imagem)
+    for caminho in (pasta, legenda, imagem):
+        if not caminho.exists():
+            print(f"❌ Não encontrado: {caminho}")
+            sys.exit(1)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        saida_dir = Path(tmp)
+        for nome, funcao in (("duas etapas", render_duas_etapas), ("direto", render_direto)):
+            tempos, saida = medir(funcao, args.repeticoes, pasta, legenda, imagem, saida_dir)
+            resultados[nome] = (tempos, saida.stat().st_size)
+
+    print(f"\n{'='*60}")
+    print(f"⏱️  ETAPA 5 - {args.musica} ({args.repeticoes} repetições)")
+    print(f"{'='*60}")
+    for nome, (tempos, tamanho) in resultados.items():
+        print(f"  {nome:<13} mediana {statistics.median(tempos):6.1f}s | "
+              f"mínimo {min(tempos):6.1f}s | {tamanho / 1024 / 1024:.1f} MB")
+    base = statistics.median(resultados["duas etapas"][0])
+    direto = statistics.median(resultados["direto"][0])
+    print(f"  Ganho do caminho direto: {base / max(direto, 1e-9):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+benchmark_separacao.py
+
+Compara configurações de separação (modelo Demucs e modo de duas faixas)
+nos mesmos trechos de teste:
+- tempo de carga do modelo e de separação (e fator de tempo real)
+- pico de memória: RSS do processo e, na GPU, VRAM alocada pelo torch
+- vazamento de voz no instrumental e SDR dos vocais, quando o trecho tem
+  os vocais de referência
+
+Cada trecho é uma pasta no layout do MUSDB18-HQ: `mixture.wav` (a mixagem)
+e, opcionalmente, `vocals.wav` (os vocais isolados, usados como referência).
+Cada medição roda num processo novo, para o pico de memória de um modelo
+não contaminar o do próximo.
+
+Vazamento (dB) = energia da projeção do instrumental estimado sobre os
+vocais de referência, relativa à energia do instrumental: quanto mais
+negativo, menos voz sobrou no instrumental.
+
+Uso:
+    python benchmarks/benchmark_separacao.py --clips testes/clip1 testes/clip2
+    python benchmarks/benchmark_separacao.py --clips testes/* --configs htdemucs_6s htdemucs:2 --device cpu
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from separar_instrumental import MODELO_DUAS_FAIXAS, MODELO_PADRAO  # noqa: E402
+
+# "modelo" = todas as fontes; "modelo:2" = modo de duas faixas
+CONFIGS_PADRAO = [MODELO_PADRAO, "htdemucs_ft", f"{MODELO_DUAS_FAIXAS}:2"]
+
+
+def _pico_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return pico / 1024 if sys.platform != "darwin" else pico / (1024 * 1024)
+
+
+def _carregar_mono(caminho, samplerate):
+    import torchaudio
+
+    audio, sr = torchaudio.load(str(caminho))
+    if sr != samplerate:
+        audio = torchaudio.functional.resample(audio, sr, samplerate)
+    return audio.mean(0).double()
+
+
+def metricas_vocais(referencia, vocais, instrumental):
+    """(vazamento_db, sdr_vocais_db) em sinais mono alinhados."""
+    n = min(len(referencia), len(vocais), len(instrumental))
+    referencia, vocais, instrumental = referencia[:n], vocais[:n], instrumental[:n]
+    energia_ref = float((referencia * referencia).sum()) + 1e-12
+    alpha = float((instrumental * referencia).sum()) / energia_ref
+    vazamento = 10 * math.log10(
+        (alpha * alpha * energia_ref + 1e-12) / (float((instrumental * instrumental).sum()) + 1e-12))
+    erro = referencia - vocais
+    sdr = 10 * math.log10(energia_ref / (float((erro * erro).sum()) + 1e-12))
+    return vazamento, sdr
+
+
+def _medir(config, clip, device, fila):
+    """Roda num processo próprio: separa um trecho com uma configuração e devolve as medidas."""
+    import torch
+    from demucs.pretrained import get_model
+
+    from cache_modelos import obter_modelo
+    from formatos_audio import INSTRUMENTAL, VOCALS, caminho_faixa
+    from render_paralelo import duracao_audio
+    from separar_instrumental import escolher_dispositivo, separar_faixas
+
+    modelo, _, modo = config.partition(":")
+    duas_faixas = modo == "2"
+    device = escolher_dispositivo(device)
+    mixagem = Path(clip) / "mixture.wav"
+
+    inicio = time.perf_counter()
+    model = obter_modelo("demucs", modelo, device, "float32", lambda: get_model(name=modelo).to(device))
+    carga = time.perf_counter() - inicio
+    if device == "cuda":
+        torch.cuda.reset_peak_memory_stats()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inicio = time.perf_counter()
+        separar_faixas(str(mixagem), tmp, model_name=modelo, device=device, gerar_instrumental=True,
+                       faixas=[VOCALS], duas_faixas=duas_faixas)
+        separacao = time.perf_counter() - inicio
+
+        resultado = {
+            "config": config,
+            "clip": str(clip),
+            "duracao": round(duracao_audio(mixagem), 2),
+            "carga": round(carga, 2),
+            "separacao": round(separacao, 2),
+            "pico_rss_mb": _pico_rss_mb(),
+            "pico_vram_mb": (torch.cuda.max_memory_allocated() / (1024 * 1024)) if device == "cuda" else None,
+            "vazamento_db": None,
+            "sdr_vocais_db": None,
+        }
+        resultado["rtf"] = round(separacao / resultado["duracao"], 3)
+
+        referencia = Path(clip) / "vocals.wav"
+        if referencia.exists():
+            sr = model.samplerate
+            vazamento, sdr = metricas_vocais(_carregar_mono(referencia, sr),
+                                             _carregar_mono(caminho_faixa(tmp, VOCALS), sr),
+                                             _carregar_mono(caminho_faixa(tmp, INSTRUMENTAL), sr))
+            resultado["vazamento_db"] = round(vazamento, 2)
+            resultado["sdr_vocais_db"] = round(sdr, 2)
+    fila.put(resultado)
+
+
+def medir_em_processo(config, clip, device):
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_medir, args=(config, clip, device, fila))
+    processo.start()
+    processo.join()
+    if processo.exitcode != 0:
+        return None
+    return fila.get()
+
+
+def _media(valores):
+    valores = [v for v in valores if v is not None]
+    return sum(valores) / len(valores) if valores else None
+
+
+def _fmt(valor, formato, vazio="-"):
+    return vazio if valor is None else format(valor, formato)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos modelos de separação (tempo, memória e vazamento).")
+    parser.add_argument("--clips", nargs="+", required=True,
+                        help="Pastas com mixture.wav (e opcionalmente vocals.wav de referência)")
+    parser.add_argument("--configs", nargs="+", default=CONFIGS_PADRAO,
+                        help=f"Modelos Demucs; sufixo :2 = modo de duas faixas (padrão: {' '.join(CONFIGS_PADRAO)})")
+    parser.add_argument("--device", choices=["cuda", "cpu"], default=None)
+    parser.add_argument("--saida", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    for config in args.configs:
+        for clip in args.clips:
+            print(f"▶️  {config} em {clip}...")
+            resultado = medir_em_processo(config, clip, args.device)
+            if resultado is None:
+                print(f"   ❌ Falhou: {config} em {clip}")
+                continue
+            resultados.append(resultado)
+
+    print(f"\n{'='*92}")
+    print("🎚️  SEPARAÇÃO - tempo, memória e vazamento de voz")
+    print(f"{'='*92}")
+    print(f"  {'config':<18} {'RTF':>6} {'carga':>7} {'RSS MB':>8} {'VRAM MB':>8} {'vazamento':>10} {'SDR voz':>8}")
+    for config in args.configs:
+        itens = [r for r in resultados if r["config"] == config]
+        if not itens:
+            continue
+        tempo = sum(r["separacao"] for r in itens)
+        duracao = sum(r["duracao"] for r in itens)
+        pico_rss = max((r["pico_rss_mb"] for r in itens if r["pico_rss_mb"] is not None), default=None)
+        pico_vram = max((r["pico_vram_mb"] for r in itens if r["pico_vram_mb"] is not None), default=None)
+        print(f"  {config:<18} {tempo / duracao:6.3f} {_media([r['carga'] for r in itens]):6.1f}s "
+              f"{_fmt(pico_rss, '8.0f', '       -')} {_fmt(pico_vram, '8.0f', '       -')} "
+              f"{_fmt(_media([r['vazamento_db'] for r in itens]), '8.1f', '       -')}dB "
+              f"{_fmt(_media([r['sdr_vocais_db'] for r in itens]), '6.1f', '     -')}dB")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultados salvos em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
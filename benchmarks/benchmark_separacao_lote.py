@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+benchmark_separacao_lote.py
+
+Escalonamento da separação em lote (separacao_lote.py) com o número de
+processos: separa o mesmo conjunto de músicas sintéticas com 1, 2, 4...
+processos e compara a vazão (músicas/hora) com a ideal (linear).
+
+As músicas são geradas por fixtures_sinteticas.py com sementes diferentes,
+então o conjunto é o mesmo em qualquer máquina.
+
+Uso:
+    python benchmarks/benchmark_separacao_lote.py --musicas 8 --duracao 60 --processos 1 2 4 8 --device cpu
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fixtures_sinteticas import gerar_fixture  # noqa: E402
+from separacao_lote import resumo_lote, separar_lote  # noqa: E402
+
+
+def preparar_musicas(pasta, quantidade, duracao):
+    """Uma fixture por semente, com o mixture.wav exposto como musica_<n>.wav numa pasta só."""
+    pasta = Path(pasta)
+    entrada = pasta / "entrada"
+    entrada.mkdir(parents=True, exist_ok=True)
+    musicas = []
+    for semente in range(quantidade):
+        fixture = pasta / "fixtures" / f"sintetica_{duracao}s_{semente}"
+        gerar_fixture(fixture, duracao, semente)
+        destino = entrada / f"musica_{semente:02d}.wav"
+        if not destino.exists():
+            try:
+                destino.hardlink_to(fixture / "mixture.wav")
+            except (AttributeError, OSError):  # Python < 3.10 ou outro sistema de arquivos
+                shutil.copy(fixture / "mixture.wav", destino)
+        musicas.append(destino)
+    return musicas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da separação em lote por número de processos.")
+    parser.add_argument("--musicas", type=int, default=8, help="Músicas no lote (padrão: 8)")
+    parser.add_argument("--duracao", type=int, default=60, help="Duração de cada música em segundos (padrão: 60)")
+    parser.add_argument("--processos", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--device", choices=["cuda", "cpu"], default=None)
+    parser.add_argument("--modelo", default=None, help="Modelo Demucs (padrão: o do separar_instrumental)")
+    parser.add_argument("--pasta", default=None, help="Pasta de trabalho (padrão: temporária)")
+    parser.add_argument("--saida", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    pasta = Path(args.pasta or tempfile.mkdtemp(prefix="benchmark_lote_"))
+    musicas = preparar_musicas(pasta, args.musicas, args.duracao)
+    opcoes = {"model_name": args.modelo} if args.modelo else {}
+
+    resultados = []
+    for processos in args.processos:
+        print(f"\n▶️  {processos} processo(s)")
+        saida = pasta / f"saida_{processos}"
+        shutil.rmtree(saida, ignore_errors=True)
+        resumo = resumo_lote(separar_lote(musicas, saida, processos=processos, device=args.device, opcoes=opcoes))
+        resultados.append(resumo)
+
+    base = resultados[0]
+    print(f"\n{'='*70}")
+    print(f"📊 ESCALONAMENTO ({args.musicas} músicas de {args.duracao}s)")
+    print(f"{'='*70}")
+    print(f"  {'processos':>9} {'parede':>9} {'músicas/h':>10} {'aceleração':>11} {'eficiência':>11} {'falhas':>7}")
+    for r in resultados:
+        aceleracao = r["musicas_por_hora"] / base["musicas_por_hora"] if base["musicas_por_hora"] else 0
+        ideal = r["processos"] / base["processos"]
+        print(f"  {r['processos']:>9} {r['segundos']:8.1f}s {r['musicas_por_hora']:10.1f} "
+              f"{aceleracao:10.2f}x {aceleracao / ideal:10.0%} {r['falhas']:>7}")
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+        print(f"\n💾 Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+fixtures_sinteticas.py
+
+Músicas sintéticas determinísticas para os benchmarks (sem rede, sem
+arquivos de terceiros): acompanhamento tonal (acordes, baixo, bumbo e
+chimbal) e uma "voz" harmônica com vibrato e formantes, presente só em
+trechos conhecidos (regiões com voz alternadas com silêncio vocal).
+
+Cada fixture é uma pasta no layout do MUSDB18-HQ, também aceita pelo
+benchmark_separacao.py:
+    mixture.wav   mixagem estéreo 44,1 kHz PCM 16 bits
+    vocals.wav    só a voz (referência)
+    regioes.json  duração, semente e regiões [inicio, fim] com voz
+
+O sinal é gerado em blocos de 10 s, então a memória não cresce com a
+duração, e é função só da semente e do tempo: a mesma semente e duração
+produzem os mesmos bytes em qualquer máquina.
+
+Uso:
+    python benchmarks/fixtures_sinteticas.py --duracoes 30 120 1200 --pasta benchmarks/fixtures
+"""
+
+import argparse
+import json
+import wave
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+BLOCO_SEGUNDOS = 10
+VERSAO = 1
+DURACOES_PADRAO = (30, 120, 300, 1200)
+
+# I-V-vi-IV em dó maior, um acorde a cada 2 s (frequências das tríades)
+ACORDES = (
+    (261.63, 329.63, 392.00),
+    (196.00, 246.94, 293.66),
+    (220.00, 261.63, 329.63),
+    (174.61, 220.00, 261.63),
+)
+SEGUNDOS_ACORDE = 2.0
+BATIDA = 0.5
+ESCALA = (261.63, 293.66, 329.63, 349.23, 392.00, 440.00, 493.88, 523.25)
+FORMANTES = ((700, 130), (1220, 200), (2600, 300))
+HARMONICOS = 10
+
+
+def regioes_voz(duracao, rng):
+    """Trechos [inicio, fim] com voz: 2-6 s de voz alternados com 1-4 s sem voz, após uma introdução."""
+    regioes = []
+    t = float(rng.uniform(2, 5))
+    while True:
+        fim = t + float(rng.uniform(2, 6))
+        if fim > duracao - 1:
+            break
+        regioes.append([round(t, 3), round(fim, 3)])
+        t = fim + float(rng.uniform(1, 4))
+    return regioes
+
+
+def _envelope_voz(t, regioes, rampa=0.03):
+    env = np.zeros_like(t)
+    for inicio, fim in regioes:
+        if fim < t[0] or inicio > t[-1]:
+            continue
+        env = np.maximum(env, np.clip(np.minimum(t - inicio, fim - t) / rampa, 0, 1))
+    return env
+
+
+def _acompanhamento(t, rng_bloco):
+    indice = (t // SEGUNDOS_ACORDE).astype(np.int64) % len(ACORDES)
+    acordes = np.array(ACORDES)[indice]
+    sinal = sum(0.06 * np.sin(2 * np.pi * acordes[:, i] * t) for i in range(3))
+    sinal = sinal + 0.12 * np.sin(np.pi * acordes[:, 0] * t)  # baixo: uma oitava abaixo da fundamental
+    fase_batida = t % BATIDA
+    sinal = sinal + 0.25 * np.sin(2 * np.pi * 55 * fase_batida) * np.exp(-fase_batida * 30)
+    chimbal = rng_bloco.standard_normal(len(t))
+    chimbal = np.diff(chimbal, prepend=0.0)  # passa-altas simples
+    fase_chimbal = (t + BATIDA / 2) % BATIDA
+    return sinal + 0.03 * chimbal * np.exp(-fase_chimbal * 60)
+
+
+def _ganho_harmonicos(f0):
+    """Ganho de cada harmônico pelas formantes (vogal 'a' aproximada)."""
+    ganhos = []
+    for k in range(1, HARMONICOS + 1):
+        f = k * f0
+        ganho = sum(np.exp(-0.5 * ((f - centro) / largura) ** 2) for centro, largura in FORMANTES)
+        ganhos.append((0.2 + ganho) / k)
+    return ganhos
+
+
+def gerar_fixture(pasta, duracao, semente=0):
+    """
+    Gera (ou reaproveita, se já existir com os mesmos parâmetros) uma fixture.
+
+    Returns:
+        dict: metadados de regioes.json
+    """
+    pasta = Path(pasta)
+    metadados_path = pasta / "regioes.json"
+    if metadados_path.exists() and (pasta / "mixture.wav").exists() and (pasta / "vocals.wav").exists():
+        metadados = json.loads(metadados_path.read_text(encoding="utf-8"))
+        if (metadados.get("versao"), metadados.get("duracao"), metadados.get("semente")) == (VERSAO, duracao, semente):
+            return metadados
+
+    pasta.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semente)
+    regioes = regioes_voz(duracao, rng)
+    notas = np.array(ESCALA)[rng.integers(0, len(ESCALA), int(np.ceil(duracao / BATIDA)) + 1)]
+
+    total = int(duracao * SAMPLE_RATE)
+    fase = 0.0
+    with wave.open(str(pasta / "mixture.wav"), "wb") as mix, wave.open(str(pasta / "vocals.wav"), "wb") as voz:
+        for arquivo in (mix, voz):
+            arquivo.setnchannels(2)
+            arquivo.setsampwidth(2)
+            arquivo.setframerate(SAMPLE_RATE)
+        bloco = BLOCO_SEGUNDOS * SAMPLE_RATE
+        for indice, inicio in enumerate(range(0, total, bloco)):
+            t = np.arange(inicio, min(inicio + bloco, total)) / SAMPLE_RATE
+            rng_bloco = np.random.default_rng([semente, indice])
+
+            f0 = notas[(t // BATIDA).astype(np.int64)] * (1 + 0.01 * np.sin(2 * np.pi * 5.5 * t))
+            fases = fase + 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+            fase = float(fases[-1] % (2 * np.pi))
+            vocal = sum(g * np.sin(k * fases) for k, g in enumerate(_ganho_harmonicos(f0), 1))
+            vocal = 0.25 * vocal * _envelope_voz(t, regioes)
+
+            acompanhamento = _acompanhamento(t, rng_bloco)
+            # acompanhamento levemente aberto no estéreo, voz no centro
+            esquerda = vocal + acompanhamento * 0.9
+            direita = vocal + acompanhamento * 1.1
+
+            mix.writeframes(_pcm16(np.stack([esquerda, direita], axis=1)))
+            voz.writeframes(_pcm16(np.stack([vocal, vocal], axis=1)))
+
+    metadados = {"versao": VERSAO, "duracao": duracao, "semente": semente, "sample_rate": SAMPLE_RATE,
+                 "regioes": regioes, "segundos_voz": round(sum(f - i for i, f in regioes), 3)}
+    metadados_path.write_text(json.dumps(metadados, indent=2), encoding="utf-8")
+    return metadados
+
+
+def _pcm16(audio):
+    return (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def gerar_conjunto(pasta, duracoes=DURACOES_PADRAO, semente=0):
+    """Gera uma fixture por duração em <pasta>/sintetica_<duracao>s. Retorna {duracao: pasta}."""
+    fixtures = {}
+    for duracao in duracoes:
+        destino = Path(pasta) / f"sintetica_{duracao}s"
+        gerar_fixture(destino, duracao, semente)
+        fixtures[duracao] = destino
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera músicas sintéticas determinísticas para os benchmarks.")
+    parser.add_argument("--duracoes", nargs="+", type=int, default=list(DURACOES_PADRAO),
+                        help=f"Durações em segundos (padrão: {' '.join(map(str, DURACOES_PADRAO))})")
+    parser.add_argument("--pasta", default="benchmarks/fixtures", help="Pasta de saída (padrão: benchmarks/fixtures)")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    for duracao, pasta in gerar_conjunto(args.pasta, args.duracoes, args.semente).items():
+        metadados = json.loads((pasta / "regioes.json").read_text(encoding="utf-8"))
+        print(f"🎼 {pasta}: {duracao}s, {len(metadados['regioes'])} trechos com voz "
+              f"({metadados['segundos_voz']:.0f}s)")
+
+
+if __name__ == "__main__":
+    main()
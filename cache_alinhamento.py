@@ -0,0 +1,83 @@
+"""
+cache_alinhamento.py
+
+Cache do alinhamento WhisperX por segmento, para reaplicar correções feitas
+à mão no .srt sem realinhar a música inteira.
+
+O whisperx.align alinha cada segmento só com o trecho de áudio da sua janela
+[start, end], então o resultado de um segmento depende apenas do texto, da
+janela, desse trecho de áudio e do modelo (idioma). A chave de cada segmento
+é o hash desses quatro; numa nova execução, só os segmentos novos ou
+alterados passam pelo alinhador e, se nenhum mudou, o modelo nem é carregado.
+
+O cache fica ao lado do .ass (<nome>.alinhamento.json) e, ao ser salvo,
+guarda só os segmentos da legenda atual.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from audio_16k import SAMPLE_RATE
+
+VERSAO = 1
+SUFIXO = ".alinhamento.json"
+
+
+def caminho_cache_alinhamento(ass_path):
+    """Arquivo de cache correspondente a um .ass."""
+    ass_path = Path(ass_path)
+    return ass_path.with_name(ass_path.stem + SUFIXO)
+
+
+def chave_segmento(segmento, audio, idioma):
+    """Hash do texto, da janela de tempo (ms), do idioma e das amostras de áudio da janela."""
+    inicio, fim = float(segmento["start"]), float(segmento["end"])
+    # Mesmo recorte que o whisperx.align faz: audio[int(t1 * SR):int(t2 * SR)]
+    janela = np.ascontiguousarray(audio[int(inicio * SAMPLE_RATE):int(fim * SAMPLE_RATE)], dtype=np.float32)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{VERSAO}\0{idioma}\0{inicio:.3f}\0{fim:.3f}\0{segmento['text']}\0".encode("utf-8"))
+    h.update(janela.tobytes())
+    return h.hexdigest()
+
+
+def _json(valor):
+    """Converte os escalares NumPy que o WhisperX pode devolver."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+class CacheAlinhamento:
+    """Segmentos alinhados por chave de segmento (cada segmento pode virar vários no WhisperX)."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._segmentos = {}
+        if self.caminho.exists():
+            try:
+                dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                dados = {}
+            if dados.get("versao") == VERSAO:
+                self._segmentos = dados.get("segmentos", {})
+
+    def __contains__(self, chave):
+        return chave in self._segmentos
+
+    def __getitem__(self, chave):
+        return self._segmentos[chave]
+
+    def guardar(self, chave, alinhados):
+        self._segmentos[chave] = alinhados
+
+    def salvar(self, chaves):
+        """Grava só as `chaves` (os segmentos da legenda atual), de forma atômica."""
+        dados = {"versao": VERSAO, "segmentos": {c: self._segmentos[c] for c in chaves if c in self._segmentos}}
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(".tmp")
+        temporario.write_text(json.dumps(dados, ensure_ascii=False, default=_json), encoding="utf-8")
+        os.replace(temporario, self.caminho)
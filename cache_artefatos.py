@@ -0,0 +1,159 @@
+"""
+cache_artefatos.py
+
+Cache de artefatos endereçado por conteúdo: cada etapa do pipeline grava um
+manifesto com o hash dos arquivos de entrada e os parâmetros que afetam o
+resultado (modelo, idioma, imagem, encoder...). Numa nova execução, a etapa
+é pulada se a chave calculada for igual à do manifesto e as saídas existirem.
+
+Os manifestos ficam em .manifestos/<nome_base>/<etapa>.json.
+
+Para não reler arquivos grandes a cada execução, o manifesto também guarda
+tamanho e mtime de cada entrada; se ambos não mudaram, o hash anterior é
+reaproveitado.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+MANIFESTOS_DIR = Path(os.environ.get("KARAOKE_MANIFESTOS", ".manifestos"))
+VERSAO = 1
+
+_ativo = True
+_hashes = {}  # (caminho, tamanho, mtime_ns) -> sha256
+_lock = threading.Lock()
+
+
+def definir_cache_ativo(ativo):
+    """Liga/desliga o cache (desligado, todas as etapas são recalculadas)."""
+    global _ativo
+    _ativo = bool(ativo)
+
+
+def cache_ativo():
+    return _ativo
+
+
+def _assinatura(caminho):
+    st = Path(caminho).stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def hash_arquivo(caminho, anteriores=None):
+    """
+    SHA-256 do conteúdo do arquivo.
+
+    Args:
+        anteriores (dict): Entradas de um manifesto anterior ({caminho: {tamanho, mtime_ns, sha256}})
+            usadas para evitar reler arquivos que não mudaram.
+    """
+    caminho = str(caminho)
+    tamanho, mtime = _assinatura(caminho)
+
+    anterior = (anteriores or {}).get(caminho)
+    if anterior and anterior.get("tamanho") == tamanho and anterior.get("mtime_ns") == mtime:
+        return anterior["sha256"]
+
+    chave = (caminho, tamanho, mtime)
+    with _lock:
+        if chave in _hashes:
+            return _hashes[chave]
+
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    digest = h.hexdigest()
+    with _lock:
+        _hashes[chave] = digest
+    return digest
+
+
+def _descrever_entradas(entradas, anteriores=None):
+    descricao = {}
+    for entrada in entradas:
+        tamanho, mtime = _assinatura(entrada)
+        descricao[str(entrada)] = {
+            "tamanho": tamanho,
+            "mtime_ns": mtime,
+            "sha256": hash_arquivo(entrada, anteriores),
+        }
+    return descricao
+
+
+def _calcular_chave(etapa, entradas_desc, parametros):
+    conteudo = {
+        "versao": VERSAO,
+        "etapa": etapa,
+        # a chave depende só do conteúdo, não do caminho das entradas
+        "entradas": sorted(e["sha256"] for e in entradas_desc.values()),
+        "parametros": parametros,
+    }
+    texto = json.dumps(conteudo, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def caminho_manifesto(nome_base, etapa):
+    return MANIFESTOS_DIR / nome_base / f"{etapa}.json"
+
+
+def ler_manifesto(nome_base, etapa):
+    caminho = caminho_manifesto(nome_base, etapa)
+    if not caminho.exists():
+        return None
+    try:
+        return json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def etapa_em_dia(nome_base, etapa, entradas, parametros, saidas):
+    """True se o manifesto da etapa tem a mesma chave e todas as saídas existem."""
+    if not _ativo:
+        return False
+    manifesto = ler_manifesto(nome_base, etapa)
+    if not manifesto:
+        return False
+    if not all(Path(s).exists() for s in saidas):
+        return False
+    if any(not Path(e).exists() for e in entradas):
+        return False
+    entradas_desc = _descrever_entradas(entradas, manifesto.get("entradas"))
+    return manifesto.get("chave") == _calcular_chave(etapa, entradas_desc, parametros)
+
+
+def registrar_manifesto(nome_base, etapa, entradas, parametros, saidas):
+    """Grava o manifesto da etapa depois que as saídas foram produzidas."""
+    entradas_desc = _descrever_entradas(entradas)
+    manifesto = {
+        "versao": VERSAO,
+        "etapa": etapa,
+        "chave": _calcular_chave(etapa, entradas_desc, parametros),
+        "entradas": entradas_desc,
+        "parametros": parametros,
+        "saidas": [str(s) for s in saidas],
+    }
+    caminho = caminho_manifesto(nome_base, etapa)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(".tmp")
+    temporario.write_text(json.dumps(manifesto, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+    os.replace(temporario, caminho)
+    return manifesto
+
+
+def executar_etapa(nome_base, etapa, entradas, parametros, saidas, funcao):
+    """
+    Executa `funcao()` apenas se a etapa não estiver em dia e grava o manifesto.
+
+    Returns:
+        bool: True se a etapa foi executada, False se foi pulada pelo cache.
+    """
+    if etapa_em_dia(nome_base, etapa, entradas, parametros, saidas):
+        print(f"  ⏭️  [{nome_base}] {etapa}: entradas e parâmetros inalterados, usando artefato em cache")
+        return False
+    funcao()
+    registrar_manifesto(nome_base, etapa, entradas, parametros, saidas)
+    return True
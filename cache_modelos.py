@@ -0,0 +1,183 @@
+"""
+cache_modelos.py
+
+Registro compartilhado de modelos (Whisper, Demucs, alinhador WhisperX) para
+manter os modelos carregados entre uma música e outra no mesmo processo.
+
+Os modelos são identificados pela chave (tipo, nome, dispositivo, dtype).
+Quando a soma dos tamanhos estimados passa do orçamento de memória, o modelo
+usado há mais tempo é descartado (LRU).
+
+O orçamento pode ser definido pela variável de ambiente KARAOKE_CACHE_MODELOS_MB
+ou por definir_orcamento(). Valor 0 (padrão) significa sem limite.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _estimar_bytes(objeto):
+    """Estima a memória ocupada por um modelo somando parâmetros e buffers do torch."""
+    if isinstance(objeto, (tuple, list)):
+        return sum(_estimar_bytes(item) for item in objeto)
+    if isinstance(objeto, dict):
+        return sum(_estimar_bytes(item) for item in objeto.values())
+
+    total = 0
+    for metodo in ("parameters", "buffers"):
+        iterador = getattr(objeto, metodo, None)
+        if callable(iterador):
+            try:
+                total += sum(t.numel() * t.element_size() for t in iterador())
+            except TypeError:
+                pass
+    return total
+
+
+def _liberar_memoria_acelerador():
+    """Devolve ao driver a memória de GPU liberada (só se o torch já foi importado)."""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class CacheModelos:
+    """Cache LRU de modelos com orçamento de memória e estatísticas de uso."""
+
+    def __init__(self, orcamento_mb=0):
+        self._modelos = OrderedDict()  # chave -> (modelo, bytes)
+        self._lock = threading.RLock()
+        self._locks_carga = {}
+        self.orcamento_bytes = int(orcamento_mb * 1024 * 1024)
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+        self.tempo_carga = {}  # chave -> segundos gastos carregando
+
+    def obter(self, tipo, nome, dispositivo, dtype, carregador):
+        """
+        Retorna o modelo da chave (tipo, nome, dispositivo, dtype), carregando-o
+        com `carregador()` apenas se ainda não estiver no cache.
+        """
+        chave = (tipo, str(nome), str(dispositivo), str(dtype))
+
+        with self._lock:
+            if chave in self._modelos:
+                self._modelos.move_to_end(chave)
+                self.acertos += 1
+                return self._modelos[chave][0]
+            lock_carga = self._locks_carga.setdefault(chave, threading.Lock())
+
+        # Um lock por chave: threads pedindo o mesmo modelo esperam a mesma carga,
+        # enquanto modelos diferentes podem ser carregados em paralelo.
+        with lock_carga:
+            with self._lock:
+                if chave in self._modelos:
+                    self._modelos.move_to_end(chave)
+                    self.acertos += 1
+                    return self._modelos[chave][0]
+
+            inicio = time.perf_counter()
+            modelo = carregador()
+            duracao = time.perf_counter() - inicio
+            tamanho = _estimar_bytes(modelo)
+
+            with self._lock:
+                self.faltas += 1
+                self.tempo_carga[chave] = self.tempo_carga.get(chave, 0.0) + duracao
+                self._modelos[chave] = (modelo, tamanho)
+                self._descartar_excedente(preservar=chave)
+
+        print(f"   ⏳ Modelo {tipo}/{nome} ({dispositivo}) carregado em {duracao:.1f}s "
+              f"(~{tamanho / 1024 / 1024:.0f} MB)")
+        return modelo
+
+    def _descartar_excedente(self, preservar=None):
+        """Remove os modelos menos usados até caber no orçamento."""
+        if self.orcamento_bytes <= 0:
+            return
+        descartou = False
+        while self.memoria_usada() > self.orcamento_bytes:
+            candidatas = [c for c in self._modelos if c != preservar]
+            if not candidatas:
+                break
+            chave = candidatas[0]
+            del self._modelos[chave]
+            self.descartes += 1
+            descartou = True
+            print(f"   ♻️  Modelo descartado do cache: {chave[0]}/{chave[1]} ({chave[2]})")
+        if descartou:
+            _liberar_memoria_acelerador()
+
+    def memoria_usada(self):
+        """Soma dos tamanhos estimados dos modelos residentes, em bytes."""
+        with self._lock:
+            return sum(tamanho for _, tamanho in self._modelos.values())
+
+    def definir_orcamento(self, orcamento_mb):
+        """Altera o orçamento de memória (MB). 0 desativa o limite."""
+        with self._lock:
+            self.orcamento_bytes = int(orcamento_mb * 1024 * 1024)
+            self._descartar_excedente()
+
+    def limpar(self):
+        """Descarta todos os modelos residentes."""
+        with self._lock:
+            self._modelos.clear()
+        _liberar_memoria_acelerador()
+
+    def estatisticas(self):
+        """Retorna um dicionário com acertos, faltas, descartes e tempos de carga."""
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "descartes": self.descartes,
+                "residentes": [
+                    {"tipo": c[0], "nome": c[1], "dispositivo": c[2], "dtype": c[3],
+                     "mb": round(tamanho / 1024 / 1024, 1)}
+                    for c, (_, tamanho) in self._modelos.items()
+                ],
+                "memoria_mb": round(self.memoria_usada() / 1024 / 1024, 1),
+                "tempo_carga_total": round(sum(self.tempo_carga.values()), 2),
+                "tempo_carga": {"/".join(c): round(t, 2) for c, t in self.tempo_carga.items()},
+            }
+
+
+# ========== INSTÂNCIA COMPARTILHADA DO PROCESSO ==========
+_cache = CacheModelos(orcamento_mb=float(os.environ.get("KARAOKE_CACHE_MODELOS_MB", "0")))
+
+
+def obter_modelo(tipo, nome, dispositivo, dtype, carregador):
+    """Atalho para o cache compartilhado do processo (ver CacheModelos.obter)."""
+    return _cache.obter(tipo, nome, dispositivo, dtype, carregador)
+
+
+def definir_orcamento(orcamento_mb):
+    _cache.definir_orcamento(orcamento_mb)
+
+
+def limpar_cache():
+    _cache.limpar()
+
+
+def estatisticas_cache():
+    return _cache.estatisticas()
+
+
+def imprimir_estatisticas_cache():
+    """Imprime um resumo de acertos/faltas e tempo gasto carregando modelos."""
+    est = estatisticas_cache()
+    if not est["acertos"] and not est["faltas"]:
+        return
+    print("\n📦 Cache de modelos:")
+    print(f"   Acertos: {est['acertos']} | Faltas: {est['faltas']} | Descartes: {est['descartes']}")
+    print(f"   Tempo total carregando modelos: {est['tempo_carga_total']:.1f}s")
+    print(f"   Memória residente estimada: {est['memoria_mb']:.0f} MB")
+    for chave, segundos in est["tempo_carga"].items():
+        print(f"   - {chave}: {segundos:.1f}s")
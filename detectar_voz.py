@@ -0,0 +1,125 @@
+"""
+detectar_voz.py
+
+Detecção de atividade de voz (VAD) por energia, vetorizada em NumPy, para
+a faixa de vocais separada pelo Demucs.
+
+Na faixa vocals.wav as introduções, solos e finais são praticamente
+silêncio. Transcrever esses trechos custa tempo de decodificação e faz o
+Whisper "alucinar" texto. Aqui os trechos com voz são detectados, concatenados
+(com um pequeno silêncio entre eles) e só esse áudio vai para o Whisper; os
+tempos do resultado são depois remapeados para o tempo da música.
+"""
+
+import bisect
+
+import numpy as np
+
+QUADRO_MS = 30
+LIMIAR_RELATIVO_DB = -35.0   # abaixo dos quadros mais fortes da faixa
+LIMIAR_ABSOLUTO_DB = -55.0   # piso em dBFS: nada abaixo disso conta como voz
+PADDING_SEGUNDOS = 0.3
+JUNTAR_GAP_SEGUNDOS = 0.8
+DURACAO_MINIMA_SEGUNDOS = 0.2
+SILENCIO_ENTRE_REGIOES = 0.5
+
+
+def energia_db(audio, sr, quadro_ms=QUADRO_MS):
+    """Energia RMS (dBFS) por quadro, sem laços em Python."""
+    tamanho = max(1, int(sr * quadro_ms / 1000))
+    n_quadros = len(audio) // tamanho
+    if n_quadros == 0:
+        return np.zeros(0, dtype=np.float32), tamanho
+    quadros = np.asarray(audio[:n_quadros * tamanho], dtype=np.float32).reshape(n_quadros, tamanho)
+    rms = np.sqrt(np.mean(quadros * quadros, axis=1))
+    return 20 * np.log10(rms + 1e-10), tamanho
+
+
+def detectar_regioes_voz(audio, sr, quadro_ms=QUADRO_MS, limiar_relativo_db=LIMIAR_RELATIVO_DB,
+                         limiar_absoluto_db=LIMIAR_ABSOLUTO_DB, padding=PADDING_SEGUNDOS,
+                         juntar_gap=JUNTAR_GAP_SEGUNDOS, duracao_minima=DURACAO_MINIMA_SEGUNDOS):
+    """
+    Encontra os trechos com voz de um sinal mono.
+
+    Args:
+        audio (np.ndarray): Amostras mono em float.
+        sr (int): Taxa de amostragem.
+        padding (float): Margem (s) acrescentada antes e depois de cada trecho.
+        juntar_gap (float): Trechos separados por menos que isso (s) são unidos.
+        duracao_minima (float): Trechos com voz mais curtos que isso (s) são descartados.
+
+    Returns:
+        list: [(inicio, fim)] em segundos, ordenados e sem sobreposição.
+    """
+    db, tamanho = energia_db(audio, sr, quadro_ms)
+    if db.size == 0:
+        return []
+
+    limiar = max(limiar_absoluto_db, float(np.percentile(db, 99)) + limiar_relativo_db)
+    ativo = (db > limiar).astype(np.int8)
+
+    # Bordas de subida/descida da máscara -> início/fim de cada trecho em quadros
+    bordas = np.diff(np.concatenate(([0], ativo, [0])))
+    inicios = np.flatnonzero(bordas == 1)
+    fins = np.flatnonzero(bordas == -1)
+
+    segundos_por_quadro = tamanho / sr
+    inicios = inicios * segundos_por_quadro
+    fins = fins * segundos_por_quadro
+    mantidos = (fins - inicios) >= duracao_minima
+    inicios, fins = inicios[mantidos], fins[mantidos]
+
+    duracao_total = len(audio) / sr
+    regioes = []
+    for inicio, fim in zip(np.maximum(inicios - padding, 0.0), np.minimum(fins + padding, duracao_total)):
+        if regioes and inicio - regioes[-1][1] <= juntar_gap:
+            regioes[-1][1] = max(regioes[-1][1], float(fim))
+        else:
+            regioes.append([float(inicio), float(fim)])
+    return [tuple(r) for r in regioes]
+
+
+def concatenar_regioes(audio, sr, regioes, silencio=SILENCIO_ENTRE_REGIOES):
+    """
+    Junta os trechos com voz num único buffer, com `silencio` segundos entre eles.
+
+    Returns:
+        tuple: (audio_concatenado, mapa) onde mapa é [(inicio_no_buffer, inicio_na_musica, duracao)].
+    """
+    pedacos = []
+    mapa = []
+    posicao = 0.0
+    pausa = np.zeros(int(silencio * sr), dtype=audio.dtype)
+    for i, (inicio, fim) in enumerate(regioes):
+        trecho = audio[int(inicio * sr):int(fim * sr)]
+        if i:
+            pedacos.append(pausa)
+            posicao += len(pausa) / sr
+        pedacos.append(trecho)
+        mapa.append((posicao, inicio, len(trecho) / sr))
+        posicao += len(trecho) / sr
+    if not pedacos:
+        return np.zeros(0, dtype=audio.dtype), []
+    return np.concatenate(pedacos), mapa
+
+
+def remapear_tempo(t, mapa):
+    """Converte um tempo do buffer concatenado para o tempo da música."""
+    if not mapa:
+        return t
+    inicios = [m[0] for m in mapa]
+    i = max(0, bisect.bisect_right(inicios, t) - 1)
+    inicio_buffer, inicio_musica, duracao = mapa[i]
+    # Tempos que caem no silêncio inserido ficam presos ao fim do trecho anterior
+    return inicio_musica + min(max(t - inicio_buffer, 0.0), duracao)
+
+
+def remapear_segmentos(segmentos, mapa):
+    """Remapeia start/end dos segmentos do Whisper (e de suas palavras) para o tempo da música."""
+    for seg in segmentos:
+        seg['start'] = remapear_tempo(seg['start'], mapa)
+        seg['end'] = remapear_tempo(seg['end'], mapa)
+        for palavra in seg.get('words') or []:
+            palavra['start'] = remapear_tempo(palavra['start'], mapa)
+            palavra['end'] = remapear_tempo(palavra['end'], mapa)
+    return segmentos
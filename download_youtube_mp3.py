@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
 """download_youtube_mp3.py
-Baixa apenas o áudio de um vídeo do YouTube em formato MP3.
+Baixa apenas o áudio de um vídeo do YouTube em formato MP3 ou, no modo
+nativo, no contêiner original do stream (opus/webm, m4a), sem recodificar.
+Downloads já feitos ficam num índice por extrator + ID (arquivo_downloads.py)
+e não são refeitos; várias URLs ou uma playlist (--playlist) são baixadas
+em paralelo (--paralelo N) com relatório de vazão por item.
 Requisitos: pip install yt_dlp ; ffmpeg no PATH
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from yt_dlp import YoutubeDL
+import subprocess
 import sys
-from pydub import AudioSegment
+import time
+
+from arquivo_downloads import ArquivoDownloads, chave_download
+
+# "nativo" mantém o áudio como o YouTube entrega (as etapas seguintes
+# decodificam para PCM de qualquer forma); "mp3" recodifica para MP3 128k
+FORMATOS_DOWNLOAD = ("nativo", "mp3")
 
 def progress_hook(d):
     status = d.get('status')
@@ -23,62 +34,219 @@ def progress_hook(d):
     elif status == 'finished':
         print(f"\nConcluído: {d.get('filename')}")
 
-def download_youtube_audio(video_url: str, trim_seconds: int = None) -> str:
-    """
-    Baixa o áudio de um vídeo do YouTube e salva em 'audio/'.
-    Se trim_seconds for definido, corta o áudio para os primeiros N segundos.
-    Retorna o caminho do arquivo mp3 salvo.
-    """
-    outdir = Path("audio")
-    outdir.mkdir(parents=True, exist_ok=True)
-
+def _opcoes_ydl(outdir: Path, formato: str, progresso: bool = True, extras: dict = None) -> dict:
     ydl_opts = {
         'format': 'bestaudio/best',
         'outtmpl': str(outdir / '%(title)s.%(ext)s'),
         'restrictfilenames': True,
         'noplaylist': True,
-        'progress_hooks': [progress_hook],
-        'quiet': False,
+        'progress_hooks': [progress_hook] if progresso else [],
+        'quiet': not progresso,
+        'noprogress': not progresso,
         'no_warnings': True,
         'prefer_ffmpeg': True,
-        'postprocessors': [{
+    }
+    if formato == "mp3":
+        ydl_opts['postprocessors'] = [{
             'key': 'FFmpegExtractAudio',
             'preferredcodec': 'mp3',
             'preferredquality': '128',
-        }],
-    }
+        }]
+    ydl_opts.update(extras or {})
+    return ydl_opts
 
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=True)
+def download_youtube_audio(video_url: str, trim_seconds: int = None, formato: str = "mp3",
+                           arquivo: ArquivoDownloads = None, usar_arquivo: bool = True,
+                           progresso: bool = True, opcoes_ydl: dict = None) -> str:
+    """
+    Baixa o áudio de um vídeo do YouTube e salva em 'audio/'.
+    Se trim_seconds for definido, corta o áudio para os primeiros N segundos.
+    Com formato="nativo" o arquivo fica no contêiner original (sem o
+    FFmpegExtractAudio), evitando a recodificação com perda.
+
+    Antes de baixar, os metadados do vídeo são resolvidos e o índice de
+    downloads (arquivo_downloads.py, chave extrator + ID) é consultado: se o
+    vídeo já foi baixado com o mesmo formato e corte, retorna o arquivo
+    existente sem baixar de novo; se só o download completo existir, o
+    corte é feito a partir dele. `opcoes_ydl` é repassado ao YoutubeDL
+    (ex.: {'enable_file_urls': True} para fontes locais).
+    Retorna o caminho do arquivo salvo.
+    """
+    return str(_baixar(video_url, trim_seconds, formato, arquivo, usar_arquivo, progresso, opcoes_ydl)[0])
+
+def _baixar(video_url, trim_seconds, formato, arquivo, usar_arquivo, progresso, opcoes_ydl):
+    """Retorna (Path do arquivo, True se já estava no índice e não foi baixado)."""
+    from yt_dlp import YoutubeDL
+
+    if formato not in FORMATOS_DOWNLOAD:
+        raise ValueError(f"Formato de download desconhecido: {formato} (opções: {', '.join(FORMATOS_DOWNLOAD)})")
+    outdir = Path("audio")
+    outdir.mkdir(parents=True, exist_ok=True)
+    if usar_arquivo and arquivo is None:
+        arquivo = ArquivoDownloads()
+
+    with YoutubeDL(_opcoes_ydl(outdir, formato, progresso, opcoes_ydl)) as ydl:
+        info = ydl.extract_info(video_url, download=False)
+        chave = chave_download(info)
+        if usar_arquivo:
+            existente = arquivo.buscar(chave, formato, trim_seconds)
+            if existente is not None:
+                print(f"⏭️  Já baixado ({chave}): {existente}")
+                return existente, True
+            # Outro corte (ou nenhum) já baixado: corta do download completo, sem baixar de novo
+            completo = arquivo.buscar(chave, formato, None) if trim_seconds is not None else None
+            if completo is not None:
+                print(f"⏭️  Já baixado ({chave}): {completo}; cortando o arquivo existente")
+                final = cortar_audio(completo, trim_seconds)
+                arquivo.registrar(chave, final, formato, trim_seconds, titulo=info.get('title'), url=video_url)
+                return final, True
+
+        info = ydl.process_ie_result(info, download=True)
         raw_name = ydl.prepare_filename(info)
-        final = Path(raw_name).with_suffix('.mp3')
+        final = Path(raw_name).with_suffix('.mp3') if formato == "mp3" else Path(raw_name)
         print(f"Arquivo salvo como: {final}")
 
+        # O download completo fica intacto e vai para o índice como variante sem corte;
+        # o corte vai para <titulo>.trim<N>.<ext>, em outra variante. Se o ffmpeg
+        # falhar, a exceção sobe e nada é registrado como cortado.
+        if usar_arquivo:
+            arquivo.registrar(chave, final, formato, None, titulo=info.get('title'), url=video_url)
         if trim_seconds is not None:
-            cortar_audio(final, trim_seconds)
-        return str(final)
+            final = cortar_audio(final, trim_seconds)
+            if usar_arquivo:
+                arquivo.registrar(chave, final, formato, trim_seconds, titulo=info.get('title'), url=video_url)
+        return final, False
+
+def listar_playlist(url: str, opcoes_ydl: dict = None) -> list:
+    """
+    URLs dos vídeos de uma playlist (ou a própria URL, se não for playlist),
+    sem baixar nada: só a listagem plana do yt-dlp.
+    """
+    from yt_dlp import YoutubeDL
+
+    ydl_opts = {'extract_flat': 'in_playlist', 'quiet': True, 'no_warnings': True}
+    ydl_opts.update(opcoes_ydl or {})
+    with YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if info.get('_type') not in ('playlist', 'multi_video'):
+        return [url]
+    urls = []
+    for entrada in info.get('entries') or []:
+        if not entrada:
+            continue
+        urls.append(entrada.get('url') or entrada.get('webpage_url') or entrada['id'])
+    return urls
+
+def baixar_varios(urls: list, limite: int = 3, trim_seconds: int = None, formato: str = "mp3",
+                  arquivo: ArquivoDownloads = None, usar_arquivo: bool = True,
+                  opcoes_ydl: dict = None) -> list:
+    """
+    Baixa vários vídeos (ex.: itens de uma playlist) com até `limite`
+    downloads simultâneos. Os já presentes no índice são pulados.
 
-def cortar_audio(audio_path: Path, trim_seconds: int):
+    Returns:
+        list: um dict por URL, na ordem de entrada: {url, arquivo, pulado,
+              segundos, bytes, mb_s, erro}
     """
-    Corta o áudio para os primeiros N segundos.
+    if usar_arquivo and arquivo is None:
+        arquivo = ArquivoDownloads()
+
+    def baixar(url):
+        inicio = time.perf_counter()
+        try:
+            caminho, pulado = _baixar(url, trim_seconds, formato, arquivo, usar_arquivo,
+                                      progresso=False, opcoes_ydl=opcoes_ydl)
+        except Exception as e:
+            return {"url": url, "arquivo": None, "pulado": False, "segundos": time.perf_counter() - inicio,
+                    "bytes": 0, "mb_s": None, "erro": str(e)}
+        segundos = time.perf_counter() - inicio
+        tamanho = 0 if pulado else caminho.stat().st_size
+        return {"url": url, "arquivo": str(caminho), "pulado": pulado, "segundos": segundos,
+                "bytes": tamanho, "mb_s": None if pulado else tamanho / (1024 * 1024) / max(segundos, 1e-6),
+                "erro": None}
+
+    inicio_lote = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, limite)) as executor:
+        resultados = list(executor.map(baixar, urls))
+    imprimir_relatorio(resultados, time.time() - inicio_lote)
+    return resultados
+
+def imprimir_relatorio(resultados: list, decorrido: float):
+    print(f"\n{'='*60}")
+    print(f"📥 DOWNLOADS ({decorrido:.1f}s)")
+    print(f"{'='*60}")
+    for r in resultados:
+        if r["erro"]:
+            print(f"  ❌ {r['url']}: {r['erro']}")
+        elif r["pulado"]:
+            print(f"  ⏭️  {Path(r['arquivo']).name}: já baixado")
+        else:
+            print(f"  ✅ {Path(r['arquivo']).name}: {r['bytes'] / (1024 * 1024):.1f} MB "
+                  f"em {r['segundos']:.1f}s ({r['mb_s']:.2f} MB/s)")
+    baixados = [r for r in resultados if not r["erro"] and not r["pulado"]]
+    total_mb = sum(r["bytes"] for r in baixados) / (1024 * 1024)
+    print(f"  {len(baixados)} baixado(s), {sum(1 for r in resultados if r['pulado'])} pulado(s), "
+          f"{sum(1 for r in resultados if r['erro'])} erro(s); {total_mb:.1f} MB "
+          f"({total_mb / max(decorrido, 1e-6):.2f} MB/s no total)")
+
+def arquivo_cortado(audio_path: Path, trim_seconds: int) -> Path:
+    """Nome do corte: <titulo>.trim<N>.<ext>, ao lado do download completo."""
+    audio_path = Path(audio_path)
+    return audio_path.with_name(f"{audio_path.stem}.trim{trim_seconds}{audio_path.suffix}")
+
+def cortar_audio(audio_path: Path, trim_seconds: int) -> Path:
+    """
+    Corta o áudio para os primeiros N segundos num arquivo à parte
+    (arquivo_cortado), sem tocar no original, e retorna o caminho do corte.
+
+    Usa cópia de stream do ffmpeg (-c copy): os pacotes são copiados sem
+    decodificar nem recodificar, no mesmo contêiner do arquivo original.
+    Levanta RuntimeError se o ffmpeg falhar.
     """
+    audio_path = Path(audio_path)
+    destino = arquivo_cortado(audio_path, trim_seconds)
+    temporario = destino.with_name(f".corte_{destino.name}")
+    comando = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-i", str(audio_path),
+        "-t", str(trim_seconds),
+        "-map", "0:a:0", "-c", "copy",
+        str(temporario),
+    ]
     try:
-        audio = AudioSegment.from_file(audio_path)
-        audio_cortado = audio[:trim_seconds * 1000]
-        audio_cortado.export(audio_path, format="mp3")
-        print(f"Áudio cortado para {trim_seconds} segundos: {audio_path}")
-    except Exception as e:
-        print(f"Erro ao cortar áudio: {e}")
+        subprocess.run(comando, check=True, capture_output=True, text=True)
+        temporario.replace(destino)
+    except (OSError, subprocess.CalledProcessError) as e:
+        temporario.unlink(missing_ok=True)
+        raise RuntimeError(f"Erro ao cortar áudio {audio_path}: {getattr(e, 'stderr', None) or e}") from e
+    print(f"Áudio cortado para {trim_seconds} segundos: {destino}")
+    return destino
 
 if __name__ == '__main__':
     import argparse
-    parser = argparse.ArgumentParser(description="Baixa o áudio de vídeos do YouTube em MP3 na pasta 'audio/'.")
-    parser.add_argument('url', help='URL do vídeo (YouTube).')
+    parser = argparse.ArgumentParser(description="Baixa o áudio de vídeos do YouTube (MP3 ou contêiner nativo) na pasta 'audio/'.")
+    parser.add_argument('url', nargs='+', help='URL(s) do vídeo ou da playlist (YouTube).')
     parser.add_argument('--trim', type=int, default=None, help='Corta o áudio para os primeiros N segundos (ex: 90 para 1m30s)')
+    parser.add_argument('--nativo', action='store_true', help='Mantém o áudio no contêiner original (opus/m4a), sem recodificar para MP3')
+    parser.add_argument('--playlist', action='store_true', help='Expande as URLs de playlist e baixa todos os vídeos')
+    parser.add_argument('--paralelo', type=int, default=3, help='Downloads simultâneos com várias URLs ou --playlist (padrão: 3)')
+    parser.add_argument('--sem-arquivo', action='store_true', help='Ignora o índice de downloads (audio/.downloads.json) e baixa de novo')
+    parser.add_argument('--arquivos-locais', action='store_true', help='Aceita URLs file:// (fonte local no lugar do site, para testes)')
     args = parser.parse_args()
 
-    print(f"Iniciando download de: {args.url}")
+    formato = "nativo" if args.nativo else "mp3"
+    opcoes = {'enable_file_urls': True} if args.arquivos_locais else None
     try:
-        download_youtube_audio(args.url, trim_seconds=args.trim)
+        urls = args.url
+        if args.playlist:
+            urls = [item for url in urls for item in listar_playlist(url, opcoes)]
+        if len(urls) == 1:
+            print(f"Iniciando download de: {urls[0]}")
+            download_youtube_audio(urls[0], trim_seconds=args.trim, formato=formato,
+                                   usar_arquivo=not args.sem_arquivo, opcoes_ydl=opcoes)
+        else:
+            print(f"Iniciando {len(urls)} downloads ({args.paralelo} simultâneos)")
+            baixar_varios(urls, args.paralelo, args.trim, formato, usar_arquivo=not args.sem_arquivo,
+                          opcoes_ydl=opcoes)
     except Exception as e:
         print("Erro:", e)
@@ -0,0 +1,146 @@
+"""
+encoders_video.py
+
+Backends de codificação de vídeo para a etapa 5, com detecção automática do
+que o ffmpeg da máquina consegue usar e fallback para a CPU.
+
+O conteúdo do karaokê é uma imagem parada com legendas mudando, então os
+presets usam taxa de quadros baixa, GOP longo e, no x264, `-tune stillimage`.
+
+Backends (em ordem de preferência no modo 'auto'):
+- nvenc: h264_nvenc na GPU NVIDIA
+- x264:  libx264 na CPU
+- x265:  libx265 na CPU (arquivos menores, encode mais lento)
+"""
+
+import functools
+import subprocess
+
+FPS_PADRAO = 15
+GOP_SEGUNDOS = 20  # um keyframe a cada 20 s: o fundo não muda
+
+ORDEM_PREFERENCIA = ["nvenc", "x264", "x265"]
+
+# Trechos do stderr do ffmpeg que indicam falha do próprio encoder (e não
+# do restante do comando, como um .ass ausente ou um filtro inválido)
+ERROS_ENCODER = (
+    "Error while opening encoder",
+    "Error initializing output stream",
+    "Unknown encoder",
+    "No capable devices found",
+    "Cannot load libcuda",
+    "OpenEncodeSessionEx failed",
+)
+
+ENCODERS = {
+    "nvenc": {
+        "codec": "h264_nvenc",
+        "args": ["-preset", "p4", "-rc", "vbr", "-cq", "28", "-b:v", "1M", "-maxrate", "2M"],
+    },
+    "x264": {
+        "codec": "libx264",
+        "args": ["-preset", "veryfast", "-tune", "stillimage", "-crf", "26"],
+    },
+    "x265": {
+        "codec": "libx265",
+        "args": ["-preset", "fast", "-crf", "30", "-tag:v", "hvc1", "-x265-params", "log-level=error"],
+    },
+}
+
+
+@functools.lru_cache(maxsize=None)
+def encoders_ffmpeg():
+    """Conjunto de nomes de encoders compilados no ffmpeg (ffmpeg -encoders)."""
+    try:
+        saida = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                               check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return frozenset()
+    nomes = set()
+    for linha in saida.splitlines():
+        partes = linha.split()
+        # Linhas de encoder: " V....D libx264   descrição"
+        if len(partes) >= 2 and len(partes[0]) == 6 and partes[0][0] in "VAS":
+            nomes.add(partes[1])
+    return frozenset(nomes)
+
+
+@functools.lru_cache(maxsize=None)
+def encoder_disponivel(nome):
+    """
+    True se o backend funciona de fato nesta máquina.
+
+    Estar listado em `ffmpeg -encoders` não basta (o h264_nvenc aparece mesmo
+    sem GPU), então é feito um encode de teste de poucos quadros.
+    """
+    codec = ENCODERS[nome]["codec"]
+    if codec not in encoders_ffmpeg():
+        return False
+    teste = [
+        "ffmpeg", "-hide_banner", "-v", "error",
+        "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.2",
+        "-c:v", codec, "-f", "null", "-",
+    ]
+    try:
+        subprocess.run(teste, check=True, capture_output=True, timeout=30)
+        return True
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return False
+
+
+def encoders_candidatos(preferido="auto"):
+    """
+    Lista de backends a tentar, em ordem. Com um backend explícito ele vem
+    primeiro e os demais disponíveis servem de fallback.
+    """
+    if preferido not in (None, "auto") and preferido not in ENCODERS:
+        raise ValueError(f"Encoder desconhecido: {preferido} (opções: auto, {', '.join(ENCODERS)})")
+    ordem = list(ORDEM_PREFERENCIA)
+    if preferido in ENCODERS:
+        ordem.remove(preferido)
+        ordem.insert(0, preferido)
+    candidatos = [nome for nome in ordem if encoder_disponivel(nome)]
+    if not candidatos:
+        raise RuntimeError("Nenhum encoder de vídeo disponível no ffmpeg (h264_nvenc, libx264 ou libx265).")
+    return candidatos
+
+
+def escolher_encoder(preferido="auto"):
+    """Backend que será usado de fato (o primeiro candidato disponível)."""
+    return encoders_candidatos(preferido)[0]
+
+
+def argumentos_video(nome, fps=FPS_PADRAO):
+    """Argumentos de saída do ffmpeg (codec, preset, fps e GOP) para o backend."""
+    encoder = ENCODERS[nome]
+    gop = int(fps * GOP_SEGUNDOS)
+    return ["-c:v", encoder["codec"], *encoder["args"], "-r", str(fps), "-g", str(gop)]
+
+
+def falha_de_encoder(stderr):
+    """True se o stderr do ffmpeg mostra erro ao abrir/inicializar o encoder."""
+    return any(trecho in (stderr or "") for trecho in ERROS_ENCODER)
+
+
+def executar_com_fallback(montar_comando, preferido="auto"):
+    """
+    Roda o ffmpeg com o melhor backend disponível e, se o encoder falhar ao
+    abrir, tenta o próximo. Outros erros (entrada ausente, filtro inválido)
+    são relançados na hora, sem repetir o encode com os demais backends.
+
+    Args:
+        montar_comando (callable): Recebe o nome do backend e retorna o
+            comando ffmpeg completo (ver argumentos_video).
+
+    Returns:
+        str: Nome do backend que produziu o vídeo.
+    """
+    candidatos = encoders_candidatos(preferido)
+    for i, nome in enumerate(candidatos):
+        try:
+            subprocess.run(montar_comando(nome), check=True, capture_output=True, text=True)
+            return nome
+        except subprocess.CalledProcessError as e:
+            if i == len(candidatos) - 1 or not falha_de_encoder(e.stderr):
+                raise
+            print(f"⚠️  Encoder {nome} falhou ({e.returncode}); tentando {candidatos[i + 1]}...")
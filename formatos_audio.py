@@ -0,0 +1,60 @@
+"""
+formatos_audio.py
+
+Formatos de gravação das faixas separadas (audio_separado/<nome>/) e
+localização das faixas independente do formato escolhido na separação.
+
+Formatos:
+- float: WAV float32 (padrão do torchaudio.save; maior, sem perda nem clipping)
+- pcm16: WAV PCM 16 bits (metade do tamanho; clipa acima de 0 dBFS)
+- flac:  FLAC 16 bits (compressão sem perda sobre o PCM 16 bits)
+
+Também define as extensões aceitas como áudio de entrada (audio/): o
+download no modo nativo mantém o contêiner original (.webm, .m4a, .opus).
+"""
+
+from pathlib import Path
+
+FORMATOS_FAIXAS = {
+    "float": {"extensao": ".wav", "encoding": "PCM_F", "bits": 32},
+    "pcm16": {"extensao": ".wav", "encoding": "PCM_S", "bits": 16},
+    "flac": {"extensao": ".flac", "encoding": None, "bits": 16},
+}
+FORMATO_PADRAO = "float"
+EXTENSOES_FAIXAS = (".wav", ".flac")
+
+# Áudios de entrada aceitos pelas etapas (tudo é decodificado pelo ffmpeg)
+EXTENSOES_AUDIO = (".mp3", ".wav", ".m4a", ".opus", ".webm", ".flac", ".ogg")
+
+VOCALS = "vocals"
+INSTRUMENTAL = "instrumental"
+
+
+def arquivo_faixa(pasta, nome, formato=FORMATO_PADRAO):
+    """Caminho em que a faixa `nome` é gravada no `formato`."""
+    return Path(pasta) / f"{nome}{FORMATOS_FAIXAS[formato]['extensao']}"
+
+
+def caminho_faixa(pasta, nome):
+    """Arquivo existente da faixa `nome` (vocals.wav, vocals.flac...), ou None."""
+    for extensao in EXTENSOES_FAIXAS:
+        arquivo = Path(pasta) / f"{nome}{extensao}"
+        if arquivo.exists():
+            return arquivo
+    return None
+
+
+def faixas_instrumentais(pasta):
+    """Faixas separadas da pasta, exceto os vocais e o instrumental já somado."""
+    return sorted(f for f in Path(pasta).iterdir()
+                  if f.suffix in EXTENSOES_FAIXAS and f.stem not in (VOCALS, INSTRUMENTAL))
+
+
+def arquivos_audio(pasta, nome=None):
+    """Áudios de entrada da pasta (opcionalmente só os com esse nome base), do mais recente ao mais antigo."""
+    pasta = Path(pasta)
+    if not pasta.exists():
+        return []
+    arquivos = [a for a in pasta.iterdir()
+                if a.suffix.lower() in EXTENSOES_AUDIO and (nome is None or a.stem == nome)]
+    return sorted(arquivos, key=lambda a: a.stat().st_mtime, reverse=True)
@@ -4,49 +4,94 @@ Gera arquivo de legenda (.srt) com timestamps das partes cantadas, usando o áud
 Requisitos: pip install openai-whisper srt
 """
 
-import whisper
-from typing import Any
 import srt
 from pathlib import Path
 
+from motores_asr import MOTOR_PADRAO, MOTORES, obter_motor
+from audio_16k import SAMPLE_RATE, carregar_audio_16k
+from tempos_palavras import TemposPalavras, caminho_tempos
+from formatos_audio import arquivos_audio
+from detectar_voz import concatenar_regioes, detectar_regioes_voz, remapear_segmentos
+
+MODELO_PADRAO = "small"  # try "medium" and large-v3
+IDIOMA_PADRAO = "pt"
+
 # Função para transcrever áudio e obter segmentos
-def transcrever_audio(audio_path, model_size="small"): #try "medium" and large-v3
-    model = whisper.load_model(model_size)
-    result = model.transcribe(str(audio_path), word_timestamps=True, language="pt")
-    return result['segments']
+def transcrever_audio(audio_path, model_size=MODELO_PADRAO, idioma=IDIOMA_PADRAO, vad=False,
+                      motor=MOTOR_PADRAO, threads=None, batch_size=None):
+    """
+    Transcreve o áudio e retorna os segmentos (com tempos por palavra).
+
+    Com vad=True, só os trechos com voz (ver detectar_voz.py) são transcritos;
+    os tempos retornados continuam no tempo da música.
+
+    `motor` escolhe o backend de ASR (ver motores_asr.py): 'whisper' ou
+    'faster-whisper' (int8 na CPU, com `threads` e `batch_size`).
+    """
+    asr = obter_motor(motor, model_size, threads=threads, batch_size=batch_size)
+
+    # Usa o vocals_16k.npy da separação quando existir (sem decodificar com ffmpeg)
+    sr = SAMPLE_RATE
+    audio = carregar_audio_16k(audio_path)
+    if not vad:
+        return asr.transcrever(audio, idioma)
+
+    regioes = detectar_regioes_voz(audio, sr)
+    voz = sum(fim - inicio for inicio, fim in regioes)
+    print(f"   🔇 VAD: {len(regioes)} trecho(s) com voz, {voz:.0f}s de {len(audio) / sr:.0f}s")
+    if not regioes:
+        return []
+    trechos, mapa = concatenar_regioes(audio, sr, regioes)
+    return remapear_segmentos(asr.transcrever(trechos, idioma), mapa)
 
 
 # Função para gerar legendas SRT a partir dos segmentos
-def gerar_srt(segments, output_path):
+def gerar_srt(segments, output_path, salvar_tempos_palavras=True):
+    """
+    Gera o .srt e, ao lado dele, o arquivo .tempos com os tempos por palavra
+    do Whisper (ver tempos_palavras.py), usado pela etapa 4.
+
+    `segments` pode ser a lista de segmentos do Whisper ou um TemposPalavras.
+    """
+    tempos = segments if isinstance(segments, TemposPalavras) else TemposPalavras.de_segmentos(segments)
     subs = []
-    for i, seg in enumerate[Any](segments):
+    textos = tempos.textos_segmentos()
+    for i, (inicio, fim, texto) in enumerate(zip(tempos.seg_inicio, tempos.seg_fim, textos)):
+        # Colunas em float32: arredonda ao milissegundo do SRT
         subs.append(srt.Subtitle(
             index=i+1,
-            start=srt.timedelta(seconds=seg['start']),
-            end=srt.timedelta(seconds=seg['end']),
-            content=seg['text']
+            start=srt.timedelta(seconds=round(float(inicio), 3)),
+            end=srt.timedelta(seconds=round(float(fim), 3)),
+            content=texto
 
         ))
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(srt.compose(subs))
     print(f"Legenda gerada em: {output_path}")
+    if salvar_tempos_palavras:
+        tempos.salvar(caminho_tempos(output_path))
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Gera legenda SRT a partir de áudio MP3 usando Whisper.")
-    parser.add_argument("--audio", required=False, help="Caminho do arquivo MP3 (pasta audio/)")
+    parser.add_argument("--audio", required=False, help="Caminho do arquivo de áudio (mp3, webm, m4a...)")
     parser.add_argument("--out", default=None, help="Arquivo de saída SRT (pasta subtitles/)")
+    parser.add_argument("--motor", choices=list(MOTORES), default=MOTOR_PADRAO, help="Motor de transcrição (padrão: whisper)")
+    parser.add_argument("--threads", type=int, default=None, help="faster-whisper: threads da CPU (padrão: todos os núcleos)")
+    parser.add_argument("--batch", type=int, default=None, help="faster-whisper: tamanho do lote (padrão: 1)")
+    parser.add_argument("--vad", action="store_true", help="Transcreve só os trechos com voz (pula silêncios)")
     args = parser.parse_args()
 
     if not args.audio:
         base_dir = Path("audio_base")
-        mp3s = list(base_dir.glob("*.mp3"))
-        if not mp3s:
-            raise FileNotFoundError("Nenhum arquivo .mp3 encontrado na pasta audio_base/")
-        args.audio = str(mp3s[0])
+        audios = arquivos_audio(base_dir)
+        if not audios:
+            raise FileNotFoundError("Nenhum arquivo de áudio encontrado na pasta audio_base/")
+        args.audio = str(audios[0])
     
     print("Transcrevendo áudio...")
-    segmentos = transcrever_audio(args.audio)
+    segmentos = transcrever_audio(args.audio, vad=args.vad, motor=args.motor,
+                                  threads=args.threads, batch_size=args.batch)
     out_path = args.out or f"subtitle_srt/{Path(args.audio).stem}.srt"
     Path("subtitle_srt").mkdir(exist_ok=True)
     gerar_srt(segmentos, out_path)
\ No newline at end of file
@@ -11,14 +11,19 @@ Requisitos:
 - ffmpeg instalado e no PATH do sistema
 """
 
-import whisperx
 import argparse
 from pathlib import Path
+import numpy as np
 import srt
 
+from cache_modelos import obter_modelo
+from cache_alinhamento import CacheAlinhamento, caminho_cache_alinhamento, chave_segmento
+from audio_16k import carregar_audio_16k
+from tempos_palavras import TemposPalavras, caminho_tempos
+from formatos_audio import VOCALS, caminho_faixa
 
-def srt_para_segmentos(srt_path):
-    """Lê um arquivo .srt e o converte para o formato de segmento do whisperX."""
+
+def _ler_srt(srt_path):
     with open(srt_path, 'r', encoding='utf-8') as f:
         subs = list(srt.parse(f.read()))
     
@@ -32,6 +37,43 @@ def srt_para_segmentos(srt_path):
     return segmentos
 
 
+def tempos_do_srt(srt_path):
+    """
+    TemposPalavras salvo pela etapa 3 ao lado do .srt, se ainda corresponder
+    a ele; None se não existir ou se o SRT foi editado depois (textos ou
+    tempos diferentes).
+    """
+    caminho = caminho_tempos(srt_path)
+    if not caminho.exists():
+        return None
+    tempos = TemposPalavras.carregar(caminho)
+    if caminho.stat().st_mtime >= Path(srt_path).stat().st_mtime:
+        return tempos
+
+    # SRT mais novo que os tempos: só vale se o conteúdo não mudou
+    segmentos = _ler_srt(srt_path)
+    if [seg['text'] for seg in segmentos] != tempos.textos_segmentos():
+        return None
+    tempos_srt = np.array([(seg['start'], seg['end']) for seg in segmentos]).reshape(-1, 2)
+    tempos_salvos = np.stack([tempos.seg_inicio, tempos.seg_fim], axis=1)
+    if not np.allclose(tempos_srt, tempos_salvos, atol=2e-3):
+        return None
+    return tempos
+
+
+def srt_para_segmentos(srt_path):
+    """
+    Segmentos de um .srt no formato de segmento do whisperX.
+
+    Usa o arquivo .tempos da etapa 3 quando ele corresponde ao SRT (sem
+    reparsear o texto); senão lê o próprio .srt (ex.: legenda editada à mão).
+    """
+    tempos = tempos_do_srt(srt_path)
+    if tempos is not None:
+        return tempos.segmentos(com_palavras=False)
+    return _ler_srt(srt_path)
+
+
 def format_time(seconds):
     """Converte segundos para o formato de tempo do .ass (H:MM:SS.ss)."""
     h = int(seconds // 3600)
@@ -41,10 +83,23 @@ def format_time(seconds):
     return f"{h:01}:{m:02}:{s:02}.{cs:02}"
 
 
-def gerar_arquivo_ass(result, output_path):
+def gerar_arquivo_ass(result, output_path, salvar_tempos=True):
     """
     Gera um arquivo .ass com efeito de karaokê a partir do resultado do alinhamento.
+
+    `result` pode ser o resultado do WhisperX ({'segments': [...]}) ou um
+    TemposPalavras. Com salvar_tempos=True os tempos finais também são
+    salvos em .tempos ao lado do .ass (ver tempos_palavras.py).
     """
+    if isinstance(result, TemposPalavras):
+        tempos = result
+    else:
+        tempos = TemposPalavras.de_segmentos(result['segments'])
+    primeiras, ultimas = tempos.limites_segmentos()
+    # Duração do destaque de cada palavra em centissegundos (0 se a palavra ficou sem tempo);
+    # a folga de 1e-3 evita que o arredondamento do float32 tire um centissegundo
+    duracoes = np.floor(np.nan_to_num((tempos.fim.astype(np.float64) - tempos.inicio) * 100) + 1e-3).astype(int)
+
     header = """[Script Info]
 Title: Legenda de Karaokê
 ScriptType: v4.00+
@@ -63,20 +118,17 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(header)
 
-        for segment in result['segments']:
-            start_time = format_time(segment['start'])
-            end_time = format_time(segment['end'])
+        for s in range(tempos.n_segmentos):
+            start_time = format_time(round(float(tempos.seg_inicio[s]), 4))
+            end_time = format_time(round(float(tempos.seg_fim[s]), 4))
             
             line_text = []
-            if 'words' not in segment or not segment['words']:
+            if primeiras[s] == ultimas[s]:
                 continue
 
-            for word_info in segment['words']:
-                # Duração do destaque da palavra em centissegundos
-                k_duration = int((word_info['end'] - word_info['start']) * 100)
-                
+            for j in range(primeiras[s], ultimas[s]):
                 # Adiciona a tag de tempo do karaokê e a palavra
-                line_text.append("{\\k" + str(k_duration) + "}" + word_info['word'])
+                line_text.append("{\\k" + str(duracoes[j]) + "}" + tempos.textos[tempos.palavra[j]])
             
             # Junta as palavras com um espaço
             full_line = " ".join(line_text).strip()
@@ -85,8 +137,76 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             dialogue_line = f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{full_line}\n"
             f.write(dialogue_line)
 
+    if salvar_tempos:
+        tempos.salvar(caminho_tempos(output_path))
+
 
-def gerar_legenda_karaoke(audio_path, srt_path, output_path):
+def alinhar_whisperx(audio_path, segmentos, idioma="pt", cache=None):
+    """
+    Alinha os segmentos palavra por palavra com o modelo wav2vec do WhisperX.
+
+    Com `cache` (arquivo de cache por segmento, ver cache_alinhamento.py), só
+    os segmentos novos ou alterados desde a última execução são alinhados; os
+    demais vêm do cache e, se nenhum mudou, o modelo nem é carregado.
+    """
+    print("🎧 Carregando áudio (vocals)...")
+    # vocals_16k.npy da separação via mmap quando existir; senão decodifica com ffmpeg
+    audio = carregar_audio_16k(audio_path)
+    print(f"   ✓ Áudio carregado")
+
+    if cache is not None:
+        cache_segmentos = CacheAlinhamento(cache)
+        chaves = [chave_segmento(seg, audio, idioma) for seg in segmentos]
+        pendentes = [i for i, chave in enumerate(chaves) if chave not in cache_segmentos]
+        print(f"♻️  {len(segmentos) - len(pendentes)} segmento(s) do cache, "
+              f"{len(pendentes)} novo(s) ou alterado(s) para alinhar")
+        if not pendentes:
+            return {"segments": [s for chave in chaves for s in cache_segmentos[chave]]}
+
+    # Importado só aqui: o caminho "whisper" (e o pipeline até a etapa 4) não carrega o WhisperX/torch
+    import torch
+    import whisperx
+
+    # GPU quando houver; nos nós só com CPU o wav2vec roda na CPU
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print(f"🔗 Carregando modelo de alinhamento ({device})...")
+    # Detectar idioma automaticamente (será PT para português)
+    align_model, metadata = obter_modelo(
+        "whisperx_align", idioma, device, "float32",
+        lambda: whisperx.load_align_model(
+            language_code=idioma,  # Forçar português para melhor precisão
+            device=device
+        )
+    )
+    print(f"   ✓ Modelo carregado (idioma: {metadata['language']})")
+    
+    print("⏱️  Alinhando palavras com o áudio...")
+    if cache is None:
+        result = whisperx.align(
+            segmentos,               # Segmentos do SRT (já transcritos)
+            align_model,
+            metadata,
+            audio,
+            device=device,
+            return_char_alignments=False
+        )
+        print(f"   ✓ Alinhamento concluído")
+        return result
+
+    # Um segmento por chamada: o WhisperX pode dividir um segmento em frases,
+    # e assim cada resultado fica associado à chave do seu segmento
+    for i in pendentes:
+        alinhado = whisperx.align([dict(segmentos[i])], align_model, metadata, audio,
+                                  device=device, return_char_alignments=False)
+        cache_segmentos.guardar(chaves[i], alinhado["segments"])
+    cache_segmentos.salvar(chaves)
+    print(f"   ✓ Alinhamento concluído ({len(pendentes)} segmento(s))")
+    return {"segments": [s for chave in chaves for s in cache_segmentos[chave]]}
+
+
+def gerar_legenda_karaoke(audio_path, srt_path, output_path, idioma="pt", alinhamento="whisperx",
+                          cache_segmentos=True):
     """
     Gera legenda de karaokê usando alinhamento palavra-por-palavra.
     
@@ -97,33 +217,28 @@ def gerar_legenda_karaoke(audio_path, srt_path, output_path):
         audio_path (str): Caminho do áudio (vocals.wav)
         srt_path (str): Caminho do arquivo .srt gerado anteriormente
         output_path (str): Caminho de saída do arquivo .ass
+        idioma (str): Código do idioma do modelo de alinhamento
+        alinhamento (str): 'whisperx' (wav2vec, mais preciso) ou 'whisper'
+            (usa os tempos por palavra do próprio Whisper, sem carregar o
+            modelo de alinhamento; cai para WhisperX se o SRT foi editado)
+        cache_segmentos (bool): Reaproveita o alinhamento dos segmentos que
+            não mudaram desde a última execução (ver cache_alinhamento.py)
     """
-    print("📖 Carregando segmentos do SRT...")
-    segmentos_srt = srt_para_segmentos(srt_path)
-    print(f"   ✓ {len(segmentos_srt)} segmentos carregados")
-    
-    print("🎧 Carregando áudio (vocals)...")
-    audio = whisperx.load_audio(audio_path)
-    print(f"   ✓ Áudio carregado")
-    
-    print("🔗 Carregando modelo de alinhamento...")
-    # Detectar idioma automaticamente (será PT para português)
-    align_model, metadata = whisperx.load_align_model(
-        language_code="pt",  # Forçar português para melhor precisão
-        device="cuda"
-    )
-    print(f"   ✓ Modelo carregado (idioma: {metadata['language']})")
-    
-    print("⏱️  Alinhando palavras com o áudio...")
-    result = whisperx.align(
-        segmentos_srt,           # Segmentos do SRT (já transcritos)
-        align_model,
-        metadata,
-        audio,
-        device="cuda",
-        return_char_alignments=False
-    )
-    print(f"   ✓ Alinhamento concluído")
+    result = None
+    if alinhamento == "whisper":
+        print("⚡ Usando tempos por palavra do Whisper (sem alinhamento WhisperX)...")
+        result = tempos_do_srt(srt_path)
+        if result is None:
+            print("   ⚠️  Tempos do Whisper ausentes ou SRT editado; alinhando com WhisperX")
+        else:
+            print(f"   ✓ {result.n_segmentos} segmentos, {len(result)} palavras carregados")
+
+    if result is None:
+        print("📖 Carregando segmentos do SRT...")
+        segmentos_srt = srt_para_segmentos(srt_path)
+        print(f"   ✓ {len(segmentos_srt)} segmentos carregados")
+        cache = caminho_cache_alinhamento(output_path) if cache_segmentos else None
+        result = alinhar_whisperx(audio_path, segmentos_srt, idioma, cache=cache)
     
     print("✍️  Gerando arquivo .ass...")
     gerar_arquivo_ass(result, output_path)
@@ -149,6 +264,17 @@ if __name__ == "__main__":
         default=None, 
         help="Arquivo de saída .ass (padrão: subtitle_ass/[nome].ass)"
     )
+    parser.add_argument(
+        "--alinhamento",
+        choices=["whisperx", "whisper"],
+        default="whisperx",
+        help="whisperx (padrão) ou whisper: usa os tempos por palavra do Whisper, sem modelo de alinhamento"
+    )
+    parser.add_argument(
+        "--sem-cache-segmentos",
+        action="store_true",
+        help="Realinha todos os segmentos, sem reaproveitar os que não mudaram desde a última execução"
+    )
     parser.add_argument(
         "--nome",
         required=False,
@@ -162,19 +288,20 @@ if __name__ == "__main__":
     # Detectar áudio (vocals.wav)
     if not args.audio:
         if nome_base:
-            # Procurar em audio_separado/[nome]/vocals.wav
-            vocals_path = Path("audio_separado") / nome_base / "vocals.wav"
-            if vocals_path.exists():
+            # Procurar em audio_separado/[nome]/vocals.wav (ou .flac)
+            vocals_path = caminho_faixa(Path("audio_separado") / nome_base, VOCALS)
+            if vocals_path:
                 args.audio = str(vocals_path)
             else:
-                raise FileNotFoundError(f"Arquivo não encontrado: {vocals_path}")
+                raise FileNotFoundError(f"Vocais não encontrados em: {Path('audio_separado') / nome_base}")
         else:
             # Procurar o primeiro vocals.wav em audio_separado/
             audio_separado_dir = Path("audio_separado")
             if not audio_separado_dir.exists():
                 raise FileNotFoundError("Pasta audio_separado/ não encontrada.")
             
-            vocals_files = list(audio_separado_dir.glob("*/vocals.wav"))
+            vocals_files = [v for v in (caminho_faixa(pasta, VOCALS) for pasta in sorted(audio_separado_dir.iterdir())
+                                        if pasta.is_dir()) if v]
             if not vocals_files:
                 raise FileNotFoundError("Nenhum arquivo vocals.wav encontrado em audio_separado/")
             
@@ -216,4 +343,5 @@ if __name__ == "__main__":
     print(f"💾 Saída: {args.out}")
     print(f"{'='*60}\n")
     
-    gerar_legenda_karaoke(args.audio, args.srt, args.out)
\ No newline at end of file
+    gerar_legenda_karaoke(args.audio, args.srt, args.out, alinhamento=args.alinhamento,
+                          cache_segmentos=not args.sem_cache_segmentos)
\ No newline at end of file
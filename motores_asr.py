@@ -0,0 +1,104 @@
+"""
+motores_asr.py
+
+Motores de transcrição (ASR) intercambiáveis por trás de transcrever_audio.
+
+Todos retornam os segmentos no formato do openai-whisper, incluindo os
+tempos por palavra:
+    [{'start', 'end', 'text', 'words': [{'word', 'start', 'end', 'probability'}]}]
+
+Motores:
+- whisper:        openai-whisper em PyTorch (float32; GPU se disponível)
+- faster-whisper: CTranslate2 quantizado em int8 na CPU, com número de
+                  threads e tamanho de lote configuráveis (já instalado
+                  como dependência do WhisperX)
+"""
+
+import os
+
+from cache_modelos import obter_modelo
+
+MOTOR_PADRAO = "whisper"
+
+
+class MotorWhisper:
+    """openai-whisper (PyTorch)."""
+
+    nome = "whisper"
+
+    def __init__(self, model_size, **_):
+        import torch
+        import whisper
+
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = obter_modelo("whisper", model_size, self.device, "float32",
+                                  lambda: whisper.load_model(model_size, device=self.device))
+
+    def transcrever(self, audio, idioma):
+        """`audio` pode ser um caminho ou um array float32 mono a 16 kHz."""
+        if hasattr(audio, "__fspath__"):
+            audio = str(audio)
+        result = self.model.transcribe(audio, word_timestamps=True, language=idioma)
+        return result['segments']
+
+
+class MotorFasterWhisper:
+    """faster-whisper (CTranslate2) quantizado em int8 na CPU."""
+
+    nome = "faster-whisper"
+
+    def __init__(self, model_size, threads=None, batch_size=None, compute_type="int8", **_):
+        from faster_whisper import WhisperModel
+
+        self.threads = threads or os.cpu_count() or 1
+        self.batch_size = batch_size or 1
+        self.model = obter_modelo(
+            "faster-whisper", f"{model_size}@{self.threads}t", "cpu", compute_type,
+            lambda: WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                                 cpu_threads=self.threads),
+        )
+        self.pipeline = None
+        if self.batch_size > 1:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self.pipeline = BatchedInferencePipeline(model=self.model)
+            except ImportError:
+                print("   ⚠️  faster-whisper sem BatchedInferencePipeline (>= 1.1); usando lote 1")
+                self.batch_size = 1
+
+    def transcrever(self, audio, idioma):
+        if hasattr(audio, "__fspath__"):
+            audio = str(audio)
+        if self.pipeline is not None:
+            segmentos, _ = self.pipeline.transcribe(audio, language=idioma, word_timestamps=True,
+                                                    batch_size=self.batch_size)
+        else:
+            segmentos, _ = self.model.transcribe(audio, language=idioma, word_timestamps=True)
+
+        # O gerador só decodifica ao ser consumido
+        resultado = []
+        for i, seg in enumerate(segmentos):
+            resultado.append({
+                'id': i,
+                'start': seg.start,
+                'end': seg.end,
+                'text': seg.text,
+                'words': [
+                    {'word': w.word, 'start': w.start, 'end': w.end, 'probability': w.probability}
+                    for w in (seg.words or [])
+                ],
+            })
+        return resultado
+
+
+MOTORES = {
+    MotorWhisper.nome: MotorWhisper,
+    MotorFasterWhisper.nome: MotorFasterWhisper,
+}
+
+
+def obter_motor(nome, model_size, **opcoes):
+    """Instancia o motor `nome` (os modelos em si ficam no cache compartilhado)."""
+    if nome not in MOTORES:
+        raise ValueError(f"Motor de transcrição desconhecido: {nome} (opções: {', '.join(MOTORES)})")
+    return MOTORES[nome](model_size, **opcoes)
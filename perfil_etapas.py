@@ -0,0 +1,259 @@
+"""
+perfil_etapas.py
+
+Medição por etapa e por música do pipeline (download, separação, SRT,
+alinhamento, vídeo), para saber o que domina o tempo em cada máquina:
+
+- tempo de parede e de CPU (CPU do processo inteiro)
+- pico de RSS do processo durante a etapa (amostrado em /proc; sem /proc,
+  o pico desde o início do processo)
+- pico de memória do acelerador (torch.cuda), se o torch já estiver
+  carregado e houver GPU
+- duração do áudio da música e fator de tempo real (parede / duração)
+- se a etapa foi pulada pelo cache de artefatos
+
+No modo em lote as etapas rodam em paralelo: CPU, RSS e memória da GPU são
+do processo, então se sobrepõem entre as etapas simultâneas.
+
+Cada medição é anexada a <pasta>/etapas.jsonl e o arquivo
+<pasta>/karaoke.prom (formato textfile do node_exporter do Prometheus) é
+regravado com a última medição de cada música/etapa. Opcionalmente, uma
+etapa (ex.: "separar") roda sob o cProfile e gera <nome>_<etapa>.prof
+(formato pstats: snakeviz, gprof2dot, python -m pstats).
+
+Uso programático:
+    ativar_perfil(Perfilador("perfil", etapa_cprofile="srt", ao_registrar=print))
+    ...pipeline...
+    ativar_perfil(None)
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PASTA_PADRAO = Path("perfil")
+INTERVALO_AMOSTRAGEM = 0.05
+
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_ativo = None
+
+# (nome da métrica, campo da medição, ajuda)
+METRICAS = (
+    ("karaoke_etapa_segundos", "segundos", "Tempo de parede da etapa"),
+    ("karaoke_etapa_cpu_segundos", "cpu_segundos", "Tempo de CPU do processo durante a etapa"),
+    ("karaoke_etapa_rss_pico_bytes", "rss_pico_bytes", "Pico de RSS do processo durante a etapa"),
+    ("karaoke_etapa_acelerador_pico_bytes", "acelerador_pico_bytes", "Pico de memória do acelerador (torch)"),
+    ("karaoke_etapa_rtf", "rtf", "Fator de tempo real (tempo de parede / duração do áudio)"),
+    ("karaoke_audio_segundos", "audio_segundos", "Duração do áudio da música"),
+)
+
+
+def _rss_atual():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rss_pico_processo():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+def _cuda():
+    """O módulo torch.cuda, se o torch já foi importado e há GPU (nunca importa o torch só para medir)."""
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return torch.cuda
+
+
+class _AmostradorRss:
+    """Thread que acompanha o pico de RSS enquanto a etapa roda."""
+
+    def __init__(self):
+        self.pico = _rss_atual()
+        self._parar = threading.Event()
+        self._thread = None
+        if self.pico is not None:
+            self._thread = threading.Thread(target=self._rodar, name="perfil-rss", daemon=True)
+            self._thread.start()
+
+    def _rodar(self):
+        while not self._parar.wait(INTERVALO_AMOSTRAGEM):
+            self.pico = max(self.pico, _rss_atual() or 0)
+
+    def encerrar(self):
+        if self._thread is None:
+            return _rss_pico_processo()
+        self._parar.set()
+        self._thread.join()
+        return max(self.pico, _rss_atual() or 0)
+
+
+class Medicao:
+    """Contexto de uma etapa; a etapa pode completar nome_base, audio e em_cache enquanto roda."""
+
+    def __init__(self, nome_base, etapa, audio=None):
+        self.nome_base = nome_base
+        self.etapa = etapa
+        self.audio = audio
+        self.em_cache = False
+
+
+class Perfilador:
+    """Grava as medições em JSON lines e no textfile do Prometheus."""
+
+    def __init__(self, pasta=PASTA_PADRAO, etapa_cprofile=None, ao_registrar=None):
+        self.pasta = Path(pasta)
+        self.etapa_cprofile = etapa_cprofile
+        self.ao_registrar = ao_registrar
+        self.registros = []
+        self._ultimos = {}  # (musica, etapa) -> registro
+        self._duracoes = {}  # nome_base -> segundos de áudio
+        self._lock = threading.Lock()
+
+    def _duracao(self, nome_base, audio):
+        if nome_base in self._duracoes or audio is None:
+            return self._duracoes.get(nome_base)
+        from render_paralelo import duracao_audio
+
+        try:
+            self._duracoes[nome_base] = duracao_audio(audio)
+        except Exception:
+            self._duracoes[nome_base] = None
+        return self._duracoes[nome_base]
+
+    @contextmanager
+    def medir(self, nome_base, etapa, audio=None):
+        medicao = Medicao(nome_base, etapa, audio)
+        cuda = _cuda()
+        if cuda is not None:
+            cuda.reset_peak_memory_stats()
+        perfil = cProfile.Profile() if etapa == self.etapa_cprofile else None
+        amostrador = _AmostradorRss()
+        cpu = time.process_time()
+        inicio = time.perf_counter()
+        erro = None
+        if perfil is not None:
+            try:
+                perfil.enable()
+            except ValueError:  # outra etapa simultânea já está sob o cProfile
+                perfil = None
+        try:
+            yield medicao
+        except BaseException as e:
+            erro = e
+            raise
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            segundos = time.perf_counter() - inicio
+            cpu = time.process_time() - cpu
+            rss = amostrador.encerrar()
+            cuda = _cuda()  # a etapa pode ter importado o torch
+            acelerador = cuda.max_memory_allocated() if cuda is not None else None
+            nome = medicao.nome_base or "_"
+            audio_segundos = self._duracao(nome, medicao.audio)
+            registro = {
+                "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "musica": nome,
+                "etapa": etapa,
+                "segundos": round(segundos, 3),
+                "cpu_segundos": round(cpu, 3),
+                "rss_pico_bytes": rss,
+                "acelerador_pico_bytes": acelerador,
+                "audio_segundos": None if audio_segundos is None else round(audio_segundos, 2),
+                "rtf": round(segundos / audio_segundos, 4) if audio_segundos else None,
+                "em_cache": medicao.em_cache,
+                "erro": None if erro is None else repr(erro),
+            }
+            if perfil is not None:
+                self.pasta.mkdir(parents=True, exist_ok=True)
+                destino = self.pasta / f"{nome}_{etapa}.prof"
+                perfil.dump_stats(str(destino))
+                registro["cprofile"] = str(destino)
+            self.registrar(registro)
+
+    def registrar(self, registro):
+        with self._lock:
+            self.registros.append(registro)
+            self._ultimos[(registro["musica"], registro["etapa"])] = registro
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            with open(self.pasta / "etapas.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._gravar_prometheus()
+        if self.ao_registrar is not None:
+            self.ao_registrar(registro)
+
+    def _gravar_prometheus(self):
+        linhas = []
+        for metrica, campo, ajuda in METRICAS:
+            linhas += [f"# HELP {metrica} {ajuda}", f"# TYPE {metrica} gauge"]
+            for (musica, etapa), registro in sorted(self._ultimos.items()):
+                if registro[campo] is not None:
+                    linhas.append(f'{metrica}{{musica="{_rotulo(musica)}",etapa="{_rotulo(etapa)}"}} {registro[campo]}')
+        destino = self.pasta / "karaoke.prom"
+        temporario = destino.with_suffix(".prom.tmp")
+        temporario.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+        os.replace(temporario, destino)
+
+    def imprimir_resumo(self):
+        if not self.registros:
+            return
+        print(f"\n⏱️  Perfil por etapa (detalhes em {self.pasta / 'etapas.jsonl'}):")
+        for r in self.registros:
+            extras = []
+            if r["rtf"] is not None:
+                extras.append(f"RTF {r['rtf']:.3f}")
+            if r["rss_pico_bytes"]:
+                extras.append(f"RSS {r['rss_pico_bytes'] / (1024 * 1024):.0f} MB")
+            if r["acelerador_pico_bytes"]:
+                extras.append(f"GPU {r['acelerador_pico_bytes'] / (1024 * 1024):.0f} MB")
+            if r["em_cache"]:
+                extras.append("cache")
+            if r["erro"]:
+                extras.append(f"erro: {r['erro']}")
+            print(f"   {r['musica']:<30} {r['etapa']:<9} {r['segundos']:8.2f}s parede "
+                  f"{r['cpu_segundos']:8.2f}s CPU  {' | '.join(extras)}")
+
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def ativar_perfil(perfilador):
+    """Liga (Perfilador) ou desliga (None) a medição das etapas do pipeline."""
+    global _ativo
+    _ativo = perfilador
+
+
+def perfilador_ativo():
+    return _ativo
+
+
+@contextmanager
+def medir_etapa(nome_base, etapa, audio=None):
+    """
+    Mede o bloco com o perfilador ativo; sem perfilador, só entrega uma
+    Medicao vazia (custo desprezível).
+    """
+    if _ativo is None:
+        yield Medicao(nome_base, etapa, audio)
+        return
+    with _ativo.medir(nome_base, etapa, audio) as medicao:
+        yield medicao
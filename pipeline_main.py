@@ -10,17 +10,286 @@ NOVA ORDEM: Separa os vocals PRIMEIRO para melhorar a detecção de letra no Whi
 
 from pathlib import Path
 import argparse
+import hashlib
 import shutil
 import sys
+import time
 
-# importa funções dos módulos existentes
-from download_youtube_mp3 import download_youtube_audio
-from separar_instrumental import separar_faixas
-from gerar_legenda_base import transcrever_audio, gerar_srt
+# importa funções dos módulos existentes. Os frameworks pesados (torch/Demucs,
+# Whisper, WhisperX, yt-dlp, pydub) só são importados pelas etapas que os usam:
+# --help ou --etapa 5 não carregam nenhum (ver --relatorio-imports).
+from download_youtube_mp3 import FORMATOS_DOWNLOAD, download_youtube_audio, listar_playlist
+from formatos_audio import (EXTENSOES_AUDIO, FORMATOS_FAIXAS, INSTRUMENTAL, VOCALS, arquivo_faixa,
+                            arquivos_audio, caminho_faixa)
+from gerar_legenda_base import transcrever_audio, gerar_srt, MODELO_PADRAO as MODELO_WHISPER, IDIOMA_PADRAO as IDIOMA
+from motores_asr import MOTOR_PADRAO, MOTORES
 from gerar_legenda_dinamica import gerar_legenda_karaoke
-from video_karaoke_join_all import combinar_faixas_instrumentais, criar_video_com_legenda
+from tempos_palavras import caminho_tempos
+from video_karaoke_join_all import criar_video_direto, faixas_para_render, parametros_video, CONFIG_VIDEO
+from render_paralelo import renderizar_paralelo
+from audio_16k import ARQUIVO_16K
+from encoders_video import FPS_PADRAO
+from cache_modelos import definir_orcamento, imprimir_estatisticas_cache
+from agendador_lote import AgendadorDAG, POOLS_PADRAO, Tarefa, resumo_por_grupo
+from cache_artefatos import cache_ativo, definir_cache_ativo, executar_etapa, etapa_em_dia, ler_manifesto, registrar_manifesto
+from perfil_etapas import PASTA_PADRAO as PERFIL_DIR, Perfilador, ativar_perfil, medir_etapa, perfilador_ativo
 
-def main():
+# ========== PASTAS DO PROJETO ==========
+AUDIO_DIR = Path("audio")
+SUBTITLE_SRT_DIR = Path("subtitle_srt")
+SUBTITLE_ASS_DIR = Path("subtitle_ass")
+AUDIO_SEPARADO_DIR = Path("audio_separado")
+KARAOKES_DIR = Path("karaokes_completos")
+
+
+
+def garantir_pastas():
+    """Garante as pastas de saída (sempre criadas quando necessário)."""
+    for pasta in (SUBTITLE_SRT_DIR, SUBTITLE_ASS_DIR, AUDIO_SEPARADO_DIR, KARAOKES_DIR):
+        pasta.mkdir(exist_ok=True, parents=True)
+
+
+# ========== ETAPAS (usadas pelo modo de uma música e pelo modo em lote) ==========
+# Cada etapa grava um manifesto (ver cache_artefatos.py) e é pulada quando as
+# entradas e os parâmetros não mudaram desde a última execução. Com o perfil
+# ativo (--perfil, ver perfil_etapas.py), cada etapa também é medida.
+
+def etapa_download(url, trim=None, formato="nativo"):
+    """
+    Etapa 1: baixa o áudio e retorna o Path do arquivo.
+
+    No formato "nativo" o áudio fica no contêiner do YouTube (sem MP3) e o
+    corte é feito com cópia de stream. Além do manifesto por URL, o índice
+    de downloads (arquivo_downloads.py) evita baixar de novo o mesmo vídeo
+    vindo de outra URL (youtu.be, item de playlist...).
+    """
+    parametros = {"url": url, "trim": trim, "formato": formato}
+    id_download = hashlib.sha1(f"{url}|{trim}".encode("utf-8")).hexdigest()[:16]
+    with medir_etapa(None, "download") as medicao:
+        manifesto = ler_manifesto("_downloads", id_download)
+        if manifesto and etapa_em_dia("_downloads", id_download, [], parametros, manifesto["saidas"]):
+            audio_path = Path(manifesto["saidas"][0])
+            print(f"  ⏭️  Download já realizado: {audio_path}")
+            medicao.em_cache = True
+        else:
+            downloaded = download_youtube_audio(url, trim_seconds=trim, formato=formato)
+            audio_path = Path(downloaded)
+            if not audio_path.exists():
+                raise FileNotFoundError(f"Arquivo baixado não encontrado: {audio_path}")
+            registrar_manifesto("_downloads", id_download, [], parametros, [audio_path])
+        medicao.nome_base, medicao.audio = audio_path.stem, audio_path
+    return audio_path
+
+
+def etapa_separar(audio_path, nome_base, dispositivo=None, streaming=False, faixas=(VOCALS,), formato="pcm16",
+                  modelo=None, duas_faixas=False):
+    """
+    Etapa 2: separa as faixas e retorna (pasta das faixas, caminho dos vocais).
+
+    Por padrão só os vocais e o instrumental somado são gravados, em WAV PCM
+    16 bits: é tudo o que as etapas seguintes usam. Com duas_faixas=True o
+    modelo só produz vocals x acompanhamento (padrão: MODELO_DUAS_FAIXAS).
+    """
+    from separar_instrumental import MODELO_DUAS_FAIXAS, MODELO_PADRAO as MODELO_DEMUCS, separar_faixas
+
+    modelo = modelo or (MODELO_DUAS_FAIXAS if duas_faixas else MODELO_DEMUCS)
+    out_separado_dir = AUDIO_SEPARADO_DIR / nome_base
+    faixas = sorted(set(faixas) | {VOCALS})  # as etapas 3 e 4 sempre usam os vocais
+    vocals_path = arquivo_faixa(out_separado_dir, VOCALS, formato)
+    # O instrumental já sai somado do tensor da separação
+    # e os vocais já saem em 16 kHz mono (vocals_16k.npy) para as etapas 3 e 4.
+    # Como o dispositivo, o streaming só muda como a separação roda (não entra no cache).
+    saidas = [arquivo_faixa(out_separado_dir, nome, formato) for nome in faixas]
+    saidas += [arquivo_faixa(out_separado_dir, INSTRUMENTAL, formato), out_separado_dir / ARQUIVO_16K]
+    with medir_etapa(nome_base, "separar", audio_path) as medicao:
+        medicao.em_cache = not executar_etapa(
+            nome_base, "separacao", [audio_path],
+            {"modelo": modelo, "instrumental": True, "buffer_16k": True, "faixas": faixas, "formato": formato,
+             "duas_faixas": duas_faixas},
+            saidas,
+            lambda: separar_faixas(str(audio_path), str(out_separado_dir), model_name=modelo,
+                                   device=dispositivo, gerar_instrumental=True, salvar_16k=True,
+                                   streaming=streaming, faixas=faixas, formato=formato, duas_faixas=duas_faixas),
+        )
+    if not vocals_path.exists():
+        raise FileNotFoundError(f"Arquivo {vocals_path.name} não encontrado em {out_separado_dir}")
+    return out_separado_dir, vocals_path
+
+
+def etapa_srt(vocals_path, nome_base, vad=False, motor=MOTOR_PADRAO, threads=None, batch_size=None):
+    """Etapa 3: transcreve os vocals e retorna o caminho do .srt."""
+    srt_out = SUBTITLE_SRT_DIR / f"{nome_base}.srt"
+
+    def executar():
+        segmentos = transcrever_audio(str(vocals_path), model_size=MODELO_WHISPER, idioma=IDIOMA, vad=vad,
+                                      motor=motor, threads=threads, batch_size=batch_size)
+        gerar_srt(segmentos, str(srt_out))
+
+    with medir_etapa(nome_base, "srt", vocals_path) as medicao:
+        medicao.em_cache = not executar_etapa(nome_base, "srt", [vocals_path],
+                                              {"modelo": MODELO_WHISPER, "idioma": IDIOMA, "vad": vad, "motor": motor},
+                                              [srt_out], executar)
+    return srt_out
+
+
+def etapa_ass(vocals_path, srt_out, nome_base, alinhamento="whisperx"):
+    """Etapa 4: alinha palavra por palavra e retorna o caminho do .ass."""
+    ass_out = SUBTITLE_ASS_DIR / f"{nome_base}.ass"
+    entradas = [vocals_path, srt_out]
+    tempos_srt = caminho_tempos(srt_out)
+    if alinhamento == "whisper" and tempos_srt.exists():
+        entradas.append(tempos_srt)
+    with medir_etapa(nome_base, "ass", vocals_path) as medicao:
+        medicao.em_cache = not executar_etapa(
+            nome_base, "ass", entradas, {"alinhador": alinhamento, "idioma": IDIOMA},
+            [ass_out, caminho_tempos(ass_out)],
+            lambda: gerar_legenda_karaoke(str(vocals_path), str(srt_out), str(ass_out), idioma=IDIOMA,
+                                          alinhamento=alinhamento, cache_segmentos=cache_ativo()),
+        )
+    return ass_out
+
+
+def etapa_video(out_separado_dir, ass_out, nome_base, imagem, encoder="auto", fps=FPS_PADRAO, partes=1):
+    """Etapa 5: gera o vídeo final (mixagem + encode num só ffmpeg) e retorna o seu caminho."""
+    imagem_fundo = Path(imagem)
+    if not imagem_fundo.exists():
+        raise FileNotFoundError(f"Imagem de fundo não encontrada: {imagem_fundo}")
+
+    # Um único ffmpeg recebe as faixas WAV e faz a mixagem (sem MP3 temporário)
+    faixas = faixas_para_render(out_separado_dir)
+    arquivo_video_final = KARAOKES_DIR / f"{nome_base}_karaoke.mp4"
+
+    def executar():
+        if partes != 1:
+            # Fatias de tempo renderizadas em paralelo (ver render_paralelo.py)
+            renderizar_paralelo(faixas, ass_out, arquivo_video_final, imagem_fundo, partes=partes,
+                                encoder=encoder, fps=fps, escala=CONFIG_VIDEO["escala"],
+                                codec_audio=CONFIG_VIDEO["codec_audio"],
+                                bitrate_audio=CONFIG_VIDEO["bitrate_audio"])
+        else:
+            criar_video_direto(faixas, ass_out, arquivo_video_final, imagem_fundo, encoder=encoder, fps=fps)
+
+    # Mixagem e encode são o mesmo ffmpeg: medidos juntos
+    with medir_etapa(nome_base, "video", faixas[0] if faixas else None) as medicao:
+        medicao.em_cache = not executar_etapa(nome_base, "video", [*faixas, ass_out, imagem_fundo],
+                                              parametros_video(encoder, fps), [arquivo_video_final], executar)
+    return arquivo_video_final
+
+
+# ========== MODO EM LOTE ==========
+def listar_itens_lote(origem):
+    """
+    Lê a origem do lote e retorna uma lista de dicionários {'url': ...} ou {'audio': Path}.
+
+    - Arquivo texto: uma URL por linha (linhas vazias e iniciadas por # são ignoradas);
+      URLs de playlist (com list=) são expandidas nos seus vídeos
+    - Pasta: todos os arquivos de áudio dentro dela (começam na etapa 2)
+    """
+    origem = Path(origem)
+    if origem.is_dir():
+        arquivos = sorted(a for a in origem.iterdir() if a.suffix.lower() in EXTENSOES_AUDIO)
+        return [{"audio": a} for a in arquivos]
+    if origem.is_file():
+        linhas = origem.read_text(encoding="utf-8").splitlines()
+        urls = [l.strip() for l in linhas if l.strip() and not l.strip().startswith("#")]
+        return [{"url": u} for url in urls for u in (listar_playlist(url) if "list=" in url else [url])]
+    raise FileNotFoundError(f"Origem do lote não encontrada: {origem}")
+
+
+def adicionar_musica(agendador, ctx, grupo, args, prioridade=0):
+    """
+    Adiciona ao agendador as tarefas de uma música (download -> separar ->
+    srt -> ass -> vídeo), encadeadas por dependência.
+
+    `ctx` é um dict com 'url' ou 'audio'; as etapas gravam nele os
+    resultados ('audio', 'nome_base', 'separado', 'vocals', 'srt', 'ass',
+    'video'). Usado pelo modo em lote e pelo serviço residente
+    (servico_karaoke.py).
+
+    Returns:
+        list: nomes das tarefas adicionadas, na ordem das etapas
+    """
+    if "audio" in ctx:
+        ctx["audio"] = Path(ctx["audio"])
+        ctx["nome_base"] = ctx["audio"].stem
+
+    def download():
+        print(f"1️⃣  [{grupo}] Download do áudio...")
+        ctx["audio"] = etapa_download(ctx["url"], args.trim, args.formato_download)
+        ctx["nome_base"] = ctx["audio"].stem
+        print(f"  -> [{grupo}] Arquivo obtido: {ctx['audio'].name}")
+
+    def separar():
+        print(f"2️⃣  [{grupo}] Separando faixas (Demucs)...")
+        ctx["separado"], ctx["vocals"] = etapa_separar(
+            ctx["audio"], ctx["nome_base"], args.dispositivo, args.streaming, args.faixas,
+            args.formato_faixas, args.modelo_separacao, args.duas_faixas)
+
+    def srt():
+        print(f"3️⃣  [{grupo}] Gerando legenda SRT...")
+        ctx["srt"] = etapa_srt(ctx["vocals"], ctx["nome_base"], args.vad,
+                               args.motor_asr, args.asr_threads, args.asr_batch)
+
+    def ass():
+        print(f"4️⃣  [{grupo}] Gerando legenda dinâmica (.ass)...")
+        ctx["ass"] = etapa_ass(ctx["vocals"], ctx["srt"], ctx["nome_base"], args.alinhamento)
+
+    def video():
+        print(f"5️⃣  [{grupo}] Criando vídeo final...")
+        ctx["video"] = etapa_video(ctx["separado"], ctx["ass"], ctx["nome_base"], args.imagem,
+                                   args.encoder, args.fps, args.partes)
+        print(f"  -> [{grupo}] Vídeo final: {ctx['video']}")
+
+    etapas = [("separar", "acelerador", separar), ("srt", "acelerador", srt),
+              ("ass", "acelerador", ass), ("video", "cpu", video)]
+    if "url" in ctx:
+        etapas.insert(0, ("download", "rede", download))
+
+    nomes = []
+    for ordem, (nome, pool, funcao) in enumerate(etapas):
+        tarefa = Tarefa(f"{grupo}:{nome}", grupo, pool, funcao,
+                        depende=nomes[-1:], prioridade=(prioridade, ordem))
+        agendador.adicionar(tarefa)
+        nomes.append(tarefa.nome)
+    return nomes
+
+
+def executar_lote(itens, args, concorrencia=None):
+    """
+    Processa várias músicas com as etapas agendadas em DAG (ver agendador_lote.py).
+
+    Returns:
+        dict: resumo por música (ok, tempos por etapa, erro)
+    """
+    garantir_pastas()
+    agendador = AgendadorDAG(concorrencia)
+
+    for i, item in enumerate(itens):
+        grupo = f"{i + 1:03d}"
+        if "audio" in item:
+            grupo = f"{grupo}-{Path(item['audio']).stem}"
+        adicionar_musica(agendador, dict(item), grupo, args, prioridade=i)
+
+    inicio = time.perf_counter()
+    resumo = resumo_por_grupo(agendador.executar())
+    decorrido = time.perf_counter() - inicio
+
+    print(f"\n{'='*60}")
+    print(f"📋 RESUMO DO LOTE ({decorrido:.1f}s)")
+    print(f"{'='*60}")
+    for grupo, item in resumo.items():
+        tempos = ", ".join(f"{k}={v:.1f}s" for k, v in item["tempos"].items())
+        if item["ok"]:
+            print(f"  ✅ {grupo}: {tempos}")
+        else:
+            print(f"  ❌ {grupo}: {item['erro'] or 'etapa anterior falhou'} ({tempos})")
+    ok = sum(1 for item in resumo.values() if item["ok"])
+    print(f"  {ok}/{len(resumo)} música(s) concluída(s)")
+    return resumo
+
+
+def criar_parser():
+    """Parser da linha de comando (também dá os padrões das opções dos jobs do servico_karaoke.py)."""
     parser = argparse.ArgumentParser(
         description="Pipeline otimizado: download -> separar -> legenda SRT (vocals) -> legenda ASS (vocals) -> vídeo"
     )
@@ -29,7 +298,7 @@ def main():
         type=int, 
         choices=[1, 2, 3, 4, 5], 
         default=1, 
-        help="Etapa inicial do pipeline (1 a 5, padrão: 1)"
+        help="Etapa inicial do pipeline (1 a 5, padrão: 1). Etapas cujas entradas não mudaram já são puladas pelo cache."
     )
     parser.add_argument(
         "--nome", 
@@ -46,30 +315,188 @@ def main():
         default=None, 
         help="Cortar áudio para primeiros N segundos"
     )
+    parser.add_argument(
+        "--formato-download",
+        choices=list(FORMATOS_DOWNLOAD),
+        default="nativo",
+        help="Etapa 1: nativo (padrão; contêiner do YouTube, sem recodificar) ou mp3"
+    )
     parser.add_argument(
         "--imagem", 
         default="karaoke-hugo.jpg", 
         help="Imagem de fundo para o vídeo final"
     )
+    parser.add_argument(
+        "--vad",
+        action="store_true",
+        help="Etapa 3: transcreve só os trechos com voz do vocals.wav (pula silêncios)"
+    )
+    parser.add_argument(
+        "--motor-asr",
+        choices=list(MOTORES),
+        default=MOTOR_PADRAO,
+        help="Etapa 3: motor de transcrição (faster-whisper = int8 na CPU)"
+    )
+    parser.add_argument(
+        "--asr-threads",
+        type=int,
+        default=None,
+        help="Etapa 3 (faster-whisper): threads da CPU (padrão: todos os núcleos)"
+    )
+    parser.add_argument(
+        "--asr-batch",
+        type=int,
+        default=None,
+        help="Etapa 3 (faster-whisper): tamanho do lote (padrão: 1)"
+    )
+    parser.add_argument(
+        "--alinhamento",
+        choices=["whisperx", "whisper"],
+        default="whisperx",
+        help="Etapa 4: whisperx (wav2vec, padrão) ou whisper (tempos por palavra da etapa 3, sem modelo de alinhamento)"
+    )
+    parser.add_argument(
+        "--encoder",
+        choices=["auto", "nvenc", "x264", "x265"],
+        default="auto",
+        help="Encoder de vídeo da etapa 5 (padrão: auto, com fallback para a CPU)"
+    )
+    parser.add_argument(
+        "--fps",
+        type=int,
+        default=FPS_PADRAO,
+        help=f"Taxa de quadros do vídeo final (padrão: {FPS_PADRAO})"
+    )
+    parser.add_argument(
+        "--partes",
+        type=int,
+        default=1,
+        help="Etapa 5: fatias de tempo renderizadas em paralelo (1 = um só ffmpeg, 0 = automático pelos núcleos)"
+    )
+    parser.add_argument(
+        "--dispositivo",
+        choices=["cuda", "cpu"],
+        default=None,
+        help="Dispositivo da separação Demucs (padrão: cuda se disponível, senão cpu)"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Etapa 2: separa em janelas gravando direto no disco (memória constante para áudios longos)"
+    )
+    parser.add_argument(
+        "--modelo-separacao",
+        default=None,
+        help="Etapa 2: modelo Demucs (padrão: o MODELO_PADRAO do separar_instrumental.py; "
+             "o MODELO_DUAS_FAIXAS com --duas-faixas)"
+    )
+    parser.add_argument(
+        "--duas-faixas",
+        action="store_true",
+        help="Etapa 2: modo rápido vocals x acompanhamento (ver benchmarks/benchmark_separacao.py)"
+    )
+    parser.add_argument(
+        "--faixas",
+        nargs="+",
+        default=[VOCALS],
+        help="Etapa 2: fontes do Demucs a gravar além do instrumental (padrão: vocals; ex.: vocals drums bass)"
+    )
+    parser.add_argument(
+        "--formato-faixas",
+        choices=list(FORMATOS_FAIXAS),
+        default="pcm16",
+        help="Etapa 2: formato das faixas gravadas: pcm16 (padrão), flac ou float"
+    )
+    parser.add_argument(
+        "--cache-modelos-mb",
+        type=float,
+        default=None,
+        help="Orçamento de memória (MB) do cache de modelos; 0 = sem limite (padrão: KARAOKE_CACHE_MODELOS_MB)"
+    )
+    parser.add_argument(
+        "--perfil", "--profile",
+        action="store_true",
+        help="Mede cada etapa (parede, CPU, pico de RSS/GPU, RTF) em perfil/etapas.jsonl e perfil/karaoke.prom"
+    )
+    parser.add_argument(
+        "--perfil-dir",
+        default=str(PERFIL_DIR),
+        help=f"Pasta das medições do --perfil (padrão: {PERFIL_DIR})"
+    )
+    parser.add_argument(
+        "--perfil-cprofile",
+        choices=["download", "separar", "srt", "ass", "video"],
+        default=None,
+        help="Roda essa etapa sob o cProfile e grava <nome>_<etapa>.prof (pstats) na pasta do perfil"
+    )
+    parser.add_argument(
+        "--relatorio-imports",
+        action="store_true",
+        help="Só mostra o tempo e a memória de importação de cada etapa (e que frameworks cada uma carrega) e sai"
+    )
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help="Ignora os manifestos e recalcula todas as etapas"
+    )
+    parser.add_argument(
+        "--lote",
+        help="Modo em lote: arquivo com uma URL por linha ou pasta com arquivos de áudio"
+    )
+    parser.add_argument(
+        "--rede",
+        type=int,
+        default=POOLS_PADRAO["rede"],
+        help=f"Lote: downloads simultâneos (padrão: {POOLS_PADRAO['rede']})"
+    )
+    parser.add_argument(
+        "--acelerador",
+        type=int,
+        default=POOLS_PADRAO["acelerador"],
+        help=f"Lote: etapas de separação/transcrição/alinhamento simultâneas (padrão: {POOLS_PADRAO['acelerador']})"
+    )
+    parser.add_argument(
+        "--encode",
+        type=int,
+        default=POOLS_PADRAO["cpu"],
+        help=f"Lote: encodes ffmpeg simultâneos (padrão: {POOLS_PADRAO['cpu']})"
+    )
+    return parser
+
+
+def main():
+    parser = criar_parser()
     args = parser.parse_args()
 
+    if args.relatorio_imports:
+        from relatorio_imports import imprimir_relatorio_imports
+        imprimir_relatorio_imports()
+        return
+
+    if args.cache_modelos_mb is not None:
+        definir_orcamento(args.cache_modelos_mb)
+    if args.sem_cache:
+        definir_cache_ativo(False)
+    if args.perfil or args.perfil_cprofile:
+        ativar_perfil(Perfilador(args.perfil_dir, args.perfil_cprofile))
+
+    if args.lote:
+        itens = listar_itens_lote(args.lote)
+        if args.url:
+            itens.insert(0, {"url": args.url})
+        if not itens:
+            parser.error(f"Nenhuma URL ou arquivo de áudio encontrado em {args.lote}")
+        resumo = executar_lote(itens, args, {"rede": args.rede, "acelerador": args.acelerador, "cpu": args.encode})
+        imprimir_estatisticas_cache()
+        if perfilador_ativo():
+            perfilador_ativo().imprimir_resumo()
+        sys.exit(0 if all(item["ok"] for item in resumo.values()) else 1)
+
     # Validações iniciais
     if args.etapa == 1 and not args.url:
         parser.error("A URL é obrigatória quando etapa=1.")
 
     try:
-        # ========== FUNÇÃO PARA BUSCAR ARQUIVO MAIS RECENTE ==========
-        def buscar_mais_recente(pasta, padrao):
-            """Retorna o Path do arquivo mais recente que corresponde ao padrão."""
-            dir_path = Path(pasta)
-            if not dir_path.exists():
-                return None
-            arquivos = list(dir_path.glob(padrao))
-            if not arquivos:
-                return None
-            # Retorna o arquivo com timestamp de modificação mais recente
-            return max(arquivos, key=lambda x: x.stat().st_mtime)
-
         # ========== DETERMINAR O NOME BASE DO PROJETO ==========
         nome_base = None
         
@@ -80,26 +507,23 @@ def main():
         else:
             # Tenta descobrir o nome base automaticamente baseado na etapa
             if args.etapa >= 2:
-                # Para etapa 2+, busca o áudio mais recente em audio/
-                audio_recente = buscar_mais_recente("audio", "*.mp3")
-                if audio_recente:
-                    nome_base = audio_recente.stem
+                # Para etapa 2+, busca o áudio mais recente em audio/ (mp3 ou contêiner nativo)
+                recentes = arquivos_audio(AUDIO_DIR)
+                if recentes:
+                    nome_base = recentes[0].stem
                     print(f"  -> Nome base detectado do áudio mais recente: '{nome_base}'")
                 else:
-                    raise FileNotFoundError("Nenhum arquivo .mp3 encontrado em audio/. Use --nome para especificar.")
+                    raise FileNotFoundError("Nenhum arquivo de áudio encontrado em audio/. Use --nome para especificar.")
             else:
                 # Para etapa 1, o nome será gerado a partir do download
                 pass
 
         # Garantir pastas de saída (sempre criadas quando necessário)
-        subtitle_srt_dir = Path("subtitle_srt")
-        subtitle_srt_dir.mkdir(exist_ok=True, parents=True)
-        subtitle_ass_dir = Path("subtitle_ass")
-        subtitle_ass_dir.mkdir(exist_ok=True, parents=True)
-        audio_separado_base = Path("audio_separado")
-        audio_separado_base.mkdir(exist_ok=True, parents=True)
-        karaokes_dir = Path("karaokes_completos")
-        karaokes_dir.mkdir(exist_ok=True, parents=True)
+        garantir_pastas()
+        subtitle_srt_dir = SUBTITLE_SRT_DIR
+        subtitle_ass_dir = SUBTITLE_ASS_DIR
+        audio_separado_base = AUDIO_SEPARADO_DIR
+        karaokes_dir = KARAOKES_DIR
 
         # ========== ETAPA 1: Download do áudio ==========
         if args.etapa <= 1:
@@ -107,55 +531,40 @@ def main():
             if not args.url:
                 raise ValueError("URL do YouTube é necessária para a etapa 1.")
             
-            downloaded = download_youtube_audio(args.url, trim_seconds=args.trim)
-            audio_path = Path(downloaded)
-            if not audio_path.exists():
-                raise FileNotFoundError(f"Arquivo baixado não encontrado: {audio_path}")
-            
+            audio_path = etapa_download(args.url, args.trim, args.formato_download)
             nome_base = audio_path.stem  # Atualiza o nome base com o do download
             print(f"  -> Arquivo obtido: {audio_path.name}")
         else:
             # Para etapas 2+, constrói o caminho do áudio baseado no nome
-            audio_dir = Path("audio")
-            audio_path = audio_dir / f"{nome_base}.mp3"
-            if not audio_path.exists():
-                # Tenta encontrar qualquer arquivo de áudio com esse nome base
-                possiveis = list(audio_dir.glob(f"{nome_base}.*"))
-                if possiveis:
-                    audio_path = possiveis[0]
-                    print(f"  -> Usando arquivo de áudio: {audio_path.name}")
-                else:
-                    raise FileNotFoundError(f"Nenhum arquivo de áudio encontrado para '{nome_base}' em audio/")
-            else:
-                print(f"  -> Usando arquivo de áudio: {audio_path.name}")
+            # (qualquer extensão de áudio; se houver mais de uma, a mais recente)
+            possiveis = arquivos_audio(AUDIO_DIR, nome_base)
+            if not possiveis:
+                raise FileNotFoundError(f"Nenhum arquivo de áudio encontrado para '{nome_base}' em audio/")
+            audio_path = possiveis[0]
+            print(f"  -> Usando arquivo de áudio: {audio_path.name}")
 
         # ========== ETAPA 2: Separar instrumental (NOVO - ANTES da legenda) ==========
         if args.etapa <= 2:
             print("2️⃣  Separando faixas (Demucs) - extraindo vocals.wav...")
-            out_separado_dir = audio_separado_base / nome_base
-            separar_faixas(str(audio_path), str(out_separado_dir))
+            out_separado_dir, vocals_path = etapa_separar(
+                audio_path, nome_base, args.dispositivo, args.streaming, args.faixas,
+                args.formato_faixas, args.modelo_separacao, args.duas_faixas)
             print(f"  -> Faixas salvas em: {out_separado_dir}")
-            
-            # Caminho do vocals.wav para as próximas etapas
-            vocals_path = out_separado_dir / "vocals.wav"
-            if not vocals_path.exists():
-                raise FileNotFoundError(f"Arquivo vocals.wav não encontrado em {out_separado_dir}")
             print(f"  -> Usando vocals para detecção: {vocals_path}")
         else:
             # Para etapas 3+, constrói o caminho do vocals
             out_separado_dir = audio_separado_base / nome_base
-            vocals_path = out_separado_dir / "vocals.wav"
-            if not vocals_path.exists():
-                raise FileNotFoundError(f"Arquivo vocals.wav não encontrado em {out_separado_dir}. Execute etapa 2 primeiro.")
+            vocals_path = caminho_faixa(out_separado_dir, VOCALS)
+            if vocals_path is None:
+                raise FileNotFoundError(f"Arquivo de vocais não encontrado em {out_separado_dir}. Execute etapa 2 primeiro.")
             print(f"  -> Usando vocals: {vocals_path}")
 
         # ========== ETAPA 3: Gerar legenda base (.srt) COM VOCALS ==========
         if args.etapa <= 3:
             print("3️⃣  Gerando legenda SRT (legenda base) usando VOCALS...")
             print(f"  -> Transcrevendo: {vocals_path}")
-            segmentos = transcrever_audio(str(vocals_path))
-            srt_out = subtitle_srt_dir / f"{nome_base}.srt"
-            gerar_srt(segmentos, str(srt_out))
+            srt_out = etapa_srt(vocals_path, nome_base, args.vad,
+                                args.motor_asr, args.asr_threads, args.asr_batch)
             print(f"  -> SRT gerado: {srt_out}")
         else:
             # Para etapas 4+, encontra o SRT correspondente
@@ -175,8 +584,7 @@ def main():
         if args.etapa <= 4:
             print("4️⃣  Gerando legenda dinâmica (.ass) karaokê usando VOCALS...")
             print(f"  -> Alinhando: {vocals_path}")
-            ass_out = subtitle_ass_dir / f"{nome_base}.ass"
-            gerar_legenda_karaoke(str(vocals_path), str(srt_out), str(ass_out))
+            ass_out = etapa_ass(vocals_path, srt_out, nome_base, args.alinhamento)
             print(f"  -> ASS gerado: {ass_out}")
         else:
             # Para etapa 5, encontra o ASS
@@ -194,23 +602,13 @@ def main():
         # ========== ETAPA 5: Juntar vídeo ==========
         if args.etapa <= 5:
             print("5️⃣  Combinando instrumentais e criando vídeo final...")
-            
-            arquivo_audio_temp = karaokes_dir / f"{nome_base}_instrumental.mp3"
-            combinar_faixas_instrumentais(out_separado_dir, arquivo_audio_temp)
-
-            arquivo_video_final = karaokes_dir / f"{nome_base}_karaoke.mp4"
-
-            imagem_fundo = Path(args.imagem)
-            if not imagem_fundo.exists():
-                raise FileNotFoundError(f"Imagem de fundo não encontrada: {imagem_fundo}")
-
-            criar_video_com_legenda(arquivo_audio_temp, ass_out, arquivo_video_final, imagem_fundo)
-
-            # remover temporário
-            if arquivo_audio_temp.exists():
-                arquivo_audio_temp.unlink()
+            arquivo_video_final = etapa_video(out_separado_dir, ass_out, nome_base, args.imagem,
+                                              args.encoder, args.fps, args.partes)
             print(f"  -> Vídeo final: {arquivo_video_final}")
 
+        imprimir_estatisticas_cache()
+        if perfilador_ativo():
+            perfilador_ativo().imprimir_resumo()
         print("\n✅ Pipeline concluído com sucesso!")
         print(f"📁 Vídeo: {karaokes_dir / f'{nome_base}_karaoke.mp4'}")
 
@@ -0,0 +1,128 @@
+"""
+relatorio_imports.py
+
+Relatório do custo de importação do pipeline (pipeline_main.py
+--relatorio-imports): quanto tempo e memória o próprio pipeline_main leva
+para carregar e o que cada etapa importa a mais quando roda, com as opções
+padrão. Cada medição roda num processo Python novo, para que uma etapa não
+herde os módulos já carregados por outra.
+
+O pipeline_main em si não deve carregar nenhum framework pesado (ver
+FRAMEWORKS): cada etapa importa o seu dentro da própria função.
+"""
+
+import importlib
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RAIZ = Path(__file__).resolve().parent
+
+# Pacotes que valem a pena acompanhar (pesados de importar ou de memória)
+FRAMEWORKS = ("torch", "torchaudio", "demucs", "whisper", "whisperx", "faster_whisper", "ctranslate2",
+              "transformers", "pyannote", "yt_dlp", "pydub")
+
+# O que cada etapa importa quando roda (opções padrão). Etapa 5 usa só o ffmpeg.
+IMPORTS_ETAPAS = {
+    "download": ("yt_dlp",),
+    "separar": ("separar_instrumental",),
+    "srt": ("whisper",),  # motor padrão; o faster-whisper importa faster_whisper
+    "ass": ("whisperx",),  # alinhamento padrão; o caminho "whisper" não importa nada
+    "video": (),
+}
+
+_MARCA = "@@IMPORTS@@"
+
+
+def _rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _pacotes():
+    return {nome.split(".")[0] for nome in sys.modules}
+
+
+def _importar(modulos):
+    """(segundos, novos pacotes, erro) ao importar os módulos neste processo."""
+    antes = _pacotes()
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        for modulo in modulos:
+            importlib.import_module(modulo)
+    except Exception as e:  # ImportError ou erro de inicialização do pacote
+        erro = repr(e)
+    return time.perf_counter() - inicio, _pacotes() - antes, erro
+
+
+def _medir_no_processo(modulos):
+    """Executado no processo filho: importa o pipeline_main e depois os módulos da etapa."""
+    sys.path.insert(0, str(RAIZ))
+    segundos_base, novos_base, erro_base = _importar(["pipeline_main"])
+    rss_base = _rss_mb()
+    segundos, novos, erro = _importar(modulos)
+    print(_MARCA + json.dumps({
+        "base_segundos": segundos_base,
+        "base_rss_mb": rss_base,
+        "base_frameworks": sorted(novos_base & set(FRAMEWORKS)),
+        "segundos": segundos,
+        "rss_mb": _rss_mb(),
+        "frameworks": sorted(novos & set(FRAMEWORKS)),
+        "pacotes": len(novos),
+        "erro": erro_base or erro,
+    }))
+
+
+def medir_imports(modulos=()):
+    """Mede num processo novo o import do pipeline_main seguido de `modulos`."""
+    codigo = (f"import sys; sys.path.insert(0, {str(RAIZ)!r}); "
+              f"import relatorio_imports; relatorio_imports._medir_no_processo({list(modulos)!r})")
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=str(RAIZ))
+    for linha in reversed(saida.stdout.splitlines()):
+        if linha.startswith(_MARCA):
+            return json.loads(linha[len(_MARCA):])
+    raise RuntimeError(f"Falha ao medir imports de {modulos}: {saida.stderr.strip()[-500:]}")
+
+
+def relatorio_imports():
+    """{'pipeline_main': medição, '<etapa>': medição, ...}"""
+    relatorio = {"pipeline_main": medir_imports()}
+    for etapa, modulos in IMPORTS_ETAPAS.items():
+        relatorio[etapa] = medir_imports(modulos)
+    return relatorio
+
+
+def _fmt_mb(valor):
+    return "     -" if valor is None else f"{valor:6.0f}"
+
+
+def imprimir_relatorio_imports():
+    relatorio = relatorio_imports()
+    base = relatorio["pipeline_main"]
+    print(f"\n{'='*78}")
+    print("📦 IMPORTS POR ETAPA (cada linha num processo novo)")
+    print(f"{'='*78}")
+    print(f"  {'etapa':<14} {'tempo':>8} {'RSS MB':>7}  frameworks")
+    print(f"  {'pipeline_main':<14} {base['base_segundos']:7.2f}s {_fmt_mb(base['base_rss_mb'])}  "
+          f"{', '.join(base['base_frameworks']) or 'nenhum'}")
+    for etapa, medicao in relatorio.items():
+        if etapa == "pipeline_main":
+            continue
+        if medicao["erro"]:
+            print(f"  {etapa:<14} ❌ {medicao['erro']}")
+            continue
+        print(f"  {etapa:<14} {medicao['segundos']:+7.2f}s {_fmt_mb(medicao['rss_mb'])}  "
+              f"{', '.join(medicao['frameworks']) or 'nenhum'} ({medicao['pacotes']} pacotes novos)")
+    if base["base_frameworks"]:
+        print(f"\n⚠️  O pipeline_main carregou frameworks pesados já no import: {', '.join(base['base_frameworks'])}")
@@ -0,0 +1,249 @@
+"""
+render_paralelo.py
+
+Renderização da etapa 5 em fatias de tempo processadas em paralelo.
+
+O filtro `ass=` do ffmpeg é praticamente single-thread, então um único
+processo não aproveita uma CPU com muitos núcleos. Aqui a linha do tempo é
+dividida em N fatias alinhadas à grade de quadros; cada fatia recebe um .ass
+com os eventos deslocados para começar em zero e é codificada (só vídeo) por
+um ffmpeg próprio. Como cada fatia começa num keyframe, elas são unidas com o
+concat demuxer sem recodificar, e o áudio é mixado e codificado uma única vez
+nesse passo final.
+"""
+
+import math
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from encoders_video import FPS_PADRAO, argumentos_video, escolher_encoder
+
+FATIA_MINIMA_SEGUNDOS = 30
+MAX_FATIAS_NVENC = 2  # GPUs de consumo limitam as sessões simultâneas do NVENC
+
+
+# ========== DURAÇÃO DO ÁUDIO ==========
+def duracao_audio(caminho):
+    """
+    Duração em segundos. Para WAV (inclusive float, que o módulo `wave` não lê)
+    usa o cabeçalho RIFF; para outros formatos recorre ao ffprobe.
+    """
+    caminho = Path(caminho)
+    if caminho.suffix.lower() == ".wav":
+        with open(caminho, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff == b"RIFF" and wave == b"WAVE":
+                byte_rate = None
+                while True:
+                    cabecalho = f.read(8)
+                    if len(cabecalho) < 8:
+                        break
+                    chunk, tamanho = struct.unpack("<4sI", cabecalho)
+                    if chunk == b"fmt ":
+                        dados = f.read(tamanho)
+                        byte_rate = struct.unpack("<I", dados[8:12])[0]
+                    elif chunk == b"data" and byte_rate:
+                        return tamanho / byte_rate
+                    else:
+                        f.seek(tamanho + (tamanho & 1), 1)
+
+    saida = subprocess.check_output([
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(caminho),
+    ])
+    return float(saida.decode("utf-8").strip())
+
+
+# ========== DESLOCAMENTO DO .ASS ==========
+_TEMPO_ASS = re.compile(r"(\d+):(\d{2}):(\d{2})\.(\d{2})")
+_TAG_K = re.compile(r"\{\\k(\d+)\}")
+
+
+def _ass_para_segundos(texto):
+    h, m, s, cs = (int(x) for x in _TEMPO_ASS.fullmatch(texto.strip()).groups())
+    return h * 3600 + m * 60 + s + cs / 100
+
+
+def _segundos_para_ass(seconds):
+    """Mesmo formato de gerar_legenda_dinamica.format_time (H:MM:SS.ss)."""
+    seconds = max(0.0, seconds)
+    h = int(seconds // 3600)
+    m = int((seconds % 3600) // 60)
+    s = int(seconds % 60)
+    cs = int(round((seconds - int(seconds)) * 100))
+    if cs == 100:
+        return _segundos_para_ass(math.floor(seconds) + 1)
+    return f"{h:01}:{m:02}:{s:02}.{cs:02}"
+
+
+def _descontar_karaoke(texto, centisegundos):
+    """
+    Remove `centisegundos` do início da sequência de tags {\\kNN}, para uma
+    linha cortada no meio: palavras já cantadas ficam com \\k0 (preenchidas
+    de imediato) e a palavra em andamento fica só com o tempo restante.
+    """
+    restante = [centisegundos]
+
+    def ajustar(match):
+        duracao = int(match.group(1))
+        consumido = min(duracao, restante[0])
+        restante[0] -= consumido
+        return "{\\k" + str(duracao - consumido) + "}"
+
+    return _TAG_K.sub(ajustar, texto)
+
+
+def fatiar_ass(conteudo_ass, inicio, fim):
+    """
+    Gera o .ass de uma fatia [inicio, fim): mantém só os eventos que tocam a
+    fatia, desloca os tempos para começar em zero e ajusta as tags de karaokê
+    das linhas que começaram antes da fatia.
+    """
+    saida = []
+    for linha in conteudo_ass.splitlines():
+        if not linha.startswith("Dialogue:"):
+            saida.append(linha)
+            continue
+
+        prefixo, resto = linha.split(":", 1)
+        campos = resto.split(",", 9)
+        ini_evento = _ass_para_segundos(campos[1])
+        fim_evento = _ass_para_segundos(campos[2])
+        if fim_evento <= inicio or ini_evento >= fim:
+            continue
+
+        texto = campos[9]
+        if ini_evento < inicio:
+            texto = _descontar_karaoke(texto, int(round((inicio - ini_evento) * 100)))
+        campos[1] = _segundos_para_ass(ini_evento - inicio)
+        campos[2] = _segundos_para_ass(min(fim_evento, fim) - inicio)
+        campos[9] = texto
+        saida.append(f"{prefixo}:{','.join(campos)}")
+    return "\n".join(saida) + "\n"
+
+
+# ========== RENDERIZAÇÃO EM FATIAS ==========
+def filtro_mixagem(quantidade, primeira_entrada=1):
+    """Filtro de áudio do ffmpeg que soma `quantidade` entradas em [a] (amix + limitador)."""
+    if quantidade == 1:
+        return f"[{primeira_entrada}:a]anull[a]"
+    rotulos = "".join(f"[{primeira_entrada + i}:a]" for i in range(quantidade))
+    return (f"{rotulos}amix=inputs={quantidade}:duration=longest:normalize=0,"
+            f"alimiter=limit=0.98:level=0[a]")
+
+
+def calcular_fatias(duracao, fps, partes):
+    """Divide a duração em `partes` fatias com bordas na grade de quadros: [(inicio, quadros)]."""
+    total_quadros = max(1, math.ceil(duracao * fps))
+    partes = max(1, min(partes, total_quadros))
+    por_fatia = math.ceil(total_quadros / partes)
+    fatias = []
+    for primeiro in range(0, total_quadros, por_fatia):
+        fatias.append((primeiro / fps, min(por_fatia, total_quadros - primeiro)))
+    return fatias
+
+
+def partes_automaticas(duracao):
+    """Uma fatia por núcleo, sem fatias menores que FATIA_MINIMA_SEGUNDOS."""
+    return max(1, min(os.cpu_count() or 1, int(duracao // FATIA_MINIMA_SEGUNDOS)))
+
+
+def _executar(comando):
+    try:
+        subprocess.run(comando, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Erro ao executar ffmpeg: {e}")
+        print(f"Stderr: {e.stderr}")
+        raise
+
+
+def renderizar_paralelo(arquivos_audio, arquivo_legenda, arquivo_saida_video, arquivo_imagem,
+                        partes=0, encoder="auto", fps=FPS_PADRAO, escala="1280:-2",
+                        codec_audio="aac", bitrate_audio="128k"):
+    """
+    Cria o vídeo final renderizando fatias de tempo em paralelo.
+
+    Args:
+        arquivos_audio (list): Faixas WAV (instrumental pronto ou faixas separadas)
+        arquivo_legenda (Path): Arquivo de legenda .ass da música inteira
+        arquivo_saida_video (Path): Caminho para salvar o vídeo final
+        arquivo_imagem (Path): Imagem de fundo
+        partes (int): Número de fatias; 0 = automático pelo número de núcleos
+        encoder (str): 'auto', 'nvenc', 'x264' ou 'x265'
+        fps (int): Taxa de quadros do vídeo
+    """
+    arquivo_saida_video = Path(arquivo_saida_video)
+    duracao = duracao_audio(arquivos_audio[0])
+    nome_encoder = escolher_encoder(encoder)
+
+    if not partes:
+        partes = partes_automaticas(duracao)
+    if nome_encoder == "nvenc":
+        partes = min(partes, MAX_FATIAS_NVENC)
+    fatias = calcular_fatias(duracao, fps, partes)
+    threads = max(1, (os.cpu_count() or 1) // len(fatias))
+
+    print(f"Criando vídeo em {len(fatias)} fatia(s) paralela(s) ({nome_encoder}, {threads} thread(s) cada)...")
+    conteudo_ass = Path(arquivo_legenda).read_text(encoding="utf-8")
+
+    # Pasta temporária ao lado da saída, usada com caminhos relativos
+    # (o filtro ass= do ffmpeg não lida bem com ':' e '\' de caminhos absolutos no Windows)
+    arquivo_saida_video.parent.mkdir(parents=True, exist_ok=True)
+    pasta_tmp = Path(os.path.relpath(tempfile.mkdtemp(prefix=".fatias_", dir=arquivo_saida_video.parent)))
+    try:
+        comandos = []
+        videos = []
+        for i, (inicio, quadros) in enumerate(fatias):
+            ass_fatia = pasta_tmp / f"fatia_{i:03d}.ass"
+            ass_fatia.write_text(fatiar_ass(conteudo_ass, inicio, inicio + quadros / fps), encoding="utf-8")
+            video_fatia = pasta_tmp / f"fatia_{i:03d}.mp4"
+            videos.append(video_fatia)
+            comandos.append([
+                "ffmpeg", "-y",
+                "-loop", "1",
+                "-framerate", str(fps),
+                "-i", str(arquivo_imagem),
+                "-frames:v", str(quadros),
+                "-vf", f"scale={escala},format=yuv420p,ass={ass_fatia.as_posix()}",
+                *argumentos_video(nome_encoder, fps),
+                "-threads", str(threads),
+                "-an",
+                str(video_fatia),
+            ])
+
+        with ThreadPoolExecutor(max_workers=len(comandos)) as pool:
+            list(pool.map(_executar, comandos))
+
+        lista = pasta_tmp / "lista.txt"
+        lista.write_text("".join(f"file '{v.name}'\n" for v in videos), encoding="utf-8")
+
+        entradas = []
+        for arquivo in arquivos_audio:
+            entradas += ["-i", str(arquivo)]
+        filtro_audio = filtro_mixagem(len(arquivos_audio))
+
+        print("Unindo fatias (sem recodificar o vídeo) e codificando o áudio...")
+        _executar([
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0", "-i", str(lista),
+            *entradas,
+            "-filter_complex", filtro_audio,
+            "-map", "0:v",
+            "-map", "[a]",
+            "-c:v", "copy",
+            "-c:a", codec_audio,
+            "-b:a", bitrate_audio,
+            "-shortest",
+            str(arquivo_saida_video),
+        ])
+        print(f"Vídeo criado com sucesso ({nome_encoder}, {len(fatias)} fatias): {arquivo_saida_video}")
+    finally:
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
@@ -0,0 +1,274 @@
+"""
+separacao_lote.py
+
+Separação em lote: distribui uma lista de músicas entre N processos, cada
+um fixo no seu próprio conjunto de núcleos (os.sched_setaffinity) e, na
+GPU, no seu próprio acelerador (CUDA_VISIBLE_DEVICES). Em um servidor com
+muitos núcleos, vários processos Demucs menores rendem mais que um só
+disputando todos os núcleos.
+
+Cada processo carrega o modelo na primeira música e o mantém no cache de
+modelos até o fim do lote. As músicas maiores saem primeiro, para que uma
+música longa não fique sozinha no final. Uma falha (exceção ou processo
+morto) afeta só a música em que ocorreu.
+
+A saída de cada processo vai para <saida>/.logs_lote/processo_<i>.log, para
+que o progresso de vários Demucs não se misture no terminal.
+
+Uso (pelo CLI do separar_instrumental.py):
+    python separar_instrumental.py --audio pasta_musicas --lote --processos 4
+"""
+
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+
+PASTA_LOGS = ".logs_lote"
+NUCLEOS_POR_PROCESSO = 8  # a partir daqui o Demucs na CPU ganha pouco com mais threads
+
+
+def nucleos_disponiveis():
+    """Núcleos que este processo pode usar (respeita taskset/cgroups quando o SO informa)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def gpus_disponiveis():
+    """Índices das GPUs visíveis (CUDA_VISIBLE_DEVICES, se definida; senão as que o torch encontra)."""
+    visiveis = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if visiveis is not None:
+        return [g.strip() for g in visiveis.split(",") if g.strip() and g.strip() != "-1"]
+    import torch
+
+    return [str(i) for i in range(torch.cuda.device_count())]
+
+
+def dividir_nucleos(nucleos, partes):
+    """Divide os núcleos em `partes` conjuntos contíguos de tamanhos o mais iguais possível."""
+    tamanho, resto = divmod(len(nucleos), partes)
+    conjuntos, inicio = [], 0
+    for i in range(partes):
+        fim = inicio + tamanho + (1 if i < resto else 0)
+        conjuntos.append(list(nucleos[inicio:fim]))
+        inicio = fim
+    return conjuntos
+
+
+def planejar_processos(processos=None, device=None, gpus=None):
+    """
+    Recursos de cada processo: [{"nucleos": [...], "gpu": "0" ou None}, ...].
+
+    Na GPU, o padrão é um processo por GPU (mais processos revezam as GPUs);
+    na CPU, um processo a cada NUCLEOS_POR_PROCESSO núcleos. Os núcleos são
+    sempre repartidos, também na GPU (decodificação e gravação das faixas).
+    """
+    nucleos = nucleos_disponiveis()
+    if device is None:
+        gpus = gpus if gpus is not None else gpus_disponiveis()
+        device = "cuda" if gpus else "cpu"
+    elif device == "cuda" and gpus is None:
+        gpus = gpus_disponiveis()
+    if device == "cuda" and not gpus:
+        raise ValueError("Nenhuma GPU visível para a separação em lote (use --device cpu)")
+
+    if processos is None:
+        processos = len(gpus) if device == "cuda" else max(1, len(nucleos) // NUCLEOS_POR_PROCESSO)
+    if processos > len(nucleos):
+        print(f"⚠️  {processos} processos para {len(nucleos)} núcleos; usando {len(nucleos)}")
+        processos = len(nucleos)
+
+    return [{"nucleos": conjunto, "gpu": gpus[i % len(gpus)] if device == "cuda" else None}
+            for i, conjunto in enumerate(dividir_nucleos(nucleos, processos))]
+
+
+def _processo_separacao(indice, recursos, opcoes, pasta_logs, tarefas, conexao):
+    """Laço de cada processo: fixa os recursos antes de usar o torch e separa até receber None."""
+    # O CUDA só lê CUDA_VISIBLE_DEVICES na primeira chamada à GPU, então vale mesmo
+    # que o spawn já tenha importado o torch ao recarregar o script principal
+    if recursos["gpu"] is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = recursos["gpu"]
+    os.environ["OMP_NUM_THREADS"] = str(len(recursos["nucleos"]))
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, recursos["nucleos"])
+
+    Path(pasta_logs).mkdir(parents=True, exist_ok=True)
+    log = open(Path(pasta_logs) / f"processo_{indice}.log", "a", encoding="utf-8", buffering=1)
+    sys.stdout = sys.stderr = log
+
+    from render_paralelo import duracao_audio
+    from separar_instrumental import separar_faixas
+
+    device = "cuda" if recursos["gpu"] is not None else "cpu"
+    while True:
+        item = tarefas.get()
+        if item is None:
+            break
+        posicao, audio, saida = item
+        conexao.send(("inicio", posicao))
+        print(f"\n===== {audio} -> {saida} =====")
+        inicio = time.perf_counter()
+        resultado = {"audio": audio, "saida": saida, "processo": indice, "ok": True, "erro": None,
+                     "audio_segundos": None, "bytes": None}
+        try:
+            resultado["audio_segundos"] = duracao_audio(audio)
+        except Exception:
+            pass
+        try:
+            relatorio = separar_faixas(audio, saida, device=device, **opcoes)
+            resultado["bytes"] = relatorio["bytes_gravados"]
+        except Exception as e:
+            traceback.print_exc()
+            resultado.update(ok=False, erro=repr(e))
+        resultado["segundos"] = round(time.perf_counter() - inicio, 2)
+        conexao.send(("fim", posicao, resultado))
+    conexao.close()
+    log.close()
+
+
+def _falha(audio, out_dir, processo, erro):
+    return {"audio": str(audio), "saida": str(Path(out_dir) / Path(audio).stem), "processo": processo,
+            "ok": False, "erro": erro, "audio_segundos": None, "bytes": None, "segundos": None}
+
+
+def separar_lote(audios, out_dir, processos=None, device=None, gpus=None, opcoes=None):
+    """
+    Separa várias músicas em paralelo, cada uma em <out_dir>/<nome do arquivo>.
+
+    Args:
+        audios (list): Arquivos de áudio (nomes base distintos).
+        processos (int): Número de processos (padrão: ver planejar_processos).
+        device (str): 'cuda' ou 'cpu' (padrão: cuda se houver GPU visível).
+        gpus (list): Índices das GPUs a usar (padrão: todas as visíveis).
+        opcoes (dict): Argumentos repassados a separar_faixas (model_name,
+            formato, duas_faixas, salvar_16k...).
+
+    Returns:
+        dict: {"resultados": [um por música, na ordem de `audios`],
+               "processos": recursos de cada processo, "segundos": parede}
+    """
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    audios = [Path(a) for a in audios]
+    nomes = [a.stem for a in audios]
+    repetidos = sorted({n for n in nomes if nomes.count(n) > 1})
+    if repetidos:
+        raise ValueError(f"Músicas com o mesmo nome base sairiam na mesma pasta: {', '.join(repetidos)}")
+
+    plano = planejar_processos(processos, device, gpus)
+    out_dir = Path(out_dir)
+    pasta_logs = out_dir / PASTA_LOGS
+    contexto = multiprocessing.get_context("spawn")  # processos limpos: sem torch/CUDA herdados
+    tarefas = contexto.Queue()
+
+    # Maiores primeiro: a última música a começar é a mais curta
+    ordem = sorted(range(len(audios)), key=lambda i: audios[i].stat().st_size, reverse=True)
+    for posicao in ordem:
+        tarefas.put((posicao, str(audios[posicao]), str(out_dir / audios[posicao].stem)))
+    for _ in plano:
+        tarefas.put(None)
+
+    print(f"🎛️  Separando {len(audios)} música(s) em {len(plano)} processo(s) (logs em {pasta_logs})")
+    for i, recursos in enumerate(plano):
+        nucleos = recursos["nucleos"]
+        gpu = f", GPU {recursos['gpu']}" if recursos["gpu"] is not None else ""
+        print(f"   processo {i}: núcleos {nucleos[0]}-{nucleos[-1]} ({len(nucleos)}){gpu}")
+
+    inicio = time.perf_counter()
+    workers, receptores = [], []
+    for i, recursos in enumerate(plano):
+        receptor, emissor = contexto.Pipe(duplex=False)
+        worker = contexto.Process(target=_processo_separacao, name=f"separacao-{i}",
+                                  args=(i, recursos, opcoes or {}, str(pasta_logs), tarefas, emissor))
+        worker.start()
+        emissor.close()  # só o processo filho escreve; assim o EOF chega quando ele termina
+        workers.append(worker)
+        receptores.append(receptor)
+
+    finais = [None] * len(audios)
+    em_andamento = {}  # processo -> posição da música
+    concluidas = 0
+    # Um Pipe por processo: o envio é síncrono (nada fica num buffer se o processo morrer)
+    # e o EOF avisa quando ele termina, normalmente ou não
+    ativos = dict(enumerate(receptores))
+    while ativos:
+        for conexao in wait(list(ativos.values())):
+            processo = receptores.index(conexao)
+            try:
+                mensagem = conexao.recv()
+            except EOFError:
+                workers[processo].join()
+                del ativos[processo]
+                if processo in em_andamento:
+                    # Processo morto (OOM, sinal): a música que ele separava falha, as outras seguem
+                    posicao = em_andamento.pop(processo)
+                    finais[posicao] = _falha(audios[posicao], out_dir, processo,
+                                             f"processo {processo} terminou com código {workers[processo].exitcode}")
+                    concluidas += 1
+                    print(f"   ❌ {audios[posicao].name}: {finais[posicao]['erro']}")
+                continue
+
+            if mensagem[0] == "inicio":
+                em_andamento[processo] = mensagem[1]
+                continue
+            _, posicao, resultado = mensagem
+            em_andamento.pop(processo, None)
+            finais[posicao] = resultado
+            concluidas += 1
+            estado = f"✅ {resultado['segundos']:.1f}s" if resultado["ok"] else f"❌ {resultado['erro']}"
+            print(f"   [{concluidas}/{len(audios)}] processo {processo}: {audios[posicao].name} {estado}")
+
+    for posicao, final in enumerate(finais):
+        if final is None:
+            finais[posicao] = _falha(audios[posicao], out_dir, None,
+                                    f"nenhum processo restante (ver {pasta_logs})")
+    for worker in workers:
+        worker.join()
+    return {"resultados": finais, "processos": plano, "segundos": round(time.perf_counter() - inicio, 2)}
+
+
+def resumo_lote(lote):
+    """Vazão agregada: músicas por hora, horas de áudio por hora e uso de cada processo."""
+    resultados = lote["resultados"]
+    ok = [r for r in resultados if r["ok"]]
+    segundos = lote["segundos"] or 1e-9
+    audio = sum(r["audio_segundos"] or 0 for r in ok)
+    por_processo = []
+    for i, recursos in enumerate(lote["processos"]):
+        meus = [r for r in resultados if r["processo"] == i]
+        ocupado = sum(r["segundos"] or 0 for r in meus)
+        por_processo.append({"processo": i, "nucleos": len(recursos["nucleos"]), "gpu": recursos["gpu"],
+                             "musicas": len(meus), "falhas": sum(not r["ok"] for r in meus),
+                             "ocupado_segundos": round(ocupado, 2), "ocupacao": round(ocupado / segundos, 3)})
+    return {
+        "musicas": len(resultados),
+        "ok": len(ok),
+        "falhas": len(resultados) - len(ok),
+        "processos": len(lote["processos"]),
+        "segundos": lote["segundos"],
+        "musicas_por_hora": round(len(ok) * 3600 / segundos, 2),
+        "audio_por_parede": round(audio / segundos, 3) if audio else None,
+        "por_processo": por_processo,
+    }
+
+
+def imprimir_relatorio_lote(lote):
+    resumo = resumo_lote(lote)
+    print(f"\n{'='*70}")
+    print("📊 SEPARAÇÃO EM LOTE")
+    print(f"{'='*70}")
+    print(f"  {resumo['ok']}/{resumo['musicas']} música(s) em {resumo['segundos']:.1f}s "
+          f"com {resumo['processos']} processo(s)")
+    print(f"  Vazão: {resumo['musicas_por_hora']:.1f} músicas/hora"
+          + (f" | {resumo['audio_por_parede']:.2f}x tempo real (áudio/parede)" if resumo["audio_por_parede"] else ""))
+    for p in resumo["por_processo"]:
+        gpu = f" GPU {p['gpu']}" if p["gpu"] is not None else ""
+        print(f"   processo {p['processo']} ({p['nucleos']} núcleos{gpu}): {p['musicas']} música(s), "
+              f"{p['falhas']} falha(s), ocupado {p['ocupacao']:.0%}")
+    for r in lote["resultados"]:
+        if not r["ok"]:
+            print(f"  ❌ {Path(r['audio']).name}: {r['erro']}")
+    return resumo
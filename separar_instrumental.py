@@ -18,9 +18,404 @@ from demucs.apply import apply_model
 from demucs.pretrained import get_model
 from demucs.audio import AudioFile
 import argparse
+import struct
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
 from pathlib import Path
 
-def separar_faixas(audio_path, output_dir, model_name= "htdemucs_6s"): #"htdemucs_ft"):
+import numpy as np
+
+from cache_modelos import obter_modelo
+from audio_16k import salvar_vocals_16k, salvar_vocals_16k_arquivo
+from formatos_audio import FORMATOS_FAIXAS, FORMATO_PADRAO, INSTRUMENTAL, VOCALS, arquivo_faixa, arquivos_audio
+from separacao_lote import imprimir_relatorio_lote, nucleos_disponiveis, separar_lote
+
+MODELO_PADRAO = "htdemucs_6s"  # "htdemucs_ft"
+# Modo de duas faixas (vocals x acompanhamento): o htdemucs de 4 fontes é o
+# modelo único mais rápido; as fontes que não são vocais são somadas bloco a
+# bloco, então só duas faixas ficam na memória e vão para o disco.
+MODELO_DUAS_FAIXAS = "htdemucs"
+
+def escolher_dispositivo(device=None):
+    """Retorna o dispositivo pedido ou, se None, 'cuda' quando disponível e 'cpu' caso contrário."""
+    if device:
+        return device
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def configurar_cpu(num_threads=None, num_workers=None):
+    """
+    Define as threads intra-op do torch e o número de workers do apply_model
+    a partir dos núcleos disponíveis para o processo (os da máquina, ou só os
+    fixados por taskset ou pela separação em lote).
+
+    Cada worker do apply_model processa um segmento em paralelo; as threads do
+    torch são divididas entre eles para não disputar os mesmos núcleos.
+
+    Returns:
+        tuple: (num_threads, num_workers)
+    """
+    nucleos = len(nucleos_disponiveis())
+    if num_workers is None:
+        num_workers = max(1, min(4, nucleos // 4))
+    if num_threads is None:
+        num_threads = max(1, nucleos // num_workers)
+    torch.set_num_threads(num_threads)
+    return num_threads, num_workers
+
+
+def _segmento_maximo(model):
+    """Maior segmento (s) aceito pelo modelo; BagOfModels usa o do primeiro modelo."""
+    modelos = getattr(model, "models", [model])
+    limites = [float(m.segment) for m in modelos if getattr(m, "segment", None)]
+    return min(limites) if limites else None
+
+
+def _duas_faixas(fontes, nomes, ganhos=None):
+    """
+    Reduz as fontes (fontes, canais, amostras) a [vocals, acompanhamento], com
+    o ganho opcional por faixa na soma do acompanhamento (sem limitador: ele é
+    aplicado depois do cross-fade).
+    """
+    ganhos = ganhos or {}
+    i = nomes.index(VOCALS)
+    acompanhamento = torch.zeros_like(fontes[i])
+    for fonte, name in zip(fontes, nomes):
+        if name != VOCALS:
+            acompanhamento += fonte * float(ganhos.get(name, 1.0))
+    return torch.stack([fontes[i], acompanhamento])
+
+
+def _separar_em_blocos(model, wav, device, bloco_segundos, segmento, overlap, num_workers,
+                       duas_faixas=False, ganhos=None):
+    """
+    Aplica o modelo em blocos consecutivos do áudio, com cross-fade linear de
+    1 s entre blocos vizinhos, imprimindo progresso e vazão de cada bloco.
+
+    Args:
+        wav (Tensor): Áudio normalizado (canais, amostras).
+
+    Returns:
+        Tensor: Fontes separadas (fontes, canais, amostras) na CPU; com
+        duas_faixas=True, só [vocals, acompanhamento].
+    """
+    sr = model.samplerate
+    total = wav.shape[-1]
+    tamanho = total if not bloco_segundos else max(int(bloco_segundos * sr), 2 * sr)
+    fade = min(sr, tamanho // 4) if tamanho < total else 0
+    passo = tamanho - fade
+
+    inicios = list(range(0, max(total - fade, 1), passo))
+    saida = torch.zeros(2 if duas_faixas else len(model.sources), wav.shape[0], total)
+    inicio_total = time.perf_counter()
+
+    for i, inicio in enumerate(inicios):
+        fim = min(inicio + tamanho, total)
+        trecho = wav[:, inicio:fim].to(device)
+
+        t0 = time.perf_counter()
+        fontes = apply_model(model, trecho[None], device=device, segment=segmento,
+                             overlap=overlap, num_workers=num_workers,
+                             progress=len(inicios) == 1)[0].cpu()
+        if duas_faixas:
+            fontes = _duas_faixas(fontes, model.sources, ganhos)
+        decorrido = time.perf_counter() - t0
+
+        # Cross-fade: as rampas dos blocos vizinhos somam 1 na região sobreposta
+        peso = torch.ones(fim - inicio)
+        if fade and i > 0:
+            peso[:fade] = torch.linspace(0, 1, fade)
+        if fade and fim < total:
+            peso[-fade:] = torch.linspace(1, 0, fade)
+        saida[..., inicio:fim] += fontes * peso
+
+        segundos_audio = (fim - inicio) / sr
+        print(f"  Bloco {i + 1}/{len(inicios)}: {segundos_audio:.1f}s de áudio em {decorrido:.1f}s "
+              f"({segundos_audio / max(decorrido, 1e-9):.2f}s de áudio/s)")
+
+    decorrido_total = time.perf_counter() - inicio_total
+    print(f"  Total: {total / sr:.1f}s de áudio em {decorrido_total:.1f}s "
+          f"({total / sr / max(decorrido_total, 1e-9):.2f}s de áudio/s)")
+    return saida
+
+
+# ========== SEPARAÇÃO EM STREAMING ==========
+class _EscritorWav:
+    """
+    Escreve um WAV aos poucos, em float32 (mesmo formato do torchaudio.save
+    com tensor float) ou PCM 16 bits: o cabeçalho é gravado com tamanho zero
+    e corrigido ao fechar.
+    """
+
+    def __init__(self, caminho, samplerate, canais, bits=32):
+        self.bits = bits
+        self.bytes_dados = 0
+        self.arquivo = open(caminho, "wb")
+        bloco = canais * bits // 8
+        formato = 3 if bits == 32 else 1  # IEEE float / PCM inteiro
+        self.arquivo.write(struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 0, b"WAVE",
+                                       b"fmt ", 16, formato, canais, samplerate, samplerate * bloco, bloco, bits,
+                                       b"data", 0))
+
+    def escrever(self, audio):
+        """`audio` (canais, amostras) na CPU."""
+        amostras = audio.t().contiguous().numpy()
+        if self.bits == 16:
+            dados = (np.clip(amostras, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        else:
+            dados = amostras.astype("<f4", copy=False).tobytes()
+        self.arquivo.write(dados)
+        self.bytes_dados += len(dados)
+
+    def fechar(self):
+        self.arquivo.seek(4)
+        self.arquivo.write(struct.pack("<I", 36 + self.bytes_dados))
+        self.arquivo.seek(40)
+        self.arquivo.write(struct.pack("<I", self.bytes_dados))
+        self.arquivo.close()
+
+
+class _EscritorFlac:
+    """Mesma interface do _EscritorWav, codificando em FLAC 16 bits com um ffmpeg alimentado pelo stdin."""
+
+    def __init__(self, caminho, samplerate, canais):
+        self.processo = subprocess.Popen([
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-f", "f32le", "-ar", str(samplerate), "-ac", str(canais), "-i", "-",
+            "-c:a", "flac", "-sample_fmt", "s16",
+            str(caminho),
+        ], stdin=subprocess.PIPE)
+
+    def escrever(self, audio):
+        self.processo.stdin.write(audio.t().contiguous().numpy().astype("<f4", copy=False).tobytes())
+
+    def fechar(self):
+        self.processo.stdin.close()
+        if self.processo.wait() != 0:
+            raise RuntimeError("Falha ao codificar FLAC com ffmpeg")
+
+
+def _abrir_escritor(caminho, samplerate, canais, formato):
+    if formato == "flac":
+        return _EscritorFlac(caminho, samplerate, canais)
+    return _EscritorWav(caminho, samplerate, canais, bits=FORMATOS_FAIXAS[formato]["bits"])
+
+
+def _salvar_faixa(caminho, audio, samplerate, formato):
+    """torchaudio.save no formato pedido (ver formatos_audio.FORMATOS_FAIXAS)."""
+    config = FORMATOS_FAIXAS[formato]
+    if formato == "flac":
+        torchaudio.save(str(caminho), audio, sample_rate=samplerate, format="flac",
+                        bits_per_sample=config["bits"])
+    else:
+        torchaudio.save(str(caminho), audio, sample_rate=samplerate,
+                        encoding=config["encoding"], bits_per_sample=config["bits"])
+
+
+def _relatorio_bytes(arquivos, amostras, canais, n_fontes, gerar_instrumental):
+    """
+    Bytes gravados nesta separação e quanto o padrão antigo gravaria para o
+    mesmo áudio (todas as fontes, e o instrumental, em WAV float32).
+    """
+    gravados = sum(Path(a).stat().st_size for a in arquivos if Path(a).exists())
+    por_faixa = 44 + amostras * canais * 4
+    padrao = por_faixa * (n_fontes + (1 if gerar_instrumental else 0))
+    print(f"💾 Bytes gravados: {gravados / 1e6:.1f} MB em {len(arquivos)} arquivo(s) "
+          f"(antes: {padrao / 1e6:.1f} MB com todas as faixas em float32, "
+          f"{100 * (1 - gravados / max(padrao, 1)):.0f}% a menos)")
+    return {"bytes_gravados": gravados, "bytes_padrao": padrao, "arquivos": [str(a) for a in arquivos]}
+
+
+def _abrir_decodificador(audio_path, samplerate, canais):
+    """ffmpeg decodificando o arquivo para float32 intercalado no stdout."""
+    comando = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", str(audio_path),
+        "-f", "f32le", "-ac", str(canais), "-ar", str(samplerate),
+        "-",
+    ]
+    return subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+def _ler_amostras(fluxo, amostras, canais):
+    """Lê até `amostras` quadros do fluxo; retorna Tensor (canais, n) com n < amostras só no fim."""
+    tamanho = amostras * canais * 4
+    partes = []
+    while tamanho > 0:
+        dados = fluxo.read(tamanho)
+        if not dados:
+            break
+        partes.append(dados)
+        tamanho -= len(dados)
+    bruto = b"".join(partes)
+    bruto = bruto[:len(bruto) - len(bruto) % (canais * 4)]
+    audio = np.frombuffer(bruto, dtype="<f4").reshape(-1, canais).T.copy()
+    return torch.from_numpy(audio)
+
+
+def _estatisticas_globais(audio_path, samplerate, canais, bloco_segundos=30):
+    """
+    Primeira passada (só decodificação): média e desvio padrão da mixagem mono
+    da música inteira, para a mesma normalização global do modo em memória.
+
+    Returns:
+        tuple: (media, desvio, total_amostras)
+    """
+    processo = _abrir_decodificador(audio_path, samplerate, canais)
+    soma = soma_quadrados = 0.0
+    total = 0
+    try:
+        while True:
+            trecho = _ler_amostras(processo.stdout, int(bloco_segundos * samplerate), canais)
+            if trecho.shape[-1] == 0:
+                break
+            mono = trecho.mean(0).double()
+            soma += float(mono.sum())
+            soma_quadrados += float((mono * mono).sum())
+            total += mono.shape[-1]
+    finally:
+        processo.stdout.close()
+        processo.wait()
+    if processo.returncode != 0 or total == 0:
+        raise RuntimeError(f"Falha ao decodificar o áudio com ffmpeg: {audio_path}")
+    media = soma / total
+    variancia = max(soma_quadrados - total * media * media, 0.0) / max(total - 1, 1)
+    return media, max(variancia ** 0.5, 1e-8), total
+
+
+def _separar_streaming(model, audio_path, output_path, device, bloco_segundos, segmento, overlap,
+                       num_workers, gerar_instrumental, ganhos, faixas, formato, duas_faixas=False):
+    """
+    Separação com memória limitada: lê o áudio em janelas sobrepostas, aplica
+    o modelo em cada janela, faz o cross-fade linear das sobreposições e
+    acrescenta cada faixa ao seu arquivo assim que o trecho fica pronto.
+
+    Só ficam na memória a janela atual e a cauda de cross-fade da anterior,
+    então o pico de RAM/VRAM não depende da duração da música.
+
+    Returns:
+        int: Total de amostras do áudio.
+    """
+    sr = model.samplerate
+    canais = model.audio_channels
+    media, desvio, total = _estatisticas_globais(audio_path, sr, canais)
+    print(f"  -> {total / sr:.1f}s de áudio; normalização global: média {media:.4f}, desvio {desvio:.4f}")
+
+    tamanho = max(int(bloco_segundos * sr), 2 * sr)
+    fade = min(sr, tamanho // 4)
+    passo = tamanho - fade
+    n_janelas = max(1, -(-max(total - fade, 1) // passo))
+
+    processo = _abrir_decodificador(audio_path, sr, canais)
+    inicio_total = time.perf_counter()
+    try:
+        with ExitStack() as pilha:
+            nomes = [VOCALS, INSTRUMENTAL] if duas_faixas else list(model.sources)
+            escritores = {}
+            for name in nomes:
+                if name in faixas:
+                    escritores[name] = _abrir_escritor(arquivo_faixa(output_path, name, formato), sr, canais, formato)
+                    pilha.callback(escritores[name].fechar)
+            instrumental = None
+            if gerar_instrumental:
+                instrumental = _abrir_escritor(arquivo_faixa(output_path, INSTRUMENTAL, formato), sr, canais, formato)
+                pilha.callback(instrumental.fechar)
+
+            def gravar(fontes):
+                fontes = fontes * desvio + media
+                if duas_faixas:
+                    fontes[1] = _limitar(fontes[1])
+                for name, fonte in zip(nomes, fontes):
+                    if name in escritores:
+                        escritores[name].escrever(fonte)
+                if instrumental is not None:
+                    instrumental.escrever(mixar_instrumental(fontes, model.sources, ganhos))
+
+            janela = _ler_amostras(processo.stdout, tamanho, canais)
+            cauda = None
+            i = 0
+            while janela.shape[-1] > 0:
+                proxima = _ler_amostras(processo.stdout, passo, canais)
+                ultima = proxima.shape[-1] == 0
+                n = janela.shape[-1]
+
+                t0 = time.perf_counter()
+                fontes = apply_model(model, ((janela - media) / desvio)[None].to(device), device=device,
+                                     segment=segmento, overlap=overlap, num_workers=num_workers,
+                                     progress=False)[0].cpu()
+                if duas_faixas:
+                    fontes = _duas_faixas(fontes, model.sources, ganhos)
+                decorrido = time.perf_counter() - t0
+
+                # Cross-fade: as rampas das janelas vizinhas somam 1 na região sobreposta
+                peso = torch.ones(n)
+                if cauda is not None:
+                    peso[:fade] = torch.linspace(0, 1, fade)
+                if not ultima:
+                    peso[-fade:] = torch.linspace(1, 0, fade)
+                fontes = fontes * peso
+                if cauda is not None:
+                    fontes[..., :fade] += cauda
+
+                if ultima:
+                    gravar(fontes)
+                else:
+                    gravar(fontes[..., :n - fade])
+                    cauda = fontes[..., n - fade:].clone()
+                    janela = torch.cat([janela[:, n - fade:], proxima], dim=-1)
+
+                i += 1
+                segundos_audio = n / sr
+                print(f"  Janela {i}/{n_janelas}: {segundos_audio:.1f}s de áudio em {decorrido:.1f}s "
+                      f"({segundos_audio / max(decorrido, 1e-9):.2f}s de áudio/s)")
+                if ultima:
+                    break
+    finally:
+        processo.stdout.close()
+        processo.wait()
+
+    decorrido_total = time.perf_counter() - inicio_total
+    print(f"  Total: {total / sr:.1f}s de áudio em {decorrido_total:.1f}s "
+          f"({total / sr / max(decorrido_total, 1e-9):.2f}s de áudio/s)")
+    return total
+
+
+def _limitar(audio, teto=0.98):
+    """Limitador suave: mantém o sinal abaixo do teto e comprime só os picos acima dele."""
+    excesso = (audio.abs() - teto).clamp(min=0)
+    comprimido = teto + (1 - teto) * torch.tanh(excesso / (1 - teto))
+    return torch.where(audio.abs() > teto, audio.sign() * comprimido, audio)
+
+
+def mixar_instrumental(sources, nomes, ganhos=None):
+    """
+    Soma no próprio tensor todas as fontes exceto 'vocals', com ganho opcional
+    por faixa e um único limitador no final (em vez de clipar a cada overlay).
+
+    Args:
+        sources (Tensor): Fontes separadas (fontes, canais, amostras).
+        nomes (list): Nome de cada fonte, na ordem do modelo.
+        ganhos (dict): Ganho linear por faixa, ex.: {"drums": 0.8}. Ausente = 1.0.
+
+    Returns:
+        Tensor: Instrumental (canais, amostras).
+    """
+    ganhos = ganhos or {}
+    instrumental = torch.zeros_like(sources[0])
+    for source, name in zip(sources, nomes):
+        if name == "vocals":
+            continue
+        instrumental += source * float(ganhos.get(name, 1.0))
+    return _limitar(instrumental)
+
+
+def separar_faixas(audio_path, output_dir, model_name=MODELO_PADRAO,
+                   device=None, num_threads=None, num_workers=None,
+                   segmento=None, overlap=0.25, bloco_segundos=None,
+                   gerar_instrumental=False, ganhos=None, salvar_16k=False, streaming=False,
+                   faixas=None, formato=FORMATO_PADRAO, duas_faixas=False):
     """
     Separa as faixas de um arquivo de áudio usando Demucs.
 
@@ -28,63 +423,176 @@ def separar_faixas(audio_path, output_dir, model_name= "htdemucs_6s"): #"htdemuc
         audio_path (str): Caminho para o arquivo de áudio.
         output_dir (str): Diretório para salvar as faixas separadas.
         model_name (str): Nome do modelo Demucs a ser usado.
+        device (str): 'cuda' ou 'cpu'. Se None, usa CUDA quando disponível.
+        num_threads (int): Threads intra-op do torch na CPU (padrão: núcleos / workers).
+        num_workers (int): Segmentos processados em paralelo na CPU (padrão: a partir dos núcleos).
+        segmento (float): Tamanho do segmento do apply_model em segundos (padrão: o do modelo).
+        overlap (float): Sobreposição entre segmentos do apply_model (0 a 1).
+        bloco_segundos (float): Tamanho dos blocos com progresso próprio
+            (padrão: 60 s na CPU, música inteira na GPU).
+        gerar_instrumental (bool): Também salva o instrumental (soma das faixas exceto vocals).
+        ganhos (dict): Ganho linear por faixa na soma do instrumental.
+        salvar_16k (bool): Também salva vocals_16k.npy (mono 16 kHz) para as etapas 3 e 4.
+        streaming (bool): Lê o áudio e grava as faixas em janelas (bloco_segundos,
+            padrão 60 s), com memória constante para gravações longas.
+        faixas (iterable): Fontes a gravar, ex.: ["vocals"] (padrão: todas as do modelo).
+            O instrumental continua sendo a soma de todas as fontes exceto vocals.
+        formato (str): 'float' (WAV float32), 'pcm16' (WAV 16 bits) ou 'flac'.
+        duas_faixas (bool): Modo rápido vocals x acompanhamento: grava só
+            vocals e instrumental (com limitador), sem as demais fontes.
+            Use com MODELO_DUAS_FAIXAS.
+
+    Returns:
+        dict: Relatório de bytes gravados (ver _relatorio_bytes).
     """
-    if not torch.cuda.is_available():
-        print("Erro: A GPU (CUDA) não está disponível. Verifique a instalação do PyTorch e dos drivers da NVIDIA.")
-        exit(1)
-    device = "cuda"
+    if formato not in FORMATOS_FAIXAS:
+        raise ValueError(f"Formato desconhecido: {formato} (opções: {', '.join(FORMATOS_FAIXAS)})")
+    device = escolher_dispositivo(device)
     print(f"Usando dispositivo: {device}")
 
-    print(f"Carregando modelo Demucs: {model_name}...")
-    model = get_model(name=model_name)
-    model.to(device)
+    if device == "cpu":
+        num_threads, num_workers = configurar_cpu(num_threads, num_workers)
+        print(f"  -> CPU: {num_threads} threads do torch, {num_workers} workers no apply_model")
+        if bloco_segundos is None:
+            bloco_segundos = 60.0
+    elif num_workers is None:
+        num_workers = 4
+    if streaming and bloco_segundos is None:
+        bloco_segundos = 60.0
 
-    print(f"Carregando áudio: {audio_path}...")
-    wav = AudioFile(audio_path).read(streams=0, samplerate=model.samplerate, channels=model.audio_channels)
-    wav = wav.to(device)
-    ref = wav.mean(0)
-    wav = (wav - ref.mean()) / ref.std()
+    print(f"Carregando modelo Demucs: {model_name}...")
+    model = obter_modelo("demucs", model_name, device, "float32",
+                         lambda: get_model(name=model_name).to(device))
 
-    print("Separando as fontes de áudio... (Isso pode levar um tempo)")
-    sources = apply_model(model, wav[None], device=device, progress=True, num_workers=4)[0]
-    sources = sources * ref.std() + ref.mean()
+    limite = _segmento_maximo(model)
+    if segmento is not None and limite is not None and segmento > limite:
+        print(f"  -> Segmento de {segmento}s maior que o suportado pelo modelo; usando {limite}s")
+        segmento = limite
 
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
+    if duas_faixas and VOCALS not in model.sources:
+        raise ValueError(f"O modelo {model_name} não separa vocals; não dá para usar o modo de duas faixas")
+    # No modo de duas faixas o instrumental é a segunda fonte (gerar_instrumental fica implícito)
+    nomes = [VOCALS, INSTRUMENTAL] if duas_faixas else list(model.sources)
+    faixas = set(nomes if faixas is None else faixas)
+    desconhecidas = faixas - set(nomes)
+    if desconhecidas:
+        raise ValueError(f"Faixas inexistentes no modelo {model_name}: {', '.join(sorted(desconhecidas))} "
+                         f"(opções: {', '.join(nomes)})")
+    if duas_faixas:
+        faixas.add(INSTRUMENTAL)
+        gerar_instrumental = False
+    salvar_16k = salvar_16k and VOCALS in model.sources
+    gravadas = [arquivo_faixa(output_path, name, formato) for name in nomes if name in faixas]
+    if gerar_instrumental:
+        gravadas.append(arquivo_faixa(output_path, INSTRUMENTAL, formato))
+
+    if streaming:
+        # O buffer de 16 kHz é gerado a partir do arquivo dos vocais, que é
+        # gravado temporariamente se não estiver entre as faixas pedidas
+        vocals_temporario = salvar_16k and VOCALS not in faixas
+        print(f"Separando em streaming (janelas de {bloco_segundos:.0f}s): {audio_path}...")
+        total = _separar_streaming(model, audio_path, output_path, device, bloco_segundos, segmento, overlap,
+                                   num_workers, gerar_instrumental, ganhos,
+                                   faixas | ({VOCALS} if vocals_temporario else set()), formato, duas_faixas)
+        for arquivo in gravadas:
+            print(f"  - Faixa salva: {arquivo}")
+        if salvar_16k:
+            vocals_arquivo = arquivo_faixa(output_path, VOCALS, formato)
+            print(f"  - Buffer 16 kHz salvo: {salvar_vocals_16k_arquivo(vocals_arquivo, output_path)}")
+            if vocals_temporario:
+                vocals_arquivo.unlink()
+    else:
+        print(f"Carregando áudio: {audio_path}...")
+        wav = AudioFile(audio_path).read(streams=0, samplerate=model.samplerate, channels=model.audio_channels)
+        ref = wav.mean(0)
+        wav = (wav - ref.mean()) / ref.std()
+
+        print("Separando as fontes de áudio... (Isso pode levar um tempo)")
+        sources = _separar_em_blocos(model, wav, device, bloco_segundos, segmento, overlap, num_workers,
+                                     duas_faixas, ganhos)
+        sources = sources * ref.std() + ref.mean()
+        if duas_faixas:
+            sources[1] = _limitar(sources[1])
+        total = sources.shape[-1]
 
-    print("Salvando faixas separadas...")
-    for source, name in zip(sources, model.sources):
-        stem = output_path / f"{name}.wav"
-        torchaudio.save(str(stem), source.cpu(), sample_rate=model.samplerate)
-        print(f"  - Faixa salva: {stem}")
+        print(f"Salvando faixas separadas ({formato})...")
+        for source, name in zip(sources, nomes):
+            if name not in faixas:
+                continue
+            stem = arquivo_faixa(output_path, name, formato)
+            _salvar_faixa(stem, source, model.samplerate, formato)
+            print(f"  - Faixa salva: {stem}")
 
+        if gerar_instrumental:
+            instrumental = arquivo_faixa(output_path, INSTRUMENTAL, formato)
+            _salvar_faixa(instrumental, mixar_instrumental(sources, model.sources, ganhos),
+                          model.samplerate, formato)
+            print(f"  - Instrumental salvo: {instrumental}")
+
+        if salvar_16k:
+            vocals = sources[nomes.index(VOCALS)]
+            print(f"  - Buffer 16 kHz salvo: {salvar_vocals_16k(vocals, model.samplerate, output_path)}")
+
+    relatorio = _relatorio_bytes(gravadas, total, model.audio_channels, len(model.sources),
+                                 gerar_instrumental or duas_faixas)
     print("\nSeparação concluída!")
+    return relatorio
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Separa instrumental e vocais de um arquivo de áudio usando Demucs.")
     parser.add_argument("--audio", default="audio_base", help="Diretório ou arquivo de áudio (default: audio_base).")
     parser.add_argument("--out_dir", default="audio_separado", help="Diretório de saída para as faixas separadas (default: audio_separado).")
+    parser.add_argument("--device", choices=["cuda", "cpu"], default=None, help="Dispositivo (default: cuda se disponível, senão cpu).")
+    parser.add_argument("--threads", type=int, default=None, help="Threads do torch na CPU (default: a partir dos núcleos).")
+    parser.add_argument("--workers", type=int, default=None, help="Workers do apply_model na CPU (default: a partir dos núcleos).")
+    parser.add_argument("--segmento", type=float, default=None, help="Segmento do apply_model em segundos (default: o do modelo).")
+    parser.add_argument("--overlap", type=float, default=0.25, help="Sobreposição entre segmentos (default: 0.25).")
+    parser.add_argument("--buffer-16k", action="store_true", help="Também salva vocals_16k.npy (mono 16 kHz) para transcrição e alinhamento.")
+    parser.add_argument("--instrumental", action="store_true", help="Também salva instrumental.wav (soma das faixas exceto vocals).")
+    parser.add_argument("--bloco", type=float, default=None, help="Tamanho dos blocos de progresso em segundos (default: 60 na CPU).")
+    parser.add_argument("--streaming", action="store_true", help="Separa em janelas gravando direto no disco (memória constante para áudios longos).")
+    parser.add_argument("--modelo", default=None, help=f"Modelo Demucs (default: {MODELO_PADRAO}; {MODELO_DUAS_FAIXAS} com --duas-faixas).")
+    parser.add_argument("--duas-faixas", action="store_true", help="Modo rápido: só vocals e instrumental (acompanhamento somado bloco a bloco).")
+    parser.add_argument("--faixas", nargs="+", default=None, help="Fontes a gravar, ex.: vocals drums (default: todas as do modelo).")
+    parser.add_argument("--formato", choices=list(FORMATOS_FAIXAS), default=FORMATO_PADRAO, help="Formato das faixas: float, pcm16 ou flac (default: float).")
+    parser.add_argument("--lote", action="store_true", help="Separa todos os áudios do diretório --audio em vários processos.")
+    parser.add_argument("--processos", type=int, default=None, help="Processos no modo --lote (default: 1 por GPU, ou 1 a cada 8 núcleos na CPU).")
+    parser.add_argument("--gpus", nargs="+", default=None, help="GPUs usadas no modo --lote, ex.: 0 1 (default: todas as visíveis).")
     args = parser.parse_args()
 
     audio_dir = Path(args.audio)
+    modelo = args.modelo or (MODELO_DUAS_FAIXAS if args.duas_faixas else MODELO_PADRAO)
+
+    if args.lote:
+        audio_files = arquivos_audio(audio_dir) if audio_dir.is_dir() else []
+        if not audio_files:
+            print(f"Erro: Nenhum arquivo de áudio encontrado em '{audio_dir}'")
+            sys.exit(1)
+        opcoes = dict(model_name=modelo, num_threads=args.threads, num_workers=args.workers,
+                      segmento=args.segmento, overlap=args.overlap, bloco_segundos=args.bloco,
+                      gerar_instrumental=args.instrumental, salvar_16k=args.buffer_16k,
+                      streaming=args.streaming, faixas=args.faixas, formato=args.formato,
+                      duas_faixas=args.duas_faixas)
+        lote = separar_lote(audio_files, args.out_dir, processos=args.processos, device=args.device,
+                            gpus=args.gpus, opcoes=opcoes)
+        resumo = imprimir_relatorio_lote(lote)
+        sys.exit(1 if resumo["falhas"] else 0)
     
-    # Se o argumento for um arquivo, usa-o. Se for um diretório, pega o primeiro mp3.
+    # Se o argumento for um arquivo, usa-o. Se for um diretório, pega o áudio
+    # mais recente (mp3 ou contêiner nativo do download: webm, m4a, opus...).
     if audio_dir.is_file():
         audio_file = audio_dir
     elif audio_dir.is_dir():
-        audio_files = list(audio_dir.glob("*.mp3"))
+        audio_files = arquivos_audio(audio_dir)
         if not audio_files:
-            print(f"Erro: Nenhum arquivo .mp3 encontrado em '{audio_dir}'")
+            print(f"Erro: Nenhum arquivo de áudio encontrado em '{audio_dir}'")
             sys.exit(1)
         audio_file = audio_files[0]
     else:
         print(f"Erro: O caminho especificado '{audio_dir}' não é um arquivo ou diretório válido.")
         sys.exit(1)
-    audio_files = list(audio_dir.glob("*.mp3"))
-    if not audio_files:
-        print(f"Erro: Nenhum arquivo .mp3 encontrado em '{audio_dir}'")
-        exit(1)
-    audio_file = audio_files[0]
 
     print(f"Usando arquivo de áudio: {audio_file}")
 
@@ -93,4 +601,9 @@ if __name__ == "__main__":
 
     print(f"As faixas serão salvas em: {output_dir}")
 
-    separar_faixas(str(audio_file), str(output_dir))
+    separar_faixas(str(audio_file), str(output_dir), model_name=modelo, device=args.device,
+                   num_threads=args.threads, num_workers=args.workers,
+                   segmento=args.segmento, overlap=args.overlap, bloco_segundos=args.bloco,
+                   gerar_instrumental=args.instrumental, salvar_16k=args.buffer_16k,
+                   streaming=args.streaming, faixas=args.faixas, formato=args.formato,
+                   duas_faixas=args.duas_faixas)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+servico_karaoke.py
+
+Serviço residente do pipeline: um único processo mantém torch, Demucs,
+Whisper e WhisperX carregados (cache_modelos.py) e recebe músicas como
+jobs, em vez de pagar a inicialização do processo e a carga dos modelos a
+cada execução do pipeline_main.py. Depois do primeiro job, a latência de
+uma música é só o tempo de processamento.
+
+Os jobs entram por:
+- HTTP local (--porta, padrão 127.0.0.1:8765) ou socket Unix (--socket)
+- pasta de spool (--spool): cada arquivo .json é um job; ao ser aceito ele
+  vai para aceitos/ e, ao terminar, o status é gravado em concluidos/
+
+Um job é {"url": ...} ou {"audio": caminho}, com "prioridade" (maior
+primeiro; padrão 0) e "opcoes" com os mesmos nomes dos argumentos do
+pipeline_main.py (ex.: {"alinhamento": "whisper", "vad": true}).
+
+As etapas de todos os jobs vão para um AgendadorDAG em modo residente: a
+concorrência das etapas de GPU (separação, transcrição, alinhamento), de
+CPU (encode) e de rede (download) é limitada por pool.
+
+Os jobs terminados ficam consultáveis por --reter-segundos (padrão: 1 h),
+até no máximo --reter-jobs deles; depois saem da memória do serviço e do
+agendador (GET /jobs/<id> passa a dar 404; o status dos jobs do spool
+continua em concluidos/).
+
+API (JSON):
+    POST /jobs         cria um job -> descrição do job (id, status, etapas)
+    GET  /jobs         lista os jobs
+    GET  /jobs/<id>    status e tempos por etapa de um job
+    GET  /saude        pools, jobs por status e cache de modelos
+
+Uso:
+    python servico_karaoke.py --porta 8765 --acelerador 1 --cpu 2
+    python servico_karaoke.py --socket /tmp/karaoke.sock --spool fila_jobs
+    curl -X POST localhost:8765/jobs -d '{"url": "https://youtu.be/...", "prioridade": 5}'
+    curl localhost:8765/jobs/00001
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from agendador_lote import POOLS_PADRAO, AgendadorDAG
+from cache_modelos import definir_orcamento, estatisticas_cache
+from perfil_etapas import PASTA_PADRAO as PERFIL_DIR, Perfilador, ativar_perfil
+from pipeline_main import adicionar_musica, criar_parser, garantir_pastas
+
+PORTA_PADRAO = 8765
+INTERVALO_SPOOL = 1.0
+RETENCAO_SEGUNDOS = 3600
+RETENCAO_JOBS = 500
+
+# Opções do pipeline_main.py que não fazem sentido por job (são do processo ou do modo de uma música)
+OPCOES_PROIBIDAS = {"url", "etapa", "nome", "lote", "rede", "acelerador", "encode", "sem_cache", "cache_modelos_mb",
+                    "perfil", "perfil_dir", "perfil_cprofile", "relatorio_imports"}
+
+
+def _argumentos_job(opcoes):
+    """
+    Converte as opções do job (nomes do pipeline_main.py, com _ ou -) nos
+    argumentos do pipeline, validados pelo próprio parser (tipos e choices).
+    """
+    argv = []
+    for nome, valor in (opcoes or {}).items():
+        destino = nome.replace("-", "_")
+        if destino in OPCOES_PROIBIDAS:
+            raise ValueError(f"Opção não permitida em jobs: {nome}")
+        flag = f"--{destino.replace('_', '-')}"
+        if valor is True:
+            argv.append(flag)
+        elif valor is False or valor is None:
+            continue
+        elif isinstance(valor, (list, tuple)):
+            argv += [flag, *map(str, valor)]
+        else:
+            argv += [flag, str(valor)]
+    try:
+        return criar_parser().parse_args(argv)
+    except SystemExit:
+        raise ValueError(f"Opções inválidas: {opcoes}") from None
+
+
+class Job:
+    """Uma música enviada ao serviço: o item do pipeline, as opções e as tarefas no agendador."""
+
+    def __init__(self, id_job, item, prioridade, opcoes, origem):
+        self.id = id_job
+        self.item = item
+        self.prioridade = prioridade
+        self.opcoes = opcoes
+        self.origem = origem  # "http" ou o arquivo do spool
+        self.ctx = dict(item)
+        self.tarefas = []  # objetos Tarefa: continuam legíveis depois de saírem do agendador
+        self.criado_em = time.time()
+        self.concluido_em = None
+
+
+class ServicoKaraoke:
+    """Fila de jobs sobre um AgendadorDAG residente."""
+
+    def __init__(self, concorrencia=None, spool=None, reter_segundos=RETENCAO_SEGUNDOS, reter_jobs=RETENCAO_JOBS):
+        self.agendador = AgendadorDAG(concorrencia, ao_concluir=self._tarefa_concluida)
+        self.jobs = {}
+        self.reter_segundos = reter_segundos
+        self.reter_jobs = reter_jobs
+        self.spool = Path(spool) if spool else None
+        self.iniciado_em = time.time()
+        # RLock: o agendador pode chamar _tarefa_concluida de dentro de enviar()
+        self._lock = threading.RLock()
+        self._contador = itertools.count(1)
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        garantir_pastas()
+        self.agendador.iniciar()
+        if self.spool:
+            for pasta in ("aceitos", "concluidos", "rejeitados"):
+                (self.spool / pasta).mkdir(parents=True, exist_ok=True)
+            threading.Thread(target=self._vigiar_spool, name="spool", daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
+        self.agendador.parar()
+
+    # ---------- jobs ----------
+    def enviar(self, pedido, origem="http"):
+        """Valida o pedido e coloca as etapas da música na fila. Retorna o Job."""
+        if not isinstance(pedido, dict) or ("url" in pedido) == ("audio" in pedido):
+            raise ValueError("O job deve ter exatamente um de 'url' ou 'audio'")
+        if "audio" in pedido and not Path(pedido["audio"]).is_file():
+            raise ValueError(f"Arquivo de áudio não encontrado: {pedido['audio']}")
+        prioridade = int(pedido.get("prioridade", 0))
+        opcoes = pedido.get("opcoes") or {}
+        args = _argumentos_job(opcoes)
+        item = {"url": pedido["url"]} if "url" in pedido else {"audio": Path(pedido["audio"])}
+
+        with self._lock:
+            numero = next(self._contador)
+            job = Job(f"{numero:05d}", item, prioridade, opcoes, origem)
+            # Maior prioridade primeiro; empate, ordem de chegada
+            nomes = adicionar_musica(self.agendador, job.ctx, job.id, args, prioridade=(-prioridade, numero))
+            job.tarefas = [self.agendador.tarefas[nome] for nome in nomes]
+            # Só depois de ter as tarefas: os workers esperam o lock para reportar o término
+            self.jobs[job.id] = job
+            self._podar()
+        print(f"📥 Job {job.id} na fila (prioridade {prioridade}): {pedido.get('url') or pedido.get('audio')}")
+        return job
+
+    def status(self, job):
+        tarefas = job.tarefas
+        if any(t.status == "erro" for t in tarefas):
+            return "erro"
+        if all(t.status == "ok" for t in tarefas):
+            return "ok"
+        if any(t.status != "pendente" for t in tarefas):
+            return "executando"
+        return "na_fila"
+
+    def descrever(self, job):
+        tarefas = job.tarefas
+        inicios = [t.iniciada_em for t in tarefas if t.iniciada_em]
+        erro = next((t.erro for t in tarefas if t.status == "erro"), None)
+        return {
+            "id": job.id,
+            "status": self.status(job),
+            "prioridade": job.prioridade,
+            "item": {k: str(v) for k, v in job.item.items()},
+            "opcoes": job.opcoes,
+            "etapas": {t.nome.split(":")[-1]: {"status": t.status, "segundos": round(t.duracao, 2)}
+                       for t in tarefas},
+            "espera_fila": round(min(inicios) - job.criado_em, 2) if inicios else None,
+            "processamento": round(sum(t.duracao for t in tarefas), 2),
+            "total": round(job.concluido_em - job.criado_em, 2) if job.concluido_em else None,
+            "video": str(job.ctx["video"]) if "video" in job.ctx else None,
+            "erro": str(erro) if erro else None,
+        }
+
+    def saude(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        por_status = {}
+        for job in jobs:
+            status = self.status(job)
+            por_status[status] = por_status.get(status, 0) + 1
+        return {
+            "ativo_ha": round(time.time() - self.iniciado_em, 1),
+            "pools": self.agendador.concorrencia,
+            "jobs": por_status,
+            "cache_modelos": estatisticas_cache(),
+        }
+
+    def _tarefa_concluida(self, tarefa):
+        with self._lock:
+            job = self.jobs.get(tarefa.grupo)
+            if job is None or job.concluido_em is not None:
+                return
+            status = self.status(job)
+            if status not in ("ok", "erro"):
+                return
+            job.concluido_em = time.time()
+            self._podar()
+        descricao = self.descrever(job)
+        icone = "✅" if status == "ok" else "❌"
+        print(f"{icone} Job {job.id} {status} em {descricao['total']:.1f}s "
+              f"(processamento {descricao['processamento']:.1f}s)")
+        if self.spool and job.origem != "http":
+            destino = self.spool / "concluidos" / f"{job.id}.json"
+            destino.write_text(json.dumps(descricao, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def _podar(self):
+        """
+        Descarta os jobs terminados há mais de reter_segundos e, acima de
+        reter_jobs terminados, os mais antigos; as tarefas deles saem do
+        agendador. Chamado com o lock.
+        """
+        terminados = sorted((job for job in self.jobs.values()
+                             if job.concluido_em is not None
+                             and all(t.status in ("ok", "erro", "pulada") for t in job.tarefas)),
+                            key=lambda job: job.concluido_em)
+        limite = time.time() - self.reter_segundos
+        excesso = max(0, len(terminados) - self.reter_jobs)
+        for i, job in enumerate(terminados):
+            if i >= excesso and job.concluido_em > limite:
+                break
+            self.agendador.remover([t.nome for t in job.tarefas])
+            del self.jobs[job.id]
+
+    # ---------- spool ----------
+    def _vigiar_spool(self):
+        while not self._parar.wait(INTERVALO_SPOOL):
+            pedidos = sorted(self.spool.glob("*.json"), key=lambda a: a.stat().st_mtime)
+            for arquivo in pedidos:
+                try:
+                    pedido = json.loads(arquivo.read_text(encoding="utf-8"))
+                    job = self.enviar(pedido, origem=arquivo.name)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️  Spool: {arquivo.name} rejeitado: {e}")
+                    shutil.move(str(arquivo), str(self.spool / "rejeitados" / arquivo.name))
+                    continue
+                shutil.move(str(arquivo), str(self.spool / "aceitos" / f"{job.id}-{arquivo.name}"))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    servico = None  # definido em criar_servidor
+
+    def _responder(self, codigo, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        partes = [p for p in self.path.split("?")[0].split("/") if p]
+        if partes == ["saude"]:
+            return self._responder(200, self.servico.saude())
+        if partes == ["jobs"]:
+            with self.servico._lock:
+                jobs = list(self.servico.jobs.values())
+            return self._responder(200, [self.servico.descrever(job) for job in jobs])
+        if len(partes) == 2 and partes[0] == "jobs":
+            job = self.servico.jobs.get(partes[1])
+            if job is None:
+                return self._responder(404, {"erro": f"Job não encontrado: {partes[1]}"})
+            return self._responder(200, self.servico.descrever(job))
+        return self._responder(404, {"erro": f"Rota desconhecida: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._responder(404, {"erro": f"Rota desconhecida: {self.path}"})
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            pedido = json.loads(self.rfile.read(tamanho) or b"{}")
+            job = self.servico.enviar(pedido)
+        except ValueError as e:
+            return self._responder(400, {"erro": str(e)})
+        return self._responder(201, self.servico.descrever(job))
+
+    def log_message(self, formato, *args):
+        pass  # os jobs já são registrados pelo serviço
+
+
+class _ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        requisicao, _ = super().get_request()
+        return requisicao, ("unix", 0)  # o BaseHTTPRequestHandler espera (host, porta)
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=PORTA_PADRAO, socket_unix=None):
+    """Servidor HTTP da API, em TCP local ou num socket Unix."""
+    handler = type("Handler", (_Handler,), {"servico": servico})
+    if socket_unix:
+        Path(socket_unix).unlink(missing_ok=True)
+        return _ServidorUnix(str(socket_unix), handler)
+    return ThreadingHTTPServer((host, porta), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço residente do karaokê: fila de jobs com modelos carregados.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço HTTP (padrão: 127.0.0.1)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO, help=f"Porta HTTP (padrão: {PORTA_PADRAO})")
+    parser.add_argument("--socket", default=None, help="Socket Unix no lugar da porta TCP")
+    parser.add_argument("--spool", default=None, help="Pasta de spool: cada .json colocado nela vira um job")
+    parser.add_argument("--rede", type=int, default=POOLS_PADRAO["rede"],
+                        help=f"Downloads simultâneos (padrão: {POOLS_PADRAO['rede']})")
+    parser.add_argument("--acelerador", type=int, default=POOLS_PADRAO["acelerador"],
+                        help=f"Etapas de GPU simultâneas: separação/transcrição/alinhamento (padrão: {POOLS_PADRAO['acelerador']})")
+    parser.add_argument("--cpu", type=int, default=POOLS_PADRAO["cpu"],
+                        help=f"Encodes ffmpeg simultâneos (padrão: {POOLS_PADRAO['cpu']})")
+    parser.add_argument("--reter-segundos", type=float, default=RETENCAO_SEGUNDOS,
+                        help=f"Por quanto tempo um job terminado continua consultável (padrão: {RETENCAO_SEGUNDOS}s)")
+    parser.add_argument("--reter-jobs", type=int, default=RETENCAO_JOBS,
+                        help=f"Máximo de jobs terminados mantidos em memória (padrão: {RETENCAO_JOBS})")
+    parser.add_argument("--cache-modelos-mb", type=float, default=None,
+                        help="Orçamento de memória (MB) do cache de modelos; 0 = sem limite")
+    parser.add_argument("--perfil", "--profile", action="store_true",
+                        help=f"Mede cada etapa de cada job em {PERFIL_DIR}/etapas.jsonl e {PERFIL_DIR}/karaoke.prom")
+    parser.add_argument("--perfil-dir", default=str(PERFIL_DIR), help="Pasta das medições do --perfil")
+    args = parser.parse_args()
+
+    if args.cache_modelos_mb is not None:
+        definir_orcamento(args.cache_modelos_mb)
+    if args.perfil:
+        ativar_perfil(Perfilador(args.perfil_dir))
+
+    servico = ServicoKaraoke({"rede": args.rede, "acelerador": args.acelerador, "cpu": args.cpu}, args.spool,
+                             args.reter_segundos, args.reter_jobs)
+    servico.iniciar()
+    servidor = criar_servidor(servico, args.host, args.porta, args.socket)
+    endereco = args.socket or f"http://{args.host}:{args.porta}"
+    print(f"🎤 Serviço de karaokê ouvindo em {endereco} (pid {os.getpid()})")
+    if args.spool:
+        print(f"   Spool: {Path(args.spool).resolve()}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Encerrando (aguardando as etapas em execução)...")
+    finally:
+        servidor.server_close()
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+        servico.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+tempos_palavras.py
+
+Armazenamento compacto dos tempos de segmentos e palavras, compartilhado
+entre as etapas 3 (SRT), 4 (alinhamento) e a geração do .ass.
+
+Em vez de listas de dicts, os tempos ficam em colunas NumPy (início, fim,
+segmento e confiança de cada palavra; início, fim e texto de cada segmento)
+e os textos numa tabela de strings sem repetição. Em disco é um arquivo
+binário (.tempos) lido sem parsing de texto, o que permite carregar os tempos
+de milhares de músicas para re-renderizar ou conferir sem rodar modelos.
+
+Formato (.tempos, little-endian):
+    cabeçalho  <4sHHIII: MAGIC, versão, reservado, n_palavras, n_segmentos, n_textos
+    float32    inicio[n_palavras], fim[n_palavras], confianca[n_palavras]
+    int32      segmento[n_palavras], palavra[n_palavras]
+    float32    seg_inicio[n_segmentos], seg_fim[n_segmentos]
+    int32      seg_texto[n_segmentos]
+    utf-8      textos separados por '\\0'
+
+Tempos ausentes (palavras que o WhisperX não conseguiu alinhar) e confiança
+desconhecida ficam como NaN.
+"""
+
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"KTPW"
+VERSAO = 1
+EXTENSAO = ".tempos"
+_CABECALHO = struct.Struct("<4sHHIII")
+
+
+def caminho_tempos(caminho):
+    """Arquivo .tempos correspondente a um .srt ou .ass."""
+    return Path(caminho).with_suffix(EXTENSAO)
+
+
+def _numero(valor):
+    return np.nan if valor is None else valor
+
+
+def _segundos(valor):
+    """float32 -> float, sem o ruído da conversão (tempos têm no máximo ms de precisão)."""
+    return round(float(valor), 4)
+
+
+class TemposPalavras:
+    """Tempos de segmentos e palavras em colunas (ver docstring do módulo)."""
+
+    __slots__ = ("inicio", "fim", "confianca", "segmento", "palavra",
+                 "seg_inicio", "seg_fim", "seg_texto", "textos")
+
+    def __init__(self, inicio, fim, confianca, segmento, palavra, seg_inicio, seg_fim, seg_texto, textos):
+        self.inicio = inicio
+        self.fim = fim
+        self.confianca = confianca
+        self.segmento = segmento
+        self.palavra = palavra
+        self.seg_inicio = seg_inicio
+        self.seg_fim = seg_fim
+        self.seg_texto = seg_texto
+        self.textos = textos
+
+    def __len__(self):
+        return len(self.inicio)
+
+    @property
+    def n_segmentos(self):
+        return len(self.seg_inicio)
+
+    # ---------- conversão de/para o formato do Whisper/WhisperX ----------
+    @classmethod
+    def de_segmentos(cls, segmentos):
+        """
+        Constrói a partir de segmentos no formato do Whisper ou do WhisperX
+        ({'start', 'end', 'text', 'words': [{'word', 'start', 'end', 'probability'|'score'}]}).
+        """
+        indices = {}
+        textos = []
+
+        def indice(texto):
+            texto = texto.strip()
+            if texto not in indices:
+                indices[texto] = len(textos)
+                textos.append(texto)
+            return indices[texto]
+
+        inicio, fim, confianca, segmento, palavra = [], [], [], [], []
+        seg_inicio, seg_fim, seg_texto = [], [], []
+        for i, seg in enumerate(segmentos):
+            seg_inicio.append(seg['start'])
+            seg_fim.append(seg['end'])
+            seg_texto.append(indice(seg['text']))
+            for w in seg.get('words') or []:
+                inicio.append(_numero(w.get('start')))
+                fim.append(_numero(w.get('end')))
+                confianca.append(_numero(w.get('probability', w.get('score'))))
+                segmento.append(i)
+                palavra.append(indice(w['word']))
+
+        return cls(
+            np.array(inicio, dtype=np.float32), np.array(fim, dtype=np.float32),
+            np.array(confianca, dtype=np.float32), np.array(segmento, dtype=np.int32),
+            np.array(palavra, dtype=np.int32), np.array(seg_inicio, dtype=np.float32),
+            np.array(seg_fim, dtype=np.float32), np.array(seg_texto, dtype=np.int32), textos,
+        )
+
+    def limites_segmentos(self):
+        """Índices [inicio, fim) das palavras de cada segmento (palavras ficam em ordem de segmento)."""
+        limites = np.searchsorted(self.segmento, np.arange(self.n_segmentos + 1))
+        return limites[:-1], limites[1:]
+
+    def textos_segmentos(self):
+        return [self.textos[i] for i in self.seg_texto]
+
+    def segmentos(self, com_palavras=True):
+        """Lista de segmentos no formato do resultado do WhisperX (tempos em float)."""
+        resultado = []
+        primeiros, ultimos = self.limites_segmentos()
+        for s in range(self.n_segmentos):
+            seg = {
+                'start': _segundos(self.seg_inicio[s]),
+                'end': _segundos(self.seg_fim[s]),
+                'text': self.textos[self.seg_texto[s]],
+            }
+            if com_palavras:
+                palavras = []
+                for j in range(primeiros[s], ultimos[s]):
+                    w = {'word': self.textos[self.palavra[j]]}
+                    if not np.isnan(self.inicio[j]):
+                        w['start'] = _segundos(self.inicio[j])
+                        w['end'] = _segundos(self.fim[j])
+                    if not np.isnan(self.confianca[j]):
+                        w['score'] = round(float(self.confianca[j]), 4)
+                    palavras.append(w)
+                seg['words'] = palavras
+            resultado.append(seg)
+        return resultado
+
+    # ---------- disco ----------
+    def salvar(self, caminho):
+        textos = "\0".join(self.textos).encode("utf-8")
+        with open(caminho, "wb") as f:
+            f.write(_CABECALHO.pack(MAGIC, VERSAO, 0, len(self), self.n_segmentos, len(self.textos)))
+            for coluna, dtype in ((self.inicio, "<f4"), (self.fim, "<f4"), (self.confianca, "<f4"),
+                                  (self.segmento, "<i4"), (self.palavra, "<i4"),
+                                  (self.seg_inicio, "<f4"), (self.seg_fim, "<f4"), (self.seg_texto, "<i4")):
+                f.write(np.ascontiguousarray(coluna, dtype=dtype).tobytes())
+            f.write(textos)
+
+    @classmethod
+    def carregar(cls, caminho):
+        dados = Path(caminho).read_bytes()
+        magic, versao, _, n_palavras, n_segmentos, n_textos = _CABECALHO.unpack_from(dados)
+        if magic != MAGIC or versao != VERSAO:
+            raise ValueError(f"Arquivo de tempos inválido ou de outra versão: {caminho}")
+
+        posicao = _CABECALHO.size
+        colunas = []
+        for quantidade, dtype in ((n_palavras, "<f4"), (n_palavras, "<f4"), (n_palavras, "<f4"),
+                                  (n_palavras, "<i4"), (n_palavras, "<i4"),
+                                  (n_segmentos, "<f4"), (n_segmentos, "<f4"), (n_segmentos, "<i4")):
+            colunas.append(np.frombuffer(dados, dtype=dtype, count=quantidade, offset=posicao))
+            posicao += quantidade * 4
+        textos = dados[posicao:].decode("utf-8").split("\0") if n_textos else []
+        if len(textos) != n_textos:
+            raise ValueError(f"Tabela de textos corrompida em {caminho}")
+        return cls(*colunas, textos)
+
+
+def carregar_varios(caminhos):
+    """
+    Carrega os tempos de vários arquivos (ex.: subtitle_ass/*.tempos) para
+    re-renderização ou conferência em lote.
+
+    Returns:
+        dict: {nome_base: TemposPalavras}
+    """
+    return {Path(c).stem: TemposPalavras.carregar(c) for c in caminhos}
@@ -9,6 +9,9 @@ Funcionamento automático:
 - Usa legendas da pasta subtitle_ass/
 - Usa a imagem karaoke-hugo.jpg como padrão
 - Salva vídeos em karaokes_completos/
+- Com --jobs N, renderiza N músicas ao mesmo tempo
+- Com --incremental, pula as músicas cujo MP4 é mais novo que todas as
+  entradas (faixas, legenda .ass e imagem de fundo)
 
 Requisitos:
 - ffmpeg instalado e no PATH
@@ -16,11 +19,34 @@ Requisitos:
 """
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import subprocess
 import sys
 import os
-from pydub import AudioSegment
+import time
+
+from encoders_video import FPS_PADRAO, argumentos_video, escolher_encoder, executar_com_fallback
+from render_paralelo import filtro_mixagem, renderizar_paralelo
+from formatos_audio import INSTRUMENTAL, caminho_faixa, faixas_instrumentais
+
+# Instrumental somado direto do tensor da separação (separar_faixas(..., gerar_instrumental=True)),
+# em instrumental.wav ou instrumental.flac conforme o formato escolhido
+
+# Parâmetros de codificação do vídeo final (também entram na chave do cache de artefatos)
+# O codec de vídeo vem de encoders_video.py (nvenc, x264 ou x265, com fallback automático)
+CONFIG_VIDEO = {
+    "escala": "1280:-2",
+    "codec_audio": "aac",
+    "bitrate_audio": "128k",
+    "encoder": "auto",
+    "fps": FPS_PADRAO,
+}
+
+def parametros_video(encoder="auto", fps=FPS_PADRAO):
+    """Configuração efetiva do encode (com o backend resolvido), usada na chave do cache."""
+    nome = escolher_encoder(encoder)
+    return {**CONFIG_VIDEO, "encoder": nome, "fps": fps, "argumentos": argumentos_video(nome, fps)}
 
 def combinar_faixas_instrumentais(pasta_audio_separado, arquivo_saida_audio):
     """
@@ -32,20 +58,21 @@ def combinar_faixas_instrumentais(pasta_audio_separado, arquivo_saida_audio):
     """
     print(f"Combinando faixas instrumentais de: {pasta_audio_separado}")
     
-    # Encontrar todos os arquivos .wav exceto vocals.wav
+    # Encontrar todas as faixas (.wav/.flac) exceto os vocais (e o instrumental já somado pela separação)
     arquivos_audio = []
-    for arquivo in pasta_audio_separado.glob("*.wav"):
-        if arquivo.name != "vocals.wav":
-            arquivos_audio.append(arquivo)
-            print(f"  - Adicionando: {arquivo.name}")
+    for arquivo in faixas_instrumentais(pasta_audio_separado):
+        arquivos_audio.append(arquivo)
+        print(f"  - Adicionando: {arquivo.name}")
     
     if not arquivos_audio:
         raise ValueError(f"Nenhuma faixa instrumental encontrada em {pasta_audio_separado}")
     
-    # Carregar e combinar as faixas
+    # Carregar e combinar as faixas (pydub só é necessário neste caminho de duas etapas)
+    from pydub import AudioSegment
+
     audio_combinado = None
     for arquivo in arquivos_audio:
-        audio = AudioSegment.from_wav(arquivo)
+        audio = AudioSegment.from_file(arquivo)
         if audio_combinado is None:
             audio_combinado = audio
         else:
@@ -55,8 +82,13 @@ def combinar_faixas_instrumentais(pasta_audio_separado, arquivo_saida_audio):
     audio_combinado.export(arquivo_saida_audio, format="mp3", bitrate="128k")
     print(f"Áudio instrumental combinado salvo em: {arquivo_saida_audio}")
 
+def instrumental_pronto(pasta_audio_separado):
+    """Retorna o instrumental (.wav ou .flac) gerado direto pela separação, se existir."""
+    return caminho_faixa(pasta_audio_separado, INSTRUMENTAL)
+
 # CORREÇÃO CRÍTICA: Adicionado 'arquivo_imagem' na definição da função
-def criar_video_com_legenda(arquivo_audio, arquivo_legenda, arquivo_saida_video, arquivo_imagem):
+def criar_video_com_legenda(arquivo_audio, arquivo_legenda, arquivo_saida_video, arquivo_imagem,
+                            encoder="auto", fps=FPS_PADRAO):
     """
     Cria um vídeo MP4 com áudio instrumental, imagem de fundo estática e legenda .ass embutida.
     
@@ -65,6 +97,8 @@ def criar_video_com_legenda(arquivo_audio, arquivo_legenda, arquivo_saida_video,
         arquivo_legenda (Path): Arquivo de legenda .ass
         arquivo_saida_video (Path): Caminho para salvar o vídeo final
         arquivo_imagem (Path): Arquivo de imagem a ser usado como fundo
+        encoder (str): 'auto', 'nvenc', 'x264' ou 'x265' (ver encoders_video.py)
+        fps (int): Taxa de quadros do vídeo
     """
     print(f"Criando vídeo com imagem e legenda...")
 
@@ -83,33 +117,92 @@ def criar_video_com_legenda(arquivo_audio, arquivo_legenda, arquivo_saida_video,
         raise
 
     # 2. Comando ffmpeg CORRIGIDO
-    comando_base = [
-        "ffmpeg",
-        "-y",               # Sobrescrever arquivo existente
-        "-loop", "1",       # Loop na imagem deve vir antes da imagem
-        "-i", str(arquivo_imagem),  # 1ª entrada: A imagem (input 0)
-        "-i", str(arquivo_audio),   # 2ª entrada: O áudio (input 1)
-        "-t", duracao_segundos,     # Define a duração total
-        "-vf", f"scale=1280:-2,format=yuv420p,ass={arquivo_legenda}",
-        "-c:a", "aac",      # Codec de áudio
-        "-b:a", "128k",
-        "-shortest",
-        str(arquivo_saida_video),
-        # "-c:v", "libx264",
-        # "-preset", "medium",
-        # "-crf", "23",
-        "-c:v", "h264_nvenc",
-        "-preset", "p4",        # p1-p7 (p4=balanço bom)
-        "-cq", "21",            # Qualidade (0-51, menor=melhor)
-        "-rc", "vbr",
-        "-b:v", "5M",           # Bitrate máximo
-        "-gpu", "0",            # ID da GPU
-    ]
+    def montar_comando(nome_encoder):
+        return [
+            "ffmpeg",
+            "-y",               # Sobrescrever arquivo existente
+            "-loop", "1",       # Loop na imagem deve vir antes da imagem
+            "-framerate", str(fps),
+            "-i", str(arquivo_imagem),  # 1ª entrada: A imagem (input 0)
+            "-i", str(arquivo_audio),   # 2ª entrada: O áudio (input 1)
+            "-t", duracao_segundos,     # Define a duração total
+            "-vf", f"scale={CONFIG_VIDEO['escala']},format=yuv420p,ass={arquivo_legenda}",
+            *argumentos_video(nome_encoder, fps),
+            "-c:a", CONFIG_VIDEO["codec_audio"],      # Codec de áudio
+            "-b:a", CONFIG_VIDEO["bitrate_audio"],
+            "-shortest",
+            str(arquivo_saida_video),
+        ]
+
+    try:
+        print("Executando ffmpeg... (isso pode levar alguns minutos)")
+        usado = executar_com_fallback(montar_comando, encoder)
+        print(f"Vídeo criado com sucesso ({usado}): {arquivo_saida_video}")
+    except subprocess.CalledProcessError as e:
+        print(f"Erro ao executar ffmpeg: {e}")
+        print(f"Stderr: {e.stderr}")
+        raise
+
+def faixas_para_render(pasta_audio_separado):
+    """
+    Faixas de áudio a entregar direto ao ffmpeg: o instrumental.wav da separação,
+    se existir, ou todas as faixas exceto vocals.wav (mixadas pelo próprio ffmpeg).
+    """
+    instrumental = instrumental_pronto(pasta_audio_separado)
+    if instrumental:
+        return [instrumental]
+    faixas = faixas_instrumentais(pasta_audio_separado)
+    if not faixas:
+        raise ValueError(f"Nenhuma faixa instrumental encontrada em {pasta_audio_separado}")
+    return faixas
+
+def criar_video_direto(arquivos_audio, arquivo_legenda, arquivo_saida_video, arquivo_imagem,
+                       encoder="auto", fps=FPS_PADRAO):
+    """
+    Cria o vídeo MP4 em um único processo ffmpeg, sem MP3 intermediário nem ffprobe.
+
+    As faixas WAV entram direto no ffmpeg e são somadas por um filtro amix
+    (seguido de um limitador); a duração vem do próprio stream de áudio (-shortest).
+
+    Args:
+        arquivos_audio (list): Faixas WAV (o instrumental pronto ou as faixas separadas)
+        arquivo_legenda (Path): Arquivo de legenda .ass
+        arquivo_saida_video (Path): Caminho para salvar o vídeo final
+        arquivo_imagem (Path): Arquivo de imagem a ser usado como fundo
+        encoder (str): 'auto', 'nvenc', 'x264' ou 'x265' (ver encoders_video.py)
+        fps (int): Taxa de quadros do vídeo
+    """
+    print(f"Criando vídeo com imagem e legenda (ffmpeg único, {len(arquivos_audio)} faixa(s))...")
+
+    entradas = []
+    for arquivo in arquivos_audio:
+        entradas += ["-i", str(arquivo)]
+
+    filtro_video = f"[0:v]scale={CONFIG_VIDEO['escala']},format=yuv420p,ass={arquivo_legenda}[v]"
+    filtro_audio = filtro_mixagem(len(arquivos_audio))
+
+    def montar_comando(nome_encoder):
+        return [
+            "ffmpeg",
+            "-y",
+            "-loop", "1",
+            "-framerate", str(fps),
+            "-i", str(arquivo_imagem),  # input 0: a imagem
+            *entradas,                  # inputs 1..N: as faixas de áudio
+            "-filter_complex", f"{filtro_video};{filtro_audio}",
+            "-map", "[v]",
+            "-map", "[a]",
+            *argumentos_video(nome_encoder, fps),
+            "-c:a", CONFIG_VIDEO["codec_audio"],
+            "-b:a", CONFIG_VIDEO["bitrate_audio"],
+            "-shortest",                # termina junto com o áudio
+            str(arquivo_saida_video),
+        ]
 
     try:
         print("Executando ffmpeg... (isso pode levar alguns minutos)")
-        subprocess.run(comando_base, check=True, capture_output=True, text=True)
-        print(f"Vídeo criado com sucesso: {arquivo_saida_video}")
+        usado = executar_com_fallback(montar_comando, encoder)
+        print(f"Vídeo criado com sucesso ({usado}): {arquivo_saida_video}")
     except subprocess.CalledProcessError as e:
         print(f"Erro ao executar ffmpeg: {e}")
         print(f"Stderr: {e.stderr}")
@@ -153,11 +246,115 @@ def encontrar_musicas_e_legendas():
     
     return pares
 
+def entradas_video(pasta_audio_separado, arquivo_legenda, arquivo_imagem):
+    """Arquivos dos quais o vídeo final depende: as faixas usadas no render, a legenda e a imagem."""
+    return [*faixas_para_render(pasta_audio_separado), Path(arquivo_legenda), Path(arquivo_imagem)]
+
+def video_atualizado(arquivo_video, entradas):
+    """True se o vídeo existe e nenhuma entrada foi modificada depois dele (como no make)."""
+    arquivo_video = Path(arquivo_video)
+    if not arquivo_video.exists() or arquivo_video.stat().st_size == 0:
+        return False
+    modificado = arquivo_video.stat().st_mtime
+    return all(Path(entrada).stat().st_mtime <= modificado for entrada in entradas)
+
+def renderizar_musica(pasta_audio, arquivo_legenda, nome_musica, arquivo_imagem, args, incremental=False):
+    """
+    Renderiza o vídeo de uma música, ou o pula se --incremental e ele já estiver atualizado.
+
+    O ffmpeg grava em <nome>_karaoke.parcial.mp4, renomeado só no sucesso, para que
+    um render interrompido nunca pareça atualizado. O MP4 final recebe como data de
+    modificação o início do render: uma entrada editada durante o render fica mais
+    nova que ele e a música é refeita na próxima execução.
+
+    Returns:
+        dict: {"nome", "status" ('renderizado' | 'pulado' | 'erro'), "segundos", "erro"}
+    """
+    inicio = time.time()
+    resultado = {"nome": nome_musica, "status": "renderizado", "segundos": 0.0, "erro": None}
+
+    # Caminhos dos arquivos
+    pasta_saida = Path("karaokes_completos")
+    arquivo_audio_temp = pasta_saida / f"{nome_musica}_instrumental.mp3"
+    arquivo_video_final = pasta_saida / f"{nome_musica}_karaoke.mp4"
+    arquivo_video_parcial = pasta_saida / f"{nome_musica}_karaoke.parcial.mp4"
+
+    # Processar
+    try:
+        if incremental and video_atualizado(arquivo_video_final,
+                                            entradas_video(pasta_audio, arquivo_legenda, arquivo_imagem)):
+            print(f"   ⏭️  {nome_musica}: vídeo atualizado, pulando")
+            resultado["status"] = "pulado"
+            return resultado
+
+        print(f"\n🎤 Processando: {nome_musica}")
+        print(f"   Áudio: {pasta_audio}")
+        print(f"   Legenda: {arquivo_legenda}")
+
+        if args.partes != 1 and not args.duas_etapas:
+            renderizar_paralelo(faixas_para_render(pasta_audio), arquivo_legenda,
+                                arquivo_video_parcial, arquivo_imagem, partes=args.partes,
+                                encoder=args.encoder, fps=args.fps, escala=CONFIG_VIDEO["escala"],
+                                codec_audio=CONFIG_VIDEO["codec_audio"],
+                                bitrate_audio=CONFIG_VIDEO["bitrate_audio"])
+        elif not args.duas_etapas:
+            criar_video_direto(faixas_para_render(pasta_audio), arquivo_legenda,
+                               arquivo_video_parcial, arquivo_imagem,
+                               encoder=args.encoder, fps=args.fps)
+        else:
+            arquivo_audio = instrumental_pronto(pasta_audio)
+            if arquivo_audio:
+                print(f"   Usando instrumental da separação: {arquivo_audio.name}")
+            else:
+                combinar_faixas_instrumentais(pasta_audio, arquivo_audio_temp)
+                arquivo_audio = arquivo_audio_temp
+            # Passar o caminho da imagem
+            criar_video_com_legenda(arquivo_audio, arquivo_legenda, arquivo_video_parcial, arquivo_imagem,
+                                    encoder=args.encoder, fps=args.fps)
+
+        os.replace(arquivo_video_parcial, arquivo_video_final)
+        os.utime(arquivo_video_final, (inicio, inicio))
+        print(f"   ✅ Vídeo salvo em: {arquivo_video_final}")
+
+    except Exception as e:
+        print(f"   ❌ Erro ao processar {nome_musica}: {e}")
+        resultado.update(status="erro", erro=str(e))
+        if arquivo_video_parcial.exists():
+            arquivo_video_parcial.unlink()
+    finally:
+        # Limpar arquivo temporário (também em caso de erro)
+        if arquivo_audio_temp.exists():
+            arquivo_audio_temp.unlink()
+        resultado["segundos"] = round(time.time() - inicio, 2)
+    return resultado
+
+def imprimir_resumo(resultados, segundos):
+    """Resumo da execução: renderizadas, puladas e com erro, com o tempo de cada uma."""
+    contagem = {status: sum(r["status"] == status for r in resultados) for status in ("renderizado", "pulado", "erro")}
+    print(f"\n{'='*60}")
+    print(f"📊 RESUMO ({segundos:.1f}s)")
+    print(f"{'='*60}")
+    icones = {"renderizado": "✅", "pulado": "⏭️ ", "erro": "❌"}
+    for r in resultados:
+        if r["status"] == "pulado":
+            continue
+        detalhe = f" - {r['erro']}" if r["erro"] else ""
+        print(f"  {icones[r['status']]} {r['nome']:<40} {r['segundos']:8.1f}s{detalhe}")
+    print(f"\n  Renderizadas: {contagem['renderizado']} | Puladas (atualizadas): {contagem['pulado']} "
+          f"| Com erro: {contagem['erro']}")
+    return contagem
+
 def main():
     parser = argparse.ArgumentParser(description="Cria vídeos de karaokê automaticamente combinando faixas instrumentais e legendas .ass")
     parser.add_argument("--musica", help="Nome específico da música para processar (opcional)")
     # NOVO ARGUMENTO: Imagem de fundo opcional
     parser.add_argument("--imagem", required=False, help="Caminho do arquivo de imagem de fundo (padrão: karaoke-hugo.jpg).")
+    parser.add_argument("--encoder", choices=["auto", "nvenc", "x264", "x265"], default="auto", help="Encoder de vídeo (padrão: auto, com fallback para a CPU).")
+    parser.add_argument("--fps", type=int, default=FPS_PADRAO, help=f"Taxa de quadros do vídeo (padrão: {FPS_PADRAO}).")
+    parser.add_argument("--partes", type=int, default=1, help="Fatias de tempo renderizadas em paralelo (1 = um só ffmpeg, 0 = automático pelos núcleos).")
+    parser.add_argument("--duas-etapas", action="store_true", help="Usa o caminho antigo: mixa em MP3 temporário e depois codifica o vídeo.")
+    parser.add_argument("--jobs", type=int, default=1, help="Músicas renderizadas ao mesmo tempo (padrão: 1; cada uma ainda usa --partes ffmpeg).")
+    parser.add_argument("--incremental", action="store_true", help="Pula as músicas cujo MP4 é mais novo que as faixas, a legenda e a imagem.")
     
     args = parser.parse_args()
     
@@ -189,36 +386,18 @@ def main():
         sys.exit(1)
         
     print(f"🖼️ Usando imagem de fundo: {ARQUIVO_IMAGEM_FUNDO}")
+    print(f"🎞️ Encoder de vídeo: {escolher_encoder(args.encoder)} ({args.fps} fps)")
 
-    # Processar cada música
-    for pasta_audio, arquivo_legenda, nome_musica in pares:
-        print(f"\n🎤 Processando: {nome_musica}")
-        print(f"   Áudio: {pasta_audio}")
-        print(f"   Legenda: {arquivo_legenda}")
-        
-        # Caminhos dos arquivos
-        pasta_saida = Path("karaokes_completos")
-        arquivo_audio_temp = pasta_saida / f"{nome_musica}_instrumental.mp3"
-        arquivo_video_final = pasta_saida / f"{nome_musica}_karaoke.mp4"
-        
-        # Processar
-        try:
-            combinar_faixas_instrumentais(pasta_audio, arquivo_audio_temp)
-            # Passar o caminho da imagem
-            criar_video_com_legenda(arquivo_audio_temp, arquivo_legenda, arquivo_video_final, ARQUIVO_IMAGEM_FUNDO)
-            
-            # Limpar arquivo temporário
-            arquivo_audio_temp.unlink()
-            print(f"   ✅ Vídeo salvo em: {arquivo_video_final}")
-            
-        except Exception as e:
-            print(f"   ❌ Erro ao processar {nome_musica}: {e}")
-            # Limpar arquivo temporário em caso de erro
-            if arquivo_audio_temp.exists():
-                arquivo_audio_temp.unlink()
-    
+    # Processar as músicas (uma por worker com --jobs)
+    inicio = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        resultados = list(executor.map(
+            lambda par: renderizar_musica(*par, ARQUIVO_IMAGEM_FUNDO, args, incremental=args.incremental), pares))
+
+    contagem = imprimir_resumo(resultados, time.time() - inicio)
     print(f"\n🎉 Processamento concluído! Verifique a pasta 'karaokes_completos/'")
-    print(f"📁 {len(pares)} vídeo(s) de karaokê criado(s)")
+    if contagem["erro"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file